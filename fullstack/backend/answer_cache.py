@@ -0,0 +1,161 @@
+import re, time, threading
+from collections import OrderedDict
+
+import numpy as np
+
+# ---------- helpers
+def normalize_question(text: str) -> str:
+    """
+    Canonical cache key for a question: lowercase, punctuation dropped
+    (except inside tokens like "$60/day" or "3.2"), whitespace collapsed.
+    """
+    t = (text or "").lower()
+    t = re.sub(r"[^\w\s$%./-]", " ", t)
+    t = re.sub(r"(?<!\w)[./-]+|[./-]+(?!\w)", " ", t)
+    return re.sub(r"\s+", " ", t).strip()
+
+def _unit(vec):
+    if vec is None:
+        return None
+    v = np.asarray(vec, dtype=np.float32)
+    n = float(np.linalg.norm(v))
+    return v / n if n > 0 else v
+
+class _Entry:
+    __slots__ = ("result", "vec", "created_at")
+
+    def __init__(self, result, vec, created_at):
+        self.result = result
+        self.vec = vec
+        self.created_at = created_at
+
+# ---------- cache
+class AnswerCache:
+    """
+    In-memory LRU + TTL cache of answer_and_sources results.
+
+    Lookup is two-level:
+      1) exact match on the normalized question
+      2) near-duplicate match: cosine(query embedding, cached embedding) >= sim_threshold
+
+    Every entry belongs to a corpus version; when the version changes (re-ingest),
+    the whole cache is dropped.
+    """
+
+    def __init__(self, max_entries: int, ttl_s: float, sim_threshold: float):
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_s = float(ttl_s)
+        self.sim_threshold = float(sim_threshold)
+
+        self._entries = OrderedDict()  # key -> _Entry (oldest first)
+        self._version = None
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def _expired(self, entry, now) -> bool:
+        return self.ttl_s > 0 and (now - entry.created_at) > self.ttl_s
+
+    def _sync_version(self, corpus_version: str):
+        if self._version != corpus_version:
+            if self._entries:
+                self.invalidations += len(self._entries)
+                self._entries.clear()
+            self._version = corpus_version
+
+    def _get_exact(self, key, now):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if self._expired(entry, now):
+            del self._entries[key]
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _get_similar(self, vec, now):
+        best_key, best_sim = None, -1.0
+        for key, entry in list(self._entries.items()):
+            if self._expired(entry, now):
+                del self._entries[key]
+                self.expirations += 1
+                continue
+            if entry.vec is None:
+                continue
+            sim = float(np.dot(vec, entry.vec))
+            if sim > best_sim:
+                best_key, best_sim = key, sim
+
+        if best_key is None or best_sim < self.sim_threshold:
+            return None
+        self._entries.move_to_end(best_key)
+        return self._entries[best_key]
+
+    def lookup(self, key: str, corpus_version: str, embed=None):
+        """
+        Returns (result | None, query_vector | None).
+
+        `embed` is a zero-arg callable producing the query embedding; it is only
+        called when the exact lookup misses, and the raw vector is returned so the
+        caller can reuse it for retrieval. Exceptions from `embed` propagate.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._sync_version(corpus_version)
+            entry = self._get_exact(key, now)
+            if entry is not None:
+                self.hits += 1
+                return entry.result, None
+
+        if embed is None:
+            with self._lock:
+                self.misses += 1
+            return None, None
+
+        vec = embed()
+
+        with self._lock:
+            now = time.monotonic()
+            self._sync_version(corpus_version)
+            entry = self._get_similar(_unit(vec), now)
+            if entry is not None:
+                self.hits += 1
+                self.semantic_hits += 1
+                return entry.result, vec
+            self.misses += 1
+            return None, vec
+
+    def put(self, key: str, result: dict, corpus_version: str, vec=None):
+        with self._lock:
+            self._sync_version(corpus_version)
+            self._entries[key] = _Entry(result, _unit(vec), time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "corpus_version": self._version,
+                "hits": self.hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
@@ -1,7 +1,7 @@
-import logging
+import os, sys, hmac, json, time, logging, functools, threading, subprocess
 from pathlib import Path
 
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, request, jsonify, make_response, send_from_directory, stream_with_context
 from werkzeug.middleware.proxy_fix import ProxyFix
 from flask_cors import CORS
 
@@ -13,6 +13,16 @@ log = logging.getLogger(__name__)
 from config import Config  # noqa: E402
 cfg = Config()
 
+from profiling import RequestProfiler, request_label  # noqa: E402
+from sharded_store import normalize_filter  # noqa: E402
+profiler = RequestProfiler(
+    cfg.PROFILE_DIR, cfg.PROFILE_SAMPLE_RATE, cfg.PROFILE_FORMAT, cfg.PROFILE_INTERVAL_MS, cfg.PROFILE_MAX_FILES
+)
+
+from store_versions import LOG_FILE as INGEST_LOG_FILE, ingest_status, write_status  # noqa: E402
+_ingest_proc = None  # ingest started by this worker
+_ingest_lock = threading.Lock()
+
 # ---------- serve React build (production)
 BASE_DIR = Path(__file__).resolve().parent
 FRONTEND_BUILD_DIR = (BASE_DIR / ".." / "frontend" / "build").resolve()
@@ -33,11 +43,75 @@ app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1, x_proto=1)
 # OPTIONAL: cache static assets for 1 year (safe for hashed CRA builds)
 app.config["SEND_FILE_MAX_AGE_DEFAULT"] = 31536000
 
+# Requests in flight in this worker: the profiler only uses cProfile (pstats) while one is
+@app.before_request
+def _request_started():
+    profiler.request_started()
+
+@app.teardown_request
+def _request_finished(exc):
+    profiler.request_finished()  # streamed responses (stream_with_context) end here after their last chunk
+
+# ---------- helpers
+def loaded_backend():
+    """
+    The backend module once its import has completed, else None. Never triggers the model load.
+    backend.py sets IMPORT_DONE on its last line, so a module still importing (e.g. the warmup thread) doesn't count.
+    """
+    backend = sys.modules.get("backend")
+    return backend if getattr(backend, "IMPORT_DONE", False) is True else None
+
+def admin_token_ok(token: str) -> bool:
+    """
+    token must match ADMIN_TOKEN; with no ADMIN_TOKEN configured, admin features are off.
+    """
+    return bool(cfg.ADMIN_TOKEN) and hmac.compare_digest(token.encode("utf-8"), cfg.ADMIN_TOKEN.encode("utf-8"))
+
+def is_admin() -> bool:
+    return admin_token_ok(request.headers.get("X-Admin-Token", ""))
+
+def admin_only(view):
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if not is_admin():
+            return jsonify({"error": "Not found"}), 404  # don't advertise admin routes
+        return view(*args, **kwargs)
+    return wrapper
+
+def profiled(view):
+    """
+    Profiles the whole handler when the request sends X-Profile: 1 with a valid X-Admin-Token,
+    when the admin armed the next requests, or when sampled (PROFILE_SAMPLE_RATE).
+    The profile name is returned in the X-Profile-Id header.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        forced = request.headers.get("X-Profile") == "1" and is_admin()
+        trigger = profiler.trigger(forced)
+        if trigger is None:
+            return view(*args, **kwargs)
+
+        data = request.get_json(silent=True) or {}
+        label = request_label(request.path, str(data.get("question") or "").strip() if isinstance(data, dict) else "")
+        with profiler.profile(trigger, label) as info:
+            response = make_response(view(*args, **kwargs))
+        response.headers["X-Profile-Id"] = info["name"]
+        return response
+    return wrapper
+
 # ---------- api endpoint get /health
 @app.get("/health")
 def health():
     return jsonify({"status": "ok"}), 200
 
+# ---------- api endpoint get /ready (200 once the model and vector store are warm)
+@app.get("/ready")
+def ready():
+    backend = loaded_backend()
+    if backend is None or not backend.is_ready():
+        return jsonify({"status": "starting"}), 503
+    return jsonify({"status": "ready"}), 200
+
 # ---------- api endpoint get /api/version
 @app.get("/api/version")
 def version():
@@ -49,6 +123,7 @@ def version():
 
 # ---------- api endpoint post /chat
 @app.post("/chat")
+@profiled
 def chat():
     data = request.get_json(force=True) or {}
     question = (data.get("question") or "").strip()
@@ -57,14 +132,208 @@ def chat():
         log.info("Bad request: missing 'question'")
         return jsonify({"error": "question is required"}), 400
 
+    # "filter": {"source": ..., "doc_type": ...} limits retrieval (and routes a sharded store)
+    try:
+        filters = normalize_filter(data.get("filter"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # ?timings=1 (or "timings": true) adds the per-stage timing breakdown to the response
+    with_timings = request.args.get("timings", "").strip().lower() in ("1", "true", "yes") or data.get("timings") is True
+
     try:
         from backend import answer_and_sources  # lazy import (important for CI)
-        result = answer_and_sources(question)
+        result = answer_and_sources(question, with_timings=with_timings, filters=filters)
         return jsonify(result), 200
     except Exception:
         log.exception("Error handling /chat request")
         return jsonify({"error": "Internal server error"}), 500
 
+# ---------- api endpoint post /chat/stream (NDJSON: one event per line)
+@app.post("/chat/stream")
+def chat_stream():
+    data = request.get_json(force=True) or {}
+    question = (data.get("question") or "").strip()
+
+    if not question:
+        log.info("Bad request: missing 'question'")
+        return jsonify({"error": "question is required"}), 400
+
+    try:
+        filters = normalize_filter(data.get("filter"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        from backend import stream_answer  # lazy import (important for CI)
+    except Exception:
+        log.exception("Error handling /chat/stream request")
+        return jsonify({"error": "Internal server error"}), 500
+
+    def generate():
+        try:
+            for event in stream_answer(question, filters):
+                yield json.dumps(event) + "\n"
+        except Exception:
+            log.exception("Error streaming /chat/stream response")
+            yield json.dumps({"event": "error", "error": "Internal server error"}) + "\n"
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# ---------- api endpoint post /chat/batch (JSON, or NDJSON as items finish with "stream": true)
+@app.post("/chat/batch")
+def chat_batch():
+    data = request.get_json(force=True) or {}
+    questions = data.get("questions") if isinstance(data, dict) else None
+
+    if not isinstance(questions, list) or not questions:
+        log.info("Bad request: missing 'questions'")
+        return jsonify({"error": "questions must be a non-empty list"}), 400
+    if len(questions) > cfg.BATCH_MAX_QUESTIONS:
+        return jsonify({"error": f"at most {cfg.BATCH_MAX_QUESTIONS} questions per batch"}), 400
+
+    try:
+        filters = normalize_filter(data.get("filter"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    with_timings = request.args.get("timings", "").strip().lower() in ("1", "true", "yes") or data.get("timings") is True
+    stream = request.args.get("stream", "").strip().lower() in ("1", "true", "yes") or data.get("stream") is True
+
+    # Bad items are answered here; the rest go to the backend in one batch
+    rejected = []
+    valid = []  # (input index, question)
+    for i, question in enumerate(questions):
+        if not isinstance(question, str) or not question.strip():
+            rejected.append({"index": i, "error": "question is required"})
+        else:
+            valid.append((i, question.strip()))
+
+    try:
+        from backend import iter_answer_many  # lazy import (important for CI)
+    except Exception:
+        log.exception("Error handling /chat/batch request")
+        return jsonify({"error": "Internal server error"}), 500
+
+    def answered():
+        yield from rejected
+        if valid:
+            for j, result in iter_answer_many([q for _, q in valid], with_timings=with_timings, filters=filters):
+                i = valid[j][0]
+                yield {"index": i, "error": result["error"]} if "error" in result else {"index": i, "result": result}
+
+    if not stream:
+        try:
+            results = sorted(answered(), key=lambda item: item["index"])
+        except Exception:
+            log.exception("Error handling /chat/batch request")
+            return jsonify({"error": "Internal server error"}), 500
+        return jsonify({"results": results}), 200
+
+    def generate():
+        try:
+            for item in answered():
+                yield json.dumps(item) + "\n"
+        except Exception:
+            log.exception("Error streaming /chat/batch response")
+            yield json.dumps({"event": "error", "error": "Internal server error"}) + "\n"
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# ---------- api endpoint get /api/cache/stats
+@app.get("/api/cache/stats")
+def cache_stats():
+    backend = loaded_backend()
+    if backend is None:
+        return jsonify({"enabled": cfg.ANSWER_CACHE_ENABLED, "loaded": False}), 200
+    return jsonify({**backend.answer_cache_stats(), "loaded": True}), 200
+
+# ---------- api endpoint get /metrics (Prometheus)
+@app.get("/metrics")
+def prometheus_metrics():
+    from metrics import render_latest  # no model load
+    body, content_type = render_latest()
+    return Response(body, content_type=content_type)
+
+# ---------- admin: request profiles (X-Admin-Token)
+@app.get("/admin/profiles")
+@admin_only
+def list_profiles():
+    return jsonify({"profiling": profiler.state(), "profiles": profiler.list()}), 200
+
+@app.get("/admin/profiles/<name>")
+@admin_only
+def get_profile(name: str):
+    entry = next((p for p in profiler.list() if p["name"] == name), None)
+    if entry is None:
+        return jsonify({"error": "Not found"}), 404
+    return send_from_directory(profiler.out_dir, entry["file"], as_attachment=True)
+
+@app.post("/admin/profiling")
+@admin_only
+def configure_profiling():
+    """
+    Body: {"arm": N} profiles the next N /chat requests of this worker; "sample_rate" and "format" change those settings.
+    """
+    data = request.get_json(force=True) or {}
+    try:
+        profiler.configure(data.get("arm"), data.get("sample_rate"), data.get("format"))
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(profiler.state()), 200
+
+# ---------- admin: blue/green ingest (X-Admin-Token)
+@app.post("/admin/ingest")
+@admin_only
+def start_ingest():
+    """
+    Body: {"mode": "full" | "incremental"} (default INGEST_MODE). Runs ingest.py in a background process that builds
+    a new store version; every worker switches to it once it is published. 409 while an ingest is running.
+    """
+    global _ingest_proc
+    if not cfg.STORE_VERSIONS:
+        return jsonify({"error": "needs STORE_VERSIONS=1 (an in-place ingest would rebuild the store being served)"}), 409
+    data = request.get_json(silent=True) or {}
+    mode = str(data.get("mode") or cfg.INGEST_MODE).strip().lower()
+    if mode not in ("full", "incremental"):
+        return jsonify({"error": "mode must be 'full' or 'incremental'"}), 400
+
+    with _ingest_lock:
+        if (_ingest_proc is not None and _ingest_proc.poll() is None) or ingest_status(cfg.PERSIST_DIR)["running"]:
+            return jsonify({"error": "an ingest is already running"}), 409
+        os.makedirs(cfg.PERSIST_DIR, exist_ok=True)
+        log_path = os.path.join(cfg.PERSIST_DIR, INGEST_LOG_FILE)
+        with open(log_path, "w") as out:
+            _ingest_proc = subprocess.Popen(
+                [sys.executable, "ingest.py"], cwd=BASE_DIR, env={**os.environ, "INGEST_MODE": mode},
+                stdout=out, stderr=subprocess.STDOUT, start_new_session=True,
+            )
+        # Until ingest.py takes its lock (after its imports), this is what GET /admin/ingest reports
+        write_status(cfg.PERSIST_DIR, new_run=True, state="starting", pid=_ingest_proc.pid, mode=mode,
+                     started_at=time.time())
+        threading.Thread(target=_ingest_proc.wait, name="ingest-reaper", daemon=True).start()
+    log.info("Started ingest (pid %s, mode %s), output in %s", _ingest_proc.pid, mode, log_path)
+    return jsonify({"started": True, "pid": _ingest_proc.pid, "mode": mode}), 202
+
+@app.get("/admin/ingest")
+@admin_only
+def get_ingest_status():
+    """
+    Progress of the running / last ingest, the store versions, and the one this worker is serving.
+    """
+    status = ingest_status(cfg.PERSIST_DIR)
+    backend = loaded_backend()
+    status["serving"] = backend.retrieval.store_path if backend is not None else None
+    return jsonify(status), 200
+
 # ---------- serve React index (SPA)
 @app.get("/")
 def serve_react_index():
@@ -77,7 +346,7 @@ def serve_react_index():
 @app.get("/<path:path>")
 def serve_react_routes(path: str):
     # Don't interfere with API routes (these should 404 if not defined)
-    if path.startswith("api/") or path in ("health", "chat"):
+    if path.startswith(("api/", "admin/")) or path in ("health", "ready", "chat", "metrics"):
         return jsonify({"error": "Not found"}), 404
 
     # If a real file exists in the build folder (e.g., favicon.ico, manifest.json), serve it
@@ -94,4 +363,12 @@ def serve_react_routes(path: str):
 
 # ---------- main
 if __name__ == "__main__":
+    def _warmup():
+        try:
+            import backend
+            backend.warmup()
+        except Exception:
+            log.exception("warmup failed")
+
+    threading.Thread(target=_warmup, name="rag-warmup", daemon=True).start()
     app.run(host="0.0.0.0", port=cfg.PORT)
\ No newline at end of file
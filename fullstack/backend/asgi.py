@@ -0,0 +1,117 @@
+import json, asyncio, logging, importlib
+from urllib.parse import parse_qs
+
+from asgiref.wsgi import WsgiToAsgi
+
+# ---------- logging
+logging.basicConfig(level=logging.INFO)
+log = logging.getLogger(__name__)
+
+# ---------- Flask app (every route except POST /chat is served through it)
+from app import app as flask_app, cfg, profiler, admin_token_ok  # noqa: E402
+from profiling import request_label  # noqa: E402
+from sharded_store import normalize_filter  # noqa: E402
+wsgi = WsgiToAsgi(flask_app)
+
+# ---------- helpers
+async def _read_body(receive) -> bytes:
+    body = b""
+    more = True
+    while more:
+        message = await receive()
+        body += message.get("body", b"")
+        more = message.get("more_body", False)
+    return body
+
+def _header(scope, name: bytes) -> str:
+    return dict(scope.get("headers") or []).get(name, b"").decode("latin-1")
+
+def _cors_headers(scope) -> list:
+    origins = (cfg.ALLOWED_ORIGINS or "").strip()
+    if origins == "*":
+        return [(b"access-control-allow-origin", b"*")]
+
+    request_origin = _header(scope, b"origin")
+    allowed = {o.strip() for o in origins.split(",") if o.strip()}
+    if request_origin and request_origin in allowed:
+        return [(b"access-control-allow-origin", request_origin.encode("latin-1")), (b"vary", b"Origin")]
+    return []
+
+def _wants_timings(scope, data: dict) -> bool:
+    query = parse_qs((scope.get("query_string") or b"").decode("latin-1"))
+    return query.get("timings", [""])[0].strip().lower() in ("1", "true", "yes") or data.get("timings") is True
+
+async def _send_json(scope, send, status: int, payload: dict, extra_headers: list = ()):
+    body = json.dumps(payload).encode("utf-8")
+    headers = [
+        (b"content-type", b"application/json"),
+        (b"content-length", str(len(body)).encode("ascii")),
+        *_cors_headers(scope),
+        *extra_headers,
+    ]
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+# ---------- async /chat
+async def chat(scope, receive, send):
+    """
+    Same contract as app.py's /chat. It reads no client address, scheme or host, so ProxyFix (applied to
+    the Flask routes) has nothing to rewrite here. A request picked for profiling (X-Profile, armed or
+    sampled) runs the sync answer_and_sources on a thread under the profiler instead: stack samples of
+    the event loop thread would mix in every other request in flight.
+    """
+    try:
+        data = json.loads(await _read_body(receive) or b"{}") or {}
+    except ValueError:
+        return await _send_json(scope, send, 400, {"error": "invalid JSON body"})
+
+    question = (data.get("question") or "").strip() if isinstance(data, dict) else ""
+    if not question:
+        log.info("Bad request: missing 'question'")
+        return await _send_json(scope, send, 400, {"error": "question is required"})
+
+    try:
+        filters = normalize_filter(data.get("filter"))
+    except ValueError as e:
+        return await _send_json(scope, send, 400, {"error": str(e)})
+
+    with_timings = _wants_timings(scope, data)
+    trigger = profiler.trigger(_header(scope, b"x-profile") == "1" and admin_token_ok(_header(scope, b"x-admin-token")))
+
+    profiler.request_started()  # the Flask routes count theirs in app.py
+    try:
+        # lazy import (important for CI); loading the model must not block the event loop
+        loop = asyncio.get_running_loop()
+        backend = await loop.run_in_executor(None, importlib.import_module, "backend")
+        if trigger is None:
+            result = await backend.aanswer_and_sources(question, with_timings=with_timings, filters=filters)
+            return await _send_json(scope, send, 200, result)
+
+        def profiled():
+            with profiler.profile(trigger, request_label("/chat", question)) as info:
+                return info["name"], backend.answer_and_sources(question, with_timings=with_timings, filters=filters)
+
+        name, result = await loop.run_in_executor(None, profiled)
+        return await _send_json(scope, send, 200, result, [(b"x-profile-id", name.encode("ascii"))])
+    except Exception:
+        log.exception("Error handling /chat request")
+        return await _send_json(scope, send, 500, {"error": "Internal server error"})
+    finally:
+        profiler.request_finished()
+
+async def lifespan(scope, receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+# ---------- ASGI entry point (gunicorn asgi:app -k uvicorn.workers.UvicornWorker)
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        return await lifespan(scope, receive, send)
+    if scope["type"] == "http" and scope["path"] == "/chat" and scope["method"] == "POST":
+        return await chat(scope, receive, send)
+    return await wsgi(scope, receive, send)
@@ -1,18 +1,26 @@
-import re, logging, hashlib
+import os, re, time, queue, asyncio, logging, hashlib, threading, contextvars
+from concurrent.futures import ThreadPoolExecutor
 
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_chroma import Chroma
 from langchain_openai import ChatOpenAI
-from openai import RateLimitError
+
+from answer_cache import AnswerCache, normalize_question
+from stream_guard import StreamGuard
+from corpus_version import read_corpus_version
+from reranker import CrossEncoderReranker
+from context_packing import pack_context
+from llm_resilience import ResilientLLM
+from single_flight import SingleFlight
+import metrics
+import retrieval
+from retrieval import embeddings, refresh_store, lexical_index, _vector_search, retrieve
 
 # ---------- logging
 logging.basicConfig(level=logging.INFO)
 log = logging.getLogger(__name__)
 
 # ---------- config
-from config import Config
-cfg = Config()
+cfg = retrieval.cfg  # one Config for both halves of the pipeline
 
 # ---------- helpers
 def has_source_citation(text: str) -> bool:
@@ -98,10 +106,7 @@ prompt = ChatPromptTemplate.from_messages([
     )
 ])
 
-# 2) Context
-embeddings = HuggingFaceEmbeddings(model_name=cfg.EMB_MODEL)
-vectordb = Chroma(persist_directory=cfg.PERSIST_DIR, embedding_function=embeddings)
-
+# 2) Context (query embeddings, the served store and retrieve() live in retrieval.py)
 def make_numbered_context(context_docs):
     """
     Returns:
@@ -132,49 +137,68 @@ def make_numbered_context(context_docs):
     return context_str, refs
 
 # 3) LLM
-llm = ChatOpenAI(
-    model_name=cfg.LLM_MODEL_NAME,
-    openai_api_key=cfg.OPENROUTER_API_KEY,
-    openai_api_base=cfg.OPENAI_API_BASE,
-    default_headers=cfg.default_headers,
-    temperature=cfg.LLM_TEMPERATURE,
-    max_tokens=cfg.LLM_MAX_TOKENS,
-    timeout=cfg.LLM_TIMEOUT,
-)
+def make_llm(model_name: str):
+    return ChatOpenAI(
+        model_name=model_name,
+        openai_api_key=cfg.OPENROUTER_API_KEY,
+        openai_api_base=cfg.OPENAI_API_BASE,
+        default_headers=cfg.default_headers,
+        temperature=cfg.LLM_TEMPERATURE,
+        max_tokens=cfg.LLM_MAX_TOKENS,
+        timeout=cfg.LLM_TIMEOUT,
+        max_retries=0,  # retries, hedging and fallback happen in ResilientLLM
+    )
 
-# 4) Answer and sources
-def answer_and_sources(question: str):
-    q = (question or "").strip()
-    if not q:
-        return {"answer": "Please provide a question.", "sources": []}
+llm = make_llm(cfg.LLM_MODEL_NAME)
+llm_fallback = make_llm(cfg.LLM_FALLBACK_MODEL) if cfg.LLM_FALLBACK_MODEL else None
+resilient_llm = ResilientLLM(
+    llm,
+    fallback=llm_fallback,
+    retries=cfg.LLM_RETRIES,
+    backoff_base_s=cfg.LLM_BACKOFF_BASE_S,
+    backoff_max_s=cfg.LLM_BACKOFF_MAX_S,
+    hedge=cfg.LLM_HEDGE,
+    hedge_min_s=cfg.LLM_HEDGE_MIN_S,
+    # every thread that calls invoke (request threads, the batch pool) can have a request and its hedge in flight
+    hedge_threads=2 * (cfg.GUNICORN_THREADS + cfg.BATCH_CONCURRENCY),
+    breaker_failures=cfg.LLM_BREAKER_FAILURES,
+    breaker_reset_s=cfg.LLM_BREAKER_RESET_S,
+)
 
-    # ---- Top-k retrieval
-    try:
-        results = vectordb.similarity_search_with_relevance_scores(q, k=cfg.TOP_K)
-    except Exception:
-        log.exception("[rag] retrieval failed")
-        return {"answer": "Request failed (retrieval).", "sources": []}
+# 4) Semantic answer cache (keyed on normalized question + corpus version)
+RETRIEVAL_FAILED_TEXT = "Request failed (retrieval)."
+LLM_FAILED_TEXT = "Request failed (LLM)."
 
-    if not results:
-        return {"answer": cfg.REFUSAL_TEXT, "sources": []}
+answer_cache = None
+if cfg.ANSWER_CACHE_ENABLED:
+    answer_cache = AnswerCache(
+        max_entries=cfg.ANSWER_CACHE_MAX_ENTRIES,
+        ttl_s=cfg.ANSWER_CACHE_TTL_S,
+        sim_threshold=cfg.ANSWER_CACHE_SIM_THRESHOLD,
+    )
 
-    results = sorted(results, key=lambda x: float(x[1]), reverse=True)
-    if float(results[0][1]) < cfg.MIN_RELEVANCE:
-        return {"answer": cfg.REFUSAL_TEXT, "sources": []}
+# Concurrent identical questions share one pipeline run (optionally across workers via SINGLE_FLIGHT_DIR)
+single_flight = SingleFlight(cfg.SINGLE_FLIGHT_DIR, cfg.SINGLE_FLIGHT_WAIT_S) if cfg.SINGLE_FLIGHT else None
 
-    # ---- Build numbered context + allowed refs
-    context_docs = [doc for doc, _ in results[:cfg.TOP_K]]
-    context_str, allowed_refs = make_numbered_context(context_docs)
+def answer_cache_stats() -> dict:
+    stats = {"enabled": False} if answer_cache is None else {"enabled": True, **answer_cache.stats()}
+    if reranker is not None:
+        stats["rerank"] = reranker.stats()
+    stats["llm"] = resilient_llm.stats()
+    if single_flight is not None:
+        stats["single_flight"] = single_flight.stats()
+    return stats
 
-    # ---- LLM call
-    try:
-        messages = prompt.format_messages(question=q, context=context_str)
-        llm_resp = llm.invoke(messages)
-        response_text = (llm_resp.content or "").strip()
-    except Exception:
-        log.exception("[rag] LLM failed")
-        return {"answer": "Request failed (LLM).", "sources": []}
+def _is_cacheable(result: dict) -> bool:
+    # Never cache transient failures; refusals and answers are stable for a corpus version.
+    return result.get("answer") not in (RETRIEVAL_FAILED_TEXT, LLM_FAILED_TEXT)
 
+# 5) Pipeline stages
+def validate_response(response_text: str, allowed_refs: dict, context_docs) -> dict:
+    """
+    Applies the length cap and strict citation checks to a complete LLM response.
+    Returns the API result (the answer, or REFUSAL_TEXT if validation fails).
+    """
     # ---- Length cap
     if len(response_text) > cfg.MAX_ANSWER_CHARS:
         response_text = response_text[:cfg.MAX_ANSWER_CHARS].rstrip() + "…"
@@ -227,4 +251,475 @@ def answer_and_sources(question: str):
 
         # useful for debugging/ablations
         "top_k": cfg.TOP_K,
-    }
\ No newline at end of file
+    }
+
+reranker = CrossEncoderReranker(cfg.RERANK_MODEL, cfg.RERANK_CACHE_SIZE) if cfg.RERANK_ENABLED else None
+
+def rerank(q: str, results: list) -> list:
+    """
+    Second stage: the RERANK_TOP_N best of the first-stage results by cross-encoder score.
+    Falls back to the first-stage top TOP_K if the reranker fails.
+    """
+    try:
+        return reranker.rerank(q, [doc for doc, _ in results], cfg.RERANK_TOP_N)
+    except Exception:
+        log.exception("[rag] rerank failed; using first-stage order")
+        return results[:cfg.TOP_K]
+
+def build_context(q: str, qvec=None, filters: dict | None = None):
+    """
+    Retrieval + relevance gate + numbered context.
+    With a reranker: retrieve RERANK_CANDIDATES, gate on the first-stage scores, keep RERANK_TOP_N.
+    CONTEXT_PACKING applies MAX_PER_SOURCE, merges adjacent chunks and fits CONTEXT_TOKEN_BUDGET.
+    Returns (result, None) when the request ends here (refusal / retrieval error),
+    otherwise (None, (context_docs, context_str, allowed_refs)).
+    """
+    # ---- Top-k retrieval
+    try:
+        k = max(cfg.TOP_K, cfg.RERANK_CANDIDATES) if reranker is not None else cfg.TOP_K
+        with metrics.stage("search"):
+            results, relevant = retrieve(q, qvec, k, filters)
+    except Exception:
+        log.exception("[rag] retrieval failed")
+        return {"answer": RETRIEVAL_FAILED_TEXT, "sources": []}, None
+    metrics.count("retrieved_chunks", len(results))
+
+    if not results:
+        return {"answer": cfg.REFUSAL_TEXT, "sources": []}, None
+
+    if not relevant:
+        return {"answer": cfg.REFUSAL_TEXT, "sources": []}, None
+
+    if reranker is not None:
+        with metrics.stage("rerank"):
+            results = rerank(q, results)
+
+    # ---- Build numbered context + allowed refs
+    with metrics.stage("pack"):
+        context_docs = [doc for doc, _ in results[:cfg.TOP_K]]
+        if cfg.CONTEXT_PACKING:
+            context_docs = pack_context(context_docs, cfg.MAX_PER_SOURCE, cfg.CONTEXT_TOKEN_BUDGET, cfg.CHUNK_OVERLAP)
+        context_str, allowed_refs = make_numbered_context(context_docs)
+    metrics.count("context_chunks", len(context_docs))
+    return None, (context_docs, context_str, allowed_refs)
+
+def _answer_uncached(q: str, qvec=None, filters: dict | None = None) -> dict:
+    early, ctx = build_context(q, qvec, filters)
+    if early is not None:
+        return early
+    return _generate(q, ctx)
+
+def _generate(q: str, ctx) -> dict:
+    """
+    LLM call + validation over a context from build_context.
+    """
+    context_docs, context_str, allowed_refs = ctx
+
+    # ---- LLM call
+    try:
+        with metrics.stage("prompt"):
+            messages = prompt.format_messages(question=q, context=context_str)
+        with metrics.stage("llm"):
+            llm_resp = resilient_llm.invoke(messages)
+        response_text = (llm_resp.content or "").strip()
+    except Exception:
+        log.exception("[rag] LLM failed")
+        return {"answer": LLM_FAILED_TEXT, "sources": []}
+    for name, value in metrics.token_usage(llm_resp).items():
+        metrics.count(name, value)
+
+    with metrics.stage("validate"):
+        return validate_response(response_text, allowed_refs, context_docs)
+
+def _embed_query(q: str):
+    with metrics.stage("embed"):
+        return embeddings.embed_query(q)
+
+def _cache_lookup(q: str, filters: dict | None = None):
+    """
+    Returns (key, version, cached_result | None, query_vector | None).
+    Raises if the query embedding fails. Filtered questions bypass the cache (key None).
+    """
+    if answer_cache is None or filters:
+        return None, None, None, None
+    key = normalize_question(q)
+    version = read_corpus_version(retrieval.store_path)
+    # Lexical mode never embeds the query, so only exact-question hits apply there.
+    embed = None if cfg.RETRIEVAL_MODE == "lexical" else (lambda: _embed_query(q))
+    cached, qvec = answer_cache.lookup(key, version, embed=embed)
+    return key, version, cached, qvec
+
+def _cache_store(key, version, result: dict, qvec):
+    if answer_cache is not None and key is not None and _is_cacheable(result):
+        answer_cache.put(key, result, version, vec=qvec)
+
+# 6) Answer and sources
+def _flight_key(q: str, filters: dict | None = None) -> str:
+    scope = "".join(f"\n{field}={','.join(values)}" for field, values in sorted((filters or {}).items()))
+    return f"{read_corpus_version(retrieval.store_path)}\n{normalize_question(q)}{scope}"
+
+def _outcome(result: dict, timings: metrics.RequestTimings) -> str:
+    answer = result.get("answer")
+    if result.get("cached"):
+        return "cached"
+    if answer == RETRIEVAL_FAILED_TEXT:
+        return "retrieval_error"
+    if answer == LLM_FAILED_TEXT:
+        return "llm_error"
+    if answer == cfg.REFUSAL_TEXT:
+        # After an LLM call the refusal comes from the citation checks; before it, from the relevance gate
+        return "validation_refusal" if "llm" in timings.stages else "low_relevance_refusal"
+    if "i cannot answer" in (answer or "").lower():
+        return "model_refusal"
+    return "answered"
+
+def _finish(result: dict, outcome: str, timings: metrics.RequestTimings, with_timings: bool) -> dict:
+    timings.finish(outcome)
+    return {**result, "timings": timings.as_dict()} if with_timings else result
+
+def answer_and_sources(question: str, with_timings: bool = False, filters: dict | None = None):
+    """
+    Records per-stage timings in the Prometheus metrics; with_timings=True also adds them to the result.
+    filters (sharded_store.normalize_filter) limits retrieval to some sources / doc types.
+    """
+    q = (question or "").strip()
+    if not q:
+        return {"answer": "Please provide a question.", "sources": []}
+
+    refresh_store()
+    timings = metrics.RequestTimings()
+    with metrics.track(timings):
+        if single_flight is None:
+            result, outcome = _answer_and_sources(q, filters)
+        else:
+            # The leader's outcome travels with its result, so coalesced requests are labelled like it
+            (result, outcome), timings.coalesced = single_flight.do(
+                _flight_key(q, filters), lambda: _answer_and_sources(q, filters), share=lambda r: _is_cacheable(r[0])
+            )
+            result = dict(result)
+            if isinstance(result.get("sources"), dict):  # from another worker's JSON file: "1" -> 1
+                result["sources"] = {int(n): ref for n, ref in result["sources"].items()}
+    return _finish(result, outcome, timings, with_timings)
+
+def _answer_and_sources(q: str, filters: dict | None = None):
+    """
+    Returns (result, outcome), the outcome read from the current request's timings.
+    """
+    result = _answer_pipeline(q, filters)
+    return result, _outcome(result, metrics.current())
+
+def _answer_pipeline(q: str, filters: dict | None = None):
+    try:
+        key, version, cached, qvec = _cache_lookup(q, filters)
+    except Exception:
+        log.exception("[rag] query embedding failed")
+        return {"answer": RETRIEVAL_FAILED_TEXT, "sources": [], "cached": False}
+
+    if cached is not None:
+        return {**cached, "cached": True}
+
+    result = _answer_uncached(q, qvec, filters)
+    _cache_store(key, version, result, qvec)
+    return {**result, "cached": False}
+
+# 7) Async answer (ASGI serving): same stages, LLM via ainvoke, CPU-bound retrieval on a bounded pool
+_retrieval_pool = ThreadPoolExecutor(max_workers=cfg.RETRIEVAL_THREADS, thread_name_prefix="rag-retrieval")
+
+async def _in_retrieval_pool(fn, *args):
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()  # keeps the request's timings
+    return await loop.run_in_executor(_retrieval_pool, ctx.run, fn, *args)
+
+async def aanswer_and_sources(question: str, with_timings: bool = False, filters: dict | None = None):
+    """
+    Async variant of answer_and_sources; returns identical results.
+    Embedding + vector search run on the retrieval pool so the event loop
+    only ever waits on the LLM call. Identical questions coalesce within the worker.
+    """
+    q = (question or "").strip()
+    if not q:
+        return {"answer": "Please provide a question.", "sources": []}
+
+    refresh_store()
+    timings = metrics.RequestTimings()
+    with metrics.track(timings):
+        if single_flight is None:
+            result, outcome = await _aanswer_and_sources(q, filters)
+        else:
+            (result, outcome), timings.coalesced = await single_flight.ado(
+                _flight_key(q, filters), lambda: _aanswer_and_sources(q, filters)
+            )
+            result = dict(result)
+    return _finish(result, outcome, timings, with_timings)
+
+async def _aanswer_and_sources(q: str, filters: dict | None = None):
+    result = await _aanswer_pipeline(q, filters)
+    return result, _outcome(result, metrics.current())
+
+async def _aanswer_pipeline(q: str, filters: dict | None = None):
+    try:
+        key, version, cached, qvec = await _in_retrieval_pool(_cache_lookup, q, filters)
+    except Exception:
+        log.exception("[rag] query embedding failed")
+        return {"answer": RETRIEVAL_FAILED_TEXT, "sources": [], "cached": False}
+
+    if cached is not None:
+        return {**cached, "cached": True}
+
+    early, ctx = await _in_retrieval_pool(build_context, q, qvec, filters)
+    if early is not None:
+        _cache_store(key, version, early, qvec)
+        return {**early, "cached": False}
+    context_docs, context_str, allowed_refs = ctx
+
+    # ---- LLM call
+    try:
+        with metrics.stage("prompt"):
+            messages = prompt.format_messages(question=q, context=context_str)
+        with metrics.stage("llm"):
+            llm_resp = await resilient_llm.ainvoke(messages)
+        response_text = (llm_resp.content or "").strip()
+    except Exception:
+        log.exception("[rag] LLM failed")
+        result = {"answer": LLM_FAILED_TEXT, "sources": []}
+    else:
+        for name, value in metrics.token_usage(llm_resp).items():
+            metrics.count(name, value)
+        with metrics.stage("validate"):
+            result = validate_response(response_text, allowed_refs, context_docs)
+
+    _cache_store(key, version, result, qvec)
+    return {**result, "cached": False}
+
+# 8) Streaming answer
+def stream_answer(question: str, filters: dict | None = None):
+    """
+    Streaming variant of answer_and_sources. Yields event dicts:
+      {"event": "line",  "text": "..."}       each answer line once it passes the checks
+      {"event": "abort", "reason": "..."}     generation stopped on a rule violation
+      {"event": "done",  "result": {...}}     final result, same shape as answer_and_sources
+    The "done" result is authoritative (it may be REFUSAL_TEXT after streamed lines).
+    """
+    q = (question or "").strip()
+    if not q:
+        yield {"event": "done", "result": {"answer": "Please provide a question.", "sources": []}}
+        return
+
+    refresh_store()
+    try:
+        key, version, cached, qvec = _cache_lookup(q, filters)
+    except Exception:
+        log.exception("[rag] query embedding failed")
+        yield {"event": "done", "result": {"answer": RETRIEVAL_FAILED_TEXT, "sources": [], "cached": False}}
+        return
+
+    if cached is not None:
+        for line in cached["answer"].split("\n"):
+            yield {"event": "line", "text": line}
+        yield {"event": "done", "result": {**cached, "cached": True}}
+        return
+
+    early, ctx = build_context(q, qvec, filters)
+    if early is not None:
+        _cache_store(key, version, early, qvec)
+        yield {"event": "done", "result": {**early, "cached": False}}
+        return
+    context_docs, context_str, allowed_refs = ctx
+
+    guard = StreamGuard(allowed_refs, cfg.MAX_ANSWER_CHARS)
+    messages = prompt.format_messages(question=q, context=context_str)
+    chunks = None
+    try:
+        chunks = resilient_llm.stream(messages)
+        for chunk in chunks:
+            for line in guard.feed(chunk.content):
+                yield {"event": "line", "text": line}
+            if guard.violation or guard.over_limit:
+                break  # closing the stream below drops the HTTP response -> provider stops generating
+    except Exception:
+        log.exception("[rag] LLM stream failed")
+        yield {"event": "done", "result": {"answer": LLM_FAILED_TEXT, "sources": [], "cached": False}}
+        return
+    finally:
+        if chunks is not None:
+            chunks.close()
+
+    if guard.violation:
+        log.info("[rag] stream aborted: %s", guard.violation)
+        yield {"event": "abort", "reason": guard.violation}
+        result = {"answer": cfg.REFUSAL_TEXT, "sources": []}
+    else:
+        for line in guard.finish():
+            yield {"event": "line", "text": line}
+        result = validate_response(guard.text.strip(), allowed_refs, context_docs)
+
+    _cache_store(key, version, result, qvec)
+    yield {"event": "done", "result": {**result, "cached": False}}
+
+# 9) Batch answers
+# LLM calls of every batch in this worker share one pool: BATCH_CONCURRENCY is a per-worker limit, not per request
+_batch_llm_pool = ThreadPoolExecutor(max_workers=cfg.BATCH_CONCURRENCY, thread_name_prefix="rag-batch")
+
+def answer_many(questions: list[str], with_timings: bool = False, filters: dict | None = None) -> list[dict]:
+    """
+    answer_and_sources for many questions at once, results in input order (see iter_answer_many).
+    """
+    results = [None] * len(questions)
+    for i, result in iter_answer_many(questions, with_timings, filters):
+        results[i] = result
+    return results
+
+def iter_answer_many(questions: list[str], with_timings: bool = False, filters: dict | None = None):
+    """
+    Yields (index, result) as each question finishes; results have the shape of answer_and_sources,
+    or {"error": ...} for a question that failed unexpectedly (the others are unaffected).
+      1. one embedding call for all the questions (also used for the semantic cache lookups)
+      2. retrieval for every cache miss at once on the retrieval pool
+      3. each LLM call as soon as its context is ready, on the worker's batch pool (BATCH_CONCURRENCY at a time)
+    Questions that normalize to the same text are answered once. Every question is recorded in the
+    request metrics; single flight is not used.
+    """
+    refresh_store()
+    groups = {}  # normalized question -> (question, [indexes])
+    for i, question in enumerate(questions):
+        q = (question or "").strip()
+        if not q:
+            yield i, {"answer": "Please provide a question.", "sources": []}
+            continue
+        groups.setdefault(normalize_question(q), (q, []))[1].append(i)
+    if not groups:
+        return
+
+    keys = list(groups)
+    timings = {key: metrics.RequestTimings() for key in keys}
+    for t in timings.values():
+        t.count("batch_size", len(keys))
+
+    # ---- 1. query embeddings, one batch
+    vecs = [None] * len(keys)
+    embed_failed = False
+    if cfg.RETRIEVAL_MODE != "lexical":
+        t0 = time.perf_counter()
+        try:
+            vecs = embeddings.embed_documents([groups[key][0] for key in keys])
+        except Exception:
+            log.exception("[rag] batch query embedding failed")
+            embed_failed = True
+        for t in timings.values():
+            t.stages["embed"] = time.perf_counter() - t0
+    vec_of = dict(zip(keys, vecs))
+
+    version = read_corpus_version(retrieval.store_path)
+    cacheable = answer_cache is not None and not filters
+
+    def finish(key, result):
+        t = timings[key]
+        if "error" not in result:
+            if not result.get("cached"):
+                _cache_store(key if cacheable else None, version, result, vec_of[key])
+                result = {**result, "cached": False}
+            result = _finish(result, _outcome(result, t), t, with_timings)
+        return [(i, dict(result)) for i in groups[key][1]]
+
+    # ---- cache hits and embedding failures finish right away
+    todo = []
+    for key in keys:
+        if embed_failed:
+            yield from finish(key, {"answer": RETRIEVAL_FAILED_TEXT, "sources": []})
+            continue
+        if cacheable:
+            vec = vec_of[key]
+            cached, _ = answer_cache.lookup(key, version, embed=(lambda v=vec: v) if vec is not None else None)
+            if cached is not None:
+                yield from finish(key, {**cached, "cached": True})
+                continue
+        todo.append(key)
+    if not todo:
+        return
+
+    # ---- 2 + 3. retrieval on the retrieval pool, LLM calls on the batch pool
+    done = queue.Queue()
+    closed = threading.Event()
+    generations = []
+
+    def search(key):
+        with metrics.track(timings[key]):
+            return build_context(groups[key][0], vec_of[key], filters)
+
+    def generate(key, ctx):
+        if closed.is_set():  # submitted just before the consumer went away
+            return
+        try:
+            with metrics.track(timings[key]):
+                done.put((key, _generate(groups[key][0], ctx)))
+        except Exception:
+            log.exception("[rag] batch item failed")
+            done.put((key, {"error": "Internal server error"}))
+
+    def searched(key, fut):
+        if fut.cancelled():
+            return
+        try:
+            early, ctx = fut.result()
+        except Exception:
+            log.exception("[rag] batch item failed")
+            done.put((key, {"error": "Internal server error"}))
+            return
+        if early is not None:
+            done.put((key, early))
+            return
+        if not closed.is_set():
+            generations.append(_batch_llm_pool.submit(generate, key, ctx))
+
+    searches = []
+    try:
+        for key in todo:
+            fut = _retrieval_pool.submit(search, key)
+            fut.add_done_callback(lambda f, key=key: searched(key, f))
+            searches.append(fut)
+        for _ in todo:
+            key, result = done.get()
+            yield from finish(key, result)
+    finally:
+        # The consumer may stop early (client gone): drop the work not started yet
+        closed.set()
+        for fut in searches + generations:
+            fut.cancel()
+
+# 10) Warmup / readiness
+_ready = threading.Event()
+
+def is_ready() -> bool:
+    return _ready.is_set()
+
+def warmup() -> float:
+    """
+    One query embedding + vector search (and the side indexes in use; with RETRIEVAL_MODE=lexical and a BM25
+    index, only that) so the first real request doesn't pay for lazy init. Returns the seconds taken; is_ready() is True afterwards.
+    """
+    t0 = time.perf_counter()
+    refresh_store()
+    if cfg.RETRIEVAL_MODE != "lexical" or lexical_index() is None:  # lexical mode with its index loads no model
+        qvec = embeddings.embed_query("warmup")
+        _vector_search("warmup", qvec, cfg.TOP_K)
+    if cfg.RETRIEVAL_MODE != "vector":
+        lexical_index()
+    if reranker is not None:
+        reranker.model.predict([("warmup", "warmup")])
+    _ready.set()
+
+    seconds = time.perf_counter() - t0
+    log.info("[rag] warmup done in %.2fs (pid %s)", seconds, os.getpid())
+    return seconds
+
+def reopen_vectordb():
+    """
+    For gunicorn workers forked from a preloaded master: the Chroma client (sqlite connection,
+    background threads) must not be shared across processes, so each worker opens its own.
+    The embedding model is kept as is, its weights stay shared copy-on-write.
+    """
+    _ready.clear()
+    retrieval.reopen_store()
+
+# ---------- keep last: app.loaded_backend() only uses this module once its import has finished
+IMPORT_DONE = True
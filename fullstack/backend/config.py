@@ -8,6 +8,9 @@ log = logging.getLogger(__name__)
 # ---------- .env
 load_dotenv()
 
+def _as_bool(value) -> bool:
+    return str(value).strip().lower() in ("1", "true", "yes")
+
 class Config:
     def __init__(self):
         self.SEED = os.getenv("SEED")
@@ -39,6 +42,78 @@ class Config:
         self.ALLOWED_ORIGINS = os.getenv("ALLOWED_ORIGINS")
         self.PORT = os.getenv("PORT")
 
+        # ---------- optional (defaults apply when unset)
+        self.ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "1")
+        self.ANSWER_CACHE_MAX_ENTRIES = os.getenv("ANSWER_CACHE_MAX_ENTRIES", "512")
+        self.ANSWER_CACHE_TTL_S = os.getenv("ANSWER_CACHE_TTL_S", "3600")
+        self.ANSWER_CACHE_SIM_THRESHOLD = os.getenv("ANSWER_CACHE_SIM_THRESHOLD", "0.97")
+
+        self.SINGLE_FLIGHT = os.getenv("SINGLE_FLIGHT", "1")
+        self.SINGLE_FLIGHT_DIR = os.getenv("SINGLE_FLIGHT_DIR", "")
+        self.SINGLE_FLIGHT_WAIT_S = os.getenv("SINGLE_FLIGHT_WAIT_S", "60")
+
+        self.ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+        self.PROFILE_DIR = os.getenv("PROFILE_DIR", "")
+        self.PROFILE_SAMPLE_RATE = os.getenv("PROFILE_SAMPLE_RATE", "0")
+        self.PROFILE_FORMAT = os.getenv("PROFILE_FORMAT", "collapsed")
+        self.PROFILE_INTERVAL_MS = os.getenv("PROFILE_INTERVAL_MS", "5")
+        self.PROFILE_MAX_FILES = os.getenv("PROFILE_MAX_FILES", "200")
+
+        self.RETRIEVAL_THREADS = os.getenv("RETRIEVAL_THREADS", "4")
+        self.BATCH_MAX_QUESTIONS = os.getenv("BATCH_MAX_QUESTIONS", "256")
+        self.BATCH_CONCURRENCY = os.getenv("BATCH_CONCURRENCY", "8")
+        self.RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "vector")
+        self.SEARCH_ENGINE = os.getenv("SEARCH_ENGINE", "chroma")
+        self.QUANT_MODE = os.getenv("QUANT_MODE", "int8")
+        self.QUANT_CANDIDATES = os.getenv("QUANT_CANDIDATES", "50")
+        self.SHARD_BY = os.getenv("SHARD_BY", "")
+        self.SHARD_THREADS = os.getenv("SHARD_THREADS", "4")
+        self.SHARD_ROUTING = os.getenv("SHARD_ROUTING", "1")
+        self.HYBRID_CANDIDATES = os.getenv("HYBRID_CANDIDATES", "20")
+        self.RRF_K = os.getenv("RRF_K", "60")
+        self.LEXICAL_MIN_SCORE = os.getenv("LEXICAL_MIN_SCORE", "2.0")
+
+        self.CONTEXT_PACKING = os.getenv("CONTEXT_PACKING", "1")
+        self.CONTEXT_TOKEN_BUDGET = os.getenv("CONTEXT_TOKEN_BUDGET", "1500")
+
+        self.RERANK_ENABLED = os.getenv("RERANK_ENABLED", "0")
+        self.RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+        self.RERANK_CANDIDATES = os.getenv("RERANK_CANDIDATES", "20")
+        self.RERANK_TOP_N = os.getenv("RERANK_TOP_N", "3")
+        self.RERANK_CACHE_SIZE = os.getenv("RERANK_CACHE_SIZE", "4096")
+
+        self.LLM_RETRIES = os.getenv("LLM_RETRIES", "2")
+        self.LLM_BACKOFF_BASE_S = os.getenv("LLM_BACKOFF_BASE_S", "0.5")
+        self.LLM_BACKOFF_MAX_S = os.getenv("LLM_BACKOFF_MAX_S", "8")
+        self.LLM_HEDGE = os.getenv("LLM_HEDGE", "0")
+        self.LLM_HEDGE_MIN_S = os.getenv("LLM_HEDGE_MIN_S", "1.0")
+        self.GUNICORN_THREADS = os.getenv("GUNICORN_THREADS", "2")  # as in gunicorn.conf.py; sizes the hedge pool
+        self.LLM_BREAKER_FAILURES = os.getenv("LLM_BREAKER_FAILURES", "5")
+        self.LLM_BREAKER_RESET_S = os.getenv("LLM_BREAKER_RESET_S", "30")
+        self.LLM_FALLBACK_MODEL = os.getenv("LLM_FALLBACK_MODEL", "")
+
+        self.INGEST_MODE = os.getenv("INGEST_MODE", "full")
+        self.INGEST_LOAD_WORKERS = os.getenv("INGEST_LOAD_WORKERS", "1")
+        self.INGEST_EMBED_BATCH = os.getenv("INGEST_EMBED_BATCH", "64")
+        self.INGEST_PREFETCH_FILES = os.getenv("INGEST_PREFETCH_FILES", "4")
+        self.INGEST_RESUME = os.getenv("INGEST_RESUME", "1")
+        self.STORE_VERSIONS = os.getenv("STORE_VERSIONS", "0")
+        self.STORE_KEEP_VERSIONS = os.getenv("STORE_KEEP_VERSIONS", "2")
+        self.EMBED_CACHE_ENABLED = os.getenv("EMBED_CACHE_ENABLED", "1")
+        self.EMBED_CACHE_DIR = os.getenv("EMBED_CACHE_DIR", "")
+        self.PARSE_CACHE_ENABLED = os.getenv("PARSE_CACHE_ENABLED", "1")
+        self.PARSE_CACHE_DIR = os.getenv("PARSE_CACHE_DIR", "")
+
+        self.EMBED_SERVICE_SOCKET = os.getenv("EMBED_SERVICE_SOCKET", "")
+        self.EMBED_MICROBATCH = os.getenv("EMBED_MICROBATCH", "0")
+        self.EMBED_BATCH_MAX = os.getenv("EMBED_BATCH_MAX", "32")
+        self.EMBED_BATCH_WAIT_MS = os.getenv("EMBED_BATCH_WAIT_MS", "5")
+
+        self.EMB_QUANTIZE = os.getenv("EMB_QUANTIZE", "0")
+        self.EMB_THREADS = os.getenv("EMB_THREADS", "0")
+        self.EMB_INFERENCE_MODE = os.getenv("EMB_INFERENCE_MODE", "1")
+        self.EMB_DRIFT_WARN = os.getenv("EMB_DRIFT_WARN", "0.98")
+
         self._validate()
         self._normalize()
 
@@ -110,6 +185,96 @@ class Config:
         self.ALLOWED_ORIGINS = self.ALLOWED_ORIGINS
         self.PORT = int(self.PORT)
 
+        self.ANSWER_CACHE_ENABLED = _as_bool(self.ANSWER_CACHE_ENABLED)
+        self.ANSWER_CACHE_MAX_ENTRIES = int(self.ANSWER_CACHE_MAX_ENTRIES)
+        self.ANSWER_CACHE_TTL_S = float(self.ANSWER_CACHE_TTL_S)
+        self.ANSWER_CACHE_SIM_THRESHOLD = float(self.ANSWER_CACHE_SIM_THRESHOLD)
+
+        self.SINGLE_FLIGHT = _as_bool(self.SINGLE_FLIGHT)
+        self.SINGLE_FLIGHT_DIR = self.SINGLE_FLIGHT_DIR.strip()
+        self.SINGLE_FLIGHT_WAIT_S = max(0.0, float(self.SINGLE_FLIGHT_WAIT_S))
+
+        self.ADMIN_TOKEN = self.ADMIN_TOKEN.strip()
+        self.PROFILE_DIR = self.PROFILE_DIR.strip() or os.path.join(
+            os.path.dirname(os.path.abspath(self.PERSIST_DIR)), "profiles"
+        )
+        self.PROFILE_SAMPLE_RATE = min(1.0, max(0.0, float(self.PROFILE_SAMPLE_RATE)))
+        self.PROFILE_FORMAT = self.PROFILE_FORMAT.strip().lower()
+        if self.PROFILE_FORMAT not in ("collapsed", "pstats"):
+            raise RuntimeError(f"[backend] PROFILE_FORMAT must be 'collapsed' or 'pstats', got: {self.PROFILE_FORMAT}")
+        self.PROFILE_INTERVAL_MS = max(1.0, float(self.PROFILE_INTERVAL_MS))
+        self.PROFILE_MAX_FILES = max(1, int(self.PROFILE_MAX_FILES))
+
+        self.RETRIEVAL_THREADS = max(1, int(self.RETRIEVAL_THREADS))
+        self.BATCH_MAX_QUESTIONS = max(1, int(self.BATCH_MAX_QUESTIONS))
+        self.BATCH_CONCURRENCY = max(1, int(self.BATCH_CONCURRENCY))
+        self.RETRIEVAL_MODE = self.RETRIEVAL_MODE.strip().lower()
+        if self.RETRIEVAL_MODE not in ("vector", "hybrid", "lexical"):
+            raise RuntimeError(f"[backend] RETRIEVAL_MODE must be 'vector', 'hybrid' or 'lexical', got: {self.RETRIEVAL_MODE}")
+        self.SEARCH_ENGINE = self.SEARCH_ENGINE.strip().lower()
+        if self.SEARCH_ENGINE not in ("chroma", "numpy", "quantized"):
+            raise RuntimeError(f"[backend] SEARCH_ENGINE must be 'chroma', 'numpy' or 'quantized', got: {self.SEARCH_ENGINE}")
+        self.QUANT_MODE = self.QUANT_MODE.strip().lower()
+        if self.QUANT_MODE not in ("int8", "binary"):
+            raise RuntimeError(f"[backend] QUANT_MODE must be 'int8' or 'binary', got: {self.QUANT_MODE}")
+        self.QUANT_CANDIDATES = max(1, int(self.QUANT_CANDIDATES))
+        self.SHARD_BY = self.SHARD_BY.strip().lower()
+        if self.SHARD_BY not in ("", "source", "doc_type"):
+            raise RuntimeError(f"[backend] SHARD_BY must be empty, 'source' or 'doc_type', got: {self.SHARD_BY}")
+        self.SHARD_THREADS = max(1, int(self.SHARD_THREADS))
+        self.SHARD_ROUTING = _as_bool(self.SHARD_ROUTING)
+        self.HYBRID_CANDIDATES = int(self.HYBRID_CANDIDATES)
+        self.RRF_K = int(self.RRF_K)
+        self.LEXICAL_MIN_SCORE = float(self.LEXICAL_MIN_SCORE)
+
+        self.CONTEXT_PACKING = _as_bool(self.CONTEXT_PACKING)
+        self.CONTEXT_TOKEN_BUDGET = max(0, int(self.CONTEXT_TOKEN_BUDGET))
+
+        self.RERANK_ENABLED = _as_bool(self.RERANK_ENABLED)
+        self.RERANK_MODEL = self.RERANK_MODEL.strip()
+        self.RERANK_CANDIDATES = max(1, int(self.RERANK_CANDIDATES))
+        self.RERANK_TOP_N = max(1, int(self.RERANK_TOP_N))
+        self.RERANK_CACHE_SIZE = max(0, int(self.RERANK_CACHE_SIZE))
+
+        self.LLM_RETRIES = max(0, int(self.LLM_RETRIES))
+        self.LLM_BACKOFF_BASE_S = max(0.0, float(self.LLM_BACKOFF_BASE_S))
+        self.LLM_BACKOFF_MAX_S = max(0.0, float(self.LLM_BACKOFF_MAX_S))
+        self.LLM_HEDGE = _as_bool(self.LLM_HEDGE)
+        self.LLM_HEDGE_MIN_S = max(0.0, float(self.LLM_HEDGE_MIN_S))
+        self.GUNICORN_THREADS = max(1, int(self.GUNICORN_THREADS))
+        self.LLM_BREAKER_FAILURES = max(0, int(self.LLM_BREAKER_FAILURES))
+        self.LLM_BREAKER_RESET_S = max(0.0, float(self.LLM_BREAKER_RESET_S))
+        self.LLM_FALLBACK_MODEL = self.LLM_FALLBACK_MODEL.strip()
+
+        self.INGEST_MODE = self.INGEST_MODE.strip().lower()
+        if self.INGEST_MODE not in ("full", "incremental"):
+            raise RuntimeError(f"[backend] INGEST_MODE must be 'full' or 'incremental', got: {self.INGEST_MODE}")
+        self.INGEST_LOAD_WORKERS = max(1, int(self.INGEST_LOAD_WORKERS))
+        self.INGEST_EMBED_BATCH = max(1, int(self.INGEST_EMBED_BATCH))
+        self.INGEST_PREFETCH_FILES = max(1, int(self.INGEST_PREFETCH_FILES))
+        self.INGEST_RESUME = _as_bool(self.INGEST_RESUME)
+        self.STORE_VERSIONS = _as_bool(self.STORE_VERSIONS)
+        self.STORE_KEEP_VERSIONS = max(1, int(self.STORE_KEEP_VERSIONS))  # idle workers still serve the previous one
+        self.EMBED_CACHE_ENABLED = _as_bool(self.EMBED_CACHE_ENABLED)
+        # Default: next to PERSIST_DIR (not inside it, so INGEST_RESET keeps the cache)
+        self.EMBED_CACHE_DIR = self.EMBED_CACHE_DIR.strip() or os.path.join(
+            os.path.dirname(os.path.abspath(self.PERSIST_DIR)), "embedding_cache"
+        )
+        self.PARSE_CACHE_ENABLED = _as_bool(self.PARSE_CACHE_ENABLED)
+        self.PARSE_CACHE_DIR = self.PARSE_CACHE_DIR.strip() or os.path.join(
+            os.path.dirname(os.path.abspath(self.PERSIST_DIR)), "parse_cache"
+        )
+
+        self.EMBED_SERVICE_SOCKET = self.EMBED_SERVICE_SOCKET.strip()
+        self.EMBED_MICROBATCH = _as_bool(self.EMBED_MICROBATCH)
+        self.EMBED_BATCH_MAX = max(1, int(self.EMBED_BATCH_MAX))
+        self.EMBED_BATCH_WAIT_MS = max(0.0, float(self.EMBED_BATCH_WAIT_MS))
+
+        self.EMB_QUANTIZE = _as_bool(self.EMB_QUANTIZE)
+        self.EMB_THREADS = max(0, int(self.EMB_THREADS))
+        self.EMB_INFERENCE_MODE = _as_bool(self.EMB_INFERENCE_MODE)
+        self.EMB_DRIFT_WARN = float(self.EMB_DRIFT_WARN)
+
         headers = {}
         if self.OPENROUTER_SITE_URL:
             headers["HTTP-Referer"] = self.OPENROUTER_SITE_URL
@@ -0,0 +1,87 @@
+from collections import Counter
+
+# ---------- helpers
+def approx_tokens(text: str) -> int:
+    """
+    ~4 characters per token; close enough for budgeting English prose without a tokenizer download.
+    """
+    return (len(text or "") + 3) // 4
+
+def overlap_length(a: str, b: str, max_len: int | None = None, min_len: int = 8) -> int:
+    """
+    Length of the longest suffix of a that is also a prefix of b (the splitter's CHUNK_OVERLAP), else 0.
+    """
+    n = min(len(a), len(b), max_len if max_len is not None else len(b))
+    for size in range(n, min_len - 1, -1):
+        if a.endswith(b[:size]):
+            return size
+    return 0
+
+def merge_texts(a: str, b: str, max_overlap: int | None = None) -> str:
+    n = overlap_length(a, b, max_overlap)
+    return a + b[n:] if n else a + "\n" + b
+
+# ---------- packing
+def _merge_run(run: list, max_overlap):
+    """
+    run: [(chunk_index, rank, doc)] with consecutive chunk indexes. Returns (best rank, doc).
+    """
+    if len(run) == 1:
+        return run[0][1], run[0][2]
+
+    text = run[0][2].page_content
+    for _, _, doc in run[1:]:
+        text = merge_texts(text, doc.page_content, max_overlap)
+
+    best_rank, best = min(((rank, doc) for _, rank, doc in run), key=lambda x: x[0])
+    metadata = dict(best.metadata)
+    metadata["merged_chunk_ids"] = [doc.metadata.get("chunk_id") for _, _, doc in run]
+    return best_rank, type(best)(page_content=text, metadata=metadata)
+
+def pack_context(docs: list, max_per_source: int = 0, token_budget: int = 0,
+                 max_overlap: int | None = None, count_tokens=approx_tokens) -> list:
+    """
+    docs: retrieved Documents, best-first. Returns the Documents to number and send, best-first:
+      1. at most max_per_source chunks per source file (0 = no cap)
+      2. chunks of the same source + page with consecutive chunk_index are merged into one,
+         dropping the text the splitter repeated between them
+      3. blocks are added in relevance order while they fit in token_budget (0 = no budget);
+         a block that doesn't fit is skipped, the best one is always kept
+    Labels stay "<file> p.<page>" since merged blocks never cross a page.
+    """
+    per_source = Counter()
+    kept = []
+    for doc in docs:
+        source = doc.metadata.get("source", "unknown")
+        if max_per_source > 0 and per_source[source] >= max_per_source:
+            continue
+        per_source[source] += 1
+        kept.append(doc)
+
+    groups = {}  # (source, page) -> [(chunk_index, rank, doc)]
+    for rank, doc in enumerate(kept):
+        idx = doc.metadata.get("chunk_index")
+        key = (doc.metadata.get("source", "unknown"), doc.metadata.get("page")) if isinstance(idx, int) else ("", rank)
+        groups.setdefault(key, []).append((idx if isinstance(idx, int) else 0, rank, doc))
+
+    blocks = []
+    for members in groups.values():
+        members.sort(key=lambda m: m[0])
+        run = [members[0]]
+        for m in members[1:]:
+            if m[0] == run[-1][0] + 1:
+                run.append(m)
+            else:
+                blocks.append(_merge_run(run, max_overlap))
+                run = [m]
+        blocks.append(_merge_run(run, max_overlap))
+    blocks.sort(key=lambda b: b[0])
+
+    packed, used = [], 0
+    for _, doc in blocks:
+        cost = count_tokens(doc.page_content)
+        if packed and token_budget > 0 and used + cost > token_budget:
+            continue
+        packed.append(doc)
+        used += cost
+    return packed
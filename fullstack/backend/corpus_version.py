@@ -0,0 +1,47 @@
+import os, json, logging
+
+# ---------- logging
+logging.basicConfig(level=logging.INFO)
+log = logging.getLogger(__name__)
+
+VERSION_FILE = "corpus_version.json"
+UNVERSIONED = "unversioned"
+
+_memo = {}  # version file path -> (mtime_ns, version)
+
+def write_corpus_version(persist_dir: str, run_id: str, **extra) -> str:
+    """
+    Record the ingest run that produced the store in <persist_dir>/corpus_version.json.
+    Written via a temp file + os.replace so readers never see a partial file.
+    """
+    path = os.path.join(persist_dir, VERSION_FILE)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"version": run_id, **extra}, f, indent=2)
+    os.replace(tmp, path)
+    return run_id
+
+def read_corpus_version(persist_dir: str) -> str:
+    """
+    Returns the version string of the store in persist_dir, or "unversioned"
+    for stores built before versions were recorded. Re-reads only when the file changes.
+    """
+    path = os.path.join(persist_dir, VERSION_FILE)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return UNVERSIONED
+
+    memo = _memo.get(path)
+    if memo and memo[0] == mtime:
+        return memo[1]
+
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            version = str(json.load(f).get("version") or UNVERSIONED)
+    except Exception:
+        log.exception("[corpus] Could not read %s", path)
+        return UNVERSIONED
+
+    _memo[path] = (mtime, version)
+    return version
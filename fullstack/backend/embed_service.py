@@ -0,0 +1,237 @@
+import os, time, queue, socket, struct, logging, threading, socketserver
+from concurrent.futures import Future
+
+import numpy as np
+
+# ---------- logging
+logging.basicConfig(level=logging.INFO)
+log = logging.getLogger(__name__)
+
+# ---------- micro-batching
+class BatchedEmbeddings:
+    """
+    Groups concurrent embed_query calls into one embed_documents call on the wrapped model.
+
+    A single batcher thread takes the first waiting query, then collects more for up to
+    max_wait_ms (or until max_batch) and runs them as one forward pass. Callers block on
+    their own Future. The thread is (re)started lazily per process, so an instance built
+    before a gunicorn fork keeps working in the workers.
+    """
+
+    def __init__(self, base, max_batch: int = 32, max_wait_ms: float = 5.0):
+        self.base = base
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+
+        self.batches = 0
+        self.texts = 0
+
+        self._lock = threading.Lock()
+        self._pid = None
+        self._queue = None
+
+    def _ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._queue = queue.Queue()
+                threading.Thread(target=self._run, args=(self._queue,), name="embed-batcher", daemon=True).start()
+                self._pid = os.getpid()
+
+    def _run(self, q):
+        while True:
+            batch = [q.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(q.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+
+            try:
+                vectors = self.base.embed_documents([text for text, _ in batch])
+            except Exception as e:
+                for _, fut in batch:
+                    fut.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.texts += len(batch)
+            for (_, fut), vec in zip(batch, vectors):
+                fut.set_result([float(x) for x in vec])
+
+    def embed_query(self, text: str) -> list[float]:
+        self._ensure_started()
+        fut = Future()
+        self._queue.put((text, fut))
+        return fut.result()
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.base.embed_documents(texts)  # already a batch
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "texts": self.texts,
+            "avg_batch": (self.texts / self.batches) if self.batches else 0.0,
+        }
+
+# ---------- wire protocol (Unix socket, one connection per client thread, many requests each)
+#   request:  1 byte op, u32 n, then n x (u32 length, utf-8 text)
+#             op "q": one query text, micro-batched with the other clients' queries (embed_query)
+#             op "d": a batch of texts, embedded together in one call (embed_documents)
+#   response: i32 n, u32 dim, then n x dim float32 values; n = -1 -> u32 length, utf-8 error message
+_U32 = struct.Struct(">I")
+_I32 = struct.Struct(">i")
+OP_QUERY = b"q"
+OP_DOCUMENTS = b"d"
+
+def _pack_texts(op: bytes, texts: list[str]) -> bytes:
+    parts = [op, _U32.pack(len(texts))]
+    for text in texts:
+        data = text.encode("utf-8")
+        parts += [_U32.pack(len(data)), data]
+    return b"".join(parts)
+
+def _recv_exact(sock, n: int) -> bytes:
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            raise ConnectionError("embedding service connection closed")
+        buf += chunk
+    return bytes(buf)
+
+class _Handler(socketserver.BaseRequestHandler):
+    def _read_texts(self) -> tuple[bytes, list[str]]:
+        op = _recv_exact(self.request, 1)
+        (n,) = _U32.unpack(_recv_exact(self.request, _U32.size))
+        texts = []
+        for _ in range(n):
+            (size,) = _U32.unpack(_recv_exact(self.request, _U32.size))
+            texts.append(_recv_exact(self.request, size).decode("utf-8"))
+        return op, texts
+
+    def handle(self):
+        while True:
+            try:
+                op, texts = self._read_texts()
+            except ConnectionError:
+                return
+
+            try:
+                if op == OP_QUERY and len(texts) == 1:
+                    vectors = [self.server.embeddings.embed_query(texts[0])]
+                elif op == OP_DOCUMENTS:
+                    vectors = self.server.embeddings.embed_documents(texts) if texts else []
+                else:
+                    raise ValueError(f"bad request: op {op!r} with {len(texts)} texts")
+                mat = np.asarray(vectors, dtype="<f4").reshape(len(texts), -1)
+                self.request.sendall(_I32.pack(mat.shape[0]) + _U32.pack(mat.shape[1]) + mat.tobytes())
+            except Exception as e:
+                log.exception("[embed] embedding failed")
+                msg = str(e).encode("utf-8")
+                self.request.sendall(_I32.pack(-1) + _U32.pack(len(msg)) + msg)
+
+class EmbeddingServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, embeddings):
+        if os.path.exists(socket_path):
+            os.remove(socket_path)  # stale socket from a previous run
+        self.embeddings = embeddings
+        super().__init__(socket_path, _Handler)
+
+# ---------- client
+class RemoteEmbeddings:
+    """
+    embed_query / embed_documents through the embedding service on socket_path, one request each.
+    If the service is unreachable, falls back to a local model built on first use by fallback().
+    """
+
+    def __init__(self, socket_path: str, fallback=None, timeout: float = 30.0):
+        self.socket_path = socket_path
+        self.fallback = fallback
+        self.timeout = timeout
+        self._local = None
+        self._local_lock = threading.Lock()
+        self._conn = threading.local()
+
+    def _connection(self):
+        sock = getattr(self._conn, "sock", None)
+        if sock is None or getattr(self._conn, "pid", None) != os.getpid():
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+            self._conn.sock, self._conn.pid = sock, os.getpid()
+        return sock
+
+    def _drop_connection(self):
+        sock = getattr(self._conn, "sock", None)
+        self._conn.sock = None
+        if sock is not None:
+            sock.close()
+
+    def _remote(self, op: bytes, texts: list[str]) -> list[list[float]]:
+        sock = self._connection()
+        try:
+            sock.sendall(_pack_texts(op, texts))
+            (n,) = _I32.unpack(_recv_exact(sock, _I32.size))
+            if n < 0:
+                (m,) = _U32.unpack(_recv_exact(sock, _U32.size))
+                raise RuntimeError(f"[embed] service error: {_recv_exact(sock, m).decode('utf-8')}")
+            (dim,) = _U32.unpack(_recv_exact(sock, _U32.size))
+            return np.frombuffer(_recv_exact(sock, 4 * n * dim), dtype="<f4").reshape(n, dim).tolist()
+        except (OSError, ConnectionError):
+            self._drop_connection()
+            raise
+
+    def local(self):
+        with self._local_lock:
+            if self._local is None:
+                log.warning("[embed] service unavailable at %s; loading the model in-process", self.socket_path)
+                self._local = self.fallback()
+            return self._local
+
+    def embed_query(self, text: str) -> list[float]:
+        try:
+            return self._remote(OP_QUERY, [text])[0]
+        except (OSError, ConnectionError):
+            if self.fallback is None:
+                raise
+            return self.local().embed_query(text)
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        if not texts:
+            return []
+        try:
+            return self._remote(OP_DOCUMENTS, texts)
+        except (OSError, ConnectionError):
+            if self.fallback is None:
+                raise
+            return self.local().embed_documents(texts)
+
+# ---------- main (sidecar shared by all gunicorn workers on this host)
+if __name__ == "__main__":
+    from config import Config
+    from embedding_runtime import build_embeddings
+
+    cfg = Config()
+    if not cfg.EMBED_SERVICE_SOCKET:
+        raise SystemExit("[embed] set EMBED_SERVICE_SOCKET to the socket path to serve on")
+
+    embeddings = BatchedEmbeddings(build_embeddings(cfg), cfg.EMBED_BATCH_MAX, cfg.EMBED_BATCH_WAIT_MS)
+    embeddings.embed_query("warmup")
+
+    server = EmbeddingServer(cfg.EMBED_SERVICE_SOCKET, embeddings)
+    log.info("[embed] serving %s on %s (max_batch=%s, max_wait_ms=%s)",
+             cfg.EMB_MODEL, cfg.EMBED_SERVICE_SOCKET, cfg.EMBED_BATCH_MAX, cfg.EMBED_BATCH_WAIT_MS)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.remove(cfg.EMBED_SERVICE_SOCKET)
+        log.info("[embed] stopped; %s", embeddings.stats())
@@ -0,0 +1,165 @@
+import os, re, json, time, hashlib
+
+import numpy as np
+
+# ---------- helpers
+def text_key(text: str) -> str:
+    return hashlib.sha1((text or "").encode("utf-8")).hexdigest()
+
+def _slug(name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]+", "__", name).strip("_") or "model"
+
+def _truncate(path: str, size: int):
+    if os.path.isfile(path) and os.path.getsize(path) > size:
+        os.truncate(path, size)
+
+# ---------- on-disk cache
+class EmbeddingCache:
+    """
+    Content-addressed embedding cache: sha1(chunk text) -> float32 vector, one directory per model.
+
+    Layout (append-only):
+      <root>/<model>/meta.json     {"model": ..., "dim": ...}
+      <root>/<model>/vectors.f32   raw float32 rows
+      <root>/<model>/keys.txt      one key per line, same order as the rows
+
+    Rows are written before their keys, so a crash mid-append can only leave
+    unreferenced (or partial) rows and a partial last key line behind, never a key
+    pointing at a missing vector. Loading trims both files back to the complete
+    keys, so the next append numbers its rows from there.
+    """
+
+    def __init__(self, root: str, model_name: str):
+        self.model_name = model_name
+        self.dir = os.path.join(root, _slug(model_name))
+        self.dim = None
+        self._rows = {}  # key -> row index
+        self._n_rows = 0  # rows in vectors.f32
+        self._vectors = None  # memmap of the rows on disk
+        self._load()
+
+    @property
+    def _keys_path(self):
+        return os.path.join(self.dir, "keys.txt")
+
+    @property
+    def _vectors_path(self):
+        return os.path.join(self.dir, "vectors.f32")
+
+    @property
+    def _meta_path(self):
+        return os.path.join(self.dir, "meta.json")
+
+    def _load(self):
+        if not os.path.isfile(self._meta_path):
+            return
+        with open(self._meta_path, "r", encoding="utf-8") as f:
+            self.dim = int(json.load(f)["dim"])
+
+        row_bytes = 4 * self.dim
+        on_disk = os.path.getsize(self._vectors_path) // row_bytes if os.path.isfile(self._vectors_path) else 0
+        keys, key_bytes = [], 0
+        if os.path.isfile(self._keys_path):
+            with open(self._keys_path, "rb") as f:
+                for line in f:
+                    if len(keys) >= on_disk or not line.endswith(b"\n"):
+                        break  # key of a row that was never written / key line cut short
+                    keys.append(line.decode("utf-8").strip())
+                    key_bytes += len(line)
+
+        _truncate(self._keys_path, key_bytes)
+        _truncate(self._vectors_path, len(keys) * row_bytes)  # rows without a key, including a partial last one
+        self._rows = {k: i for i, k in enumerate(keys)}
+        self._n_rows = len(keys)
+        self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(self._n_rows, self.dim)) if keys else None
+
+    def __len__(self):
+        return len(self._rows)
+
+    def get_many(self, keys: list[str]) -> dict:
+        """
+        Returns {key: vector} for the keys present in the cache.
+        """
+        if self._vectors is None:
+            return {}
+        return {k: np.array(self._vectors[self._rows[k]]) for k in keys if k in self._rows}
+
+    def put_many(self, keys: list[str], vectors):
+        new = list({k: v for k, v in zip(keys, vectors) if k not in self._rows}.items())
+        if not new:
+            return
+
+        mat = np.asarray([v for _, v in new], dtype=np.float32)
+        if self.dim is None:
+            self.dim = int(mat.shape[1])
+            os.makedirs(self.dir, exist_ok=True)
+            with open(self._meta_path, "w", encoding="utf-8") as f:
+                json.dump({"model": self.model_name, "dim": self.dim}, f)
+        elif mat.shape[1] != self.dim:
+            raise ValueError(f"[embcache] dim mismatch for {self.model_name}: {mat.shape[1]} != {self.dim}")
+
+        start = self._n_rows
+        with open(self._vectors_path, "ab") as f:
+            f.write(mat.tobytes())
+        with open(self._keys_path, "a", encoding="utf-8") as f:
+            f.write("".join(k + "\n" for k, _ in new))
+
+        for i, (k, _) in enumerate(new):
+            self._rows[k] = start + i
+        self._n_rows += len(new)
+        self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(self._n_rows, self.dim))
+
+# ---------- embeddings wrapper
+class CachedEmbeddings:
+    """
+    Wraps a LangChain embeddings object (embed_documents / embed_query).
+    embed_documents serves cached vectors and embeds only the misses, batch_size texts per model call.
+    """
+
+    def __init__(self, base, cache: EmbeddingCache | None, batch_size: int = 64):
+        self.base = base
+        self.cache = cache
+        self.batch_size = max(1, int(batch_size))
+
+        self.texts = 0
+        self.hits = 0
+        self.embedded = 0
+        self.seconds = 0.0
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        keys = [text_key(t) for t in texts]
+        found = self.cache.get_many(keys) if self.cache is not None else {}
+
+        todo = [i for i, k in enumerate(keys) if k not in found]
+        vectors = {}
+        for start in range(0, len(todo), self.batch_size):
+            idx = todo[start:start + self.batch_size]
+            t0 = time.perf_counter()
+            batch = self.base.embed_documents([texts[i] for i in idx])
+            self.seconds += time.perf_counter() - t0
+            self.embedded += len(idx)
+
+            if self.cache is not None:
+                self.cache.put_many([keys[i] for i in idx], batch)
+            for i, v in zip(idx, batch):
+                vectors[i] = v
+
+        self.texts += len(texts)
+        self.hits += len(texts) - len(todo)
+
+        return [
+            [float(x) for x in (vectors[i] if i in vectors else found[k])]
+            for i, k in enumerate(keys)
+        ]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.base.embed_query(text)
+
+    def stats(self) -> dict:
+        return {
+            "texts": self.texts,
+            "cache_hits": self.hits,
+            "embedded": self.embedded,
+            "embed_seconds": self.seconds,
+            "embedded_per_sec": (self.embedded / self.seconds) if self.seconds > 0 else 0.0,
+        }
@@ -0,0 +1,90 @@
+import logging
+
+import numpy as np
+
+# ---------- logging
+logging.basicConfig(level=logging.INFO)
+log = logging.getLogger(__name__)
+
+# Short policy-style texts embedded before and after quantization for the drift check
+PROBE_TEXTS = [
+    "How many remote work days per week are allowed?",
+    "Meal per diem is $60/day for domestic travel.",
+    "Passwords must be at least 14 characters long.",
+    "Report security incidents to the on-call team within one hour.",
+    "Records are retained for seven years unless a legal hold applies.",
+    "Employees accrue paid time off monthly.",
+    "Expenses over the approval threshold need a manager's sign-off.",
+    "Whistleblower reports can be submitted anonymously.",
+]
+
+# ---------- helpers
+def embedding_key(cfg) -> str:
+    """
+    Identifies the vectors a configuration produces; used for the embedding cache and the ingest manifest
+    so int8 and float vectors are never mixed.
+    """
+    return f"{cfg.EMB_MODEL}@int8" if cfg.EMB_QUANTIZE else cfg.EMB_MODEL
+
+def configure_threads(n: int):
+    """
+    Intra-op threads for this process (0 = torch default, one per core). With several gunicorn workers
+    on one host, cores / workers avoids oversubscription.
+    """
+    if n > 0:
+        import torch
+        torch.set_num_threads(n)
+
+def cosine_drift(reference, candidate) -> dict:
+    a = np.asarray(reference, dtype=np.float64)
+    b = np.asarray(candidate, dtype=np.float64)
+    denom = np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1)
+    cos = np.sum(a * b, axis=1) / np.where(denom > 0, denom, 1.0)
+    return {"texts": int(cos.shape[0]), "mean_cosine": float(cos.mean()), "min_cosine": float(cos.min())}
+
+def quantize_linear_layers(model):
+    """
+    Dynamic int8 quantization of every nn.Linear, in place: int8 weights, activations quantized per batch.
+    """
+    import torch
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+
+# ---------- embeddings wrapper
+class InferenceModeEmbeddings:
+    """
+    Runs the wrapped LangChain embeddings under torch.inference_mode() (no autograd bookkeeping at all,
+    stricter than the no_grad sentence-transformers already uses).
+    """
+
+    def __init__(self, base):
+        self.base = base
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        import torch
+        with torch.inference_mode():
+            return self.base.embed_documents(texts)
+
+    def embed_query(self, text: str) -> list[float]:
+        import torch
+        with torch.inference_mode():
+            return self.base.embed_query(text)
+
+def build_embeddings(cfg):
+    """
+    HuggingFaceEmbeddings for EMB_MODEL with the CPU inference settings applied:
+    EMB_THREADS, EMB_QUANTIZE (with a drift check against the float model) and EMB_INFERENCE_MODE.
+    """
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    configure_threads(cfg.EMB_THREADS)
+    base = HuggingFaceEmbeddings(model_name=cfg.EMB_MODEL)
+
+    if cfg.EMB_QUANTIZE:
+        reference = base.embed_documents(PROBE_TEXTS)
+        quantize_linear_layers(base.client)
+        drift = cosine_drift(reference, base.embed_documents(PROBE_TEXTS))
+        level = logging.WARNING if drift["min_cosine"] < cfg.EMB_DRIFT_WARN else logging.INFO
+        log.log(level, "[embed] int8 dynamic quantization of %s: cosine vs float mean=%.4f min=%.4f over %d probe texts",
+                cfg.EMB_MODEL, drift["mean_cosine"], drift["min_cosine"], drift["texts"])
+
+    return InferenceModeEmbeddings(base) if cfg.EMB_INFERENCE_MODE else base
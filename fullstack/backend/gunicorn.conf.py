@@ -1,12 +1,67 @@
-import os
+import os, gc, logging, threading
 
 # Bind to the port provided by the hosting environment (Render, etc.)
 bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
 
-workers = 1
-threads = 2
+# Worker processes x threads per worker (gthread). Compare settings with ../bench/load_test.py
+workers = int(os.getenv("GUNICORN_WORKERS", os.getenv("WEB_CONCURRENCY", "1")))
+threads = int(os.getenv("GUNICORN_THREADS", "2"))
 timeout = 120
 
+wsgi_app = "app:app"
+
+# ASYNC_SERVING=1 -> one event loop per worker (asgi:app), so in-flight LLM calls
+# no longer hold a thread each. Start with: gunicorn -c gunicorn.conf.py
+if os.getenv("ASYNC_SERVING", "0").strip().lower() in ("1", "true", "yes"):
+    wsgi_app = "asgi:app"
+    worker_class = "uvicorn.workers.UvicornWorker"
+
+# PRELOAD_MODEL=1 -> the master loads and warms the embedding model + vector store once,
+# then forks; workers share the model weights copy-on-write instead of each loading a copy.
+# Otherwise every worker warms up in the background right after it starts.
+# Either way GET /ready returns 200 only once the worker is warm.
+preload_model = os.getenv("PRELOAD_MODEL", "0").strip().lower() in ("1", "true", "yes")
+if preload_model:
+    preload_app = True
+    # HF tokenizers disable their thread pool (with a warning) when used before a fork
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+def when_ready(server):
+    # Runs in the master, before any worker is forked
+    if not preload_model:
+        return
+    import backend
+    backend.warmup()
+    # Move everything loaded so far out of the GC's view so collections in the workers
+    # don't touch (and copy) the shared pages
+    gc.collect()
+    gc.freeze()
+
+def post_fork(server, worker):
+    if preload_model:
+        import backend
+        from embedding_runtime import configure_threads
+        configure_threads(backend.cfg.EMB_THREADS)  # per-process torch setting, reapply in each worker
+        backend.reopen_vectordb()
+        backend.warmup()
+
+def post_worker_init(worker):
+    if not preload_model:
+        threading.Thread(target=_warmup_worker, name="rag-warmup", daemon=True).start()
+
+def _warmup_worker():
+    try:
+        import backend
+        backend.warmup()
+    except Exception:
+        logging.getLogger(__name__).exception("[backend] warmup failed")
+
+def child_exit(server, worker):
+    # Prometheus multiprocess mode: drop the live gauges of a worker that exited
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
+
 # Logging
 accesslog = "-"
 errorlog = "-"
@@ -1,5 +1,6 @@
-import os, glob, shutil, random, logging, hashlib, statistics
-from collections import Counter
+import os, glob, json, time, shutil, random, logging, hashlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime, timezone
 from pathlib import Path
 
@@ -9,9 +10,23 @@ from langchain_community.document_loaders import (
     BSHTMLLoader,
 )
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_chroma import Chroma
 
+from corpus_version import write_corpus_version
+from embedding_cache import EmbeddingCache, CachedEmbeddings
+from embedding_runtime import build_embeddings, embedding_key
+from ingest_manifest import diff_manifest, params_match
+from ingest_pipeline import IngestStats, bounded_map, batched_with_commits
+from lexical_index import BM25Index, INDEX_FILE as LEXICAL_INDEX_FILE
+from numpy_index import export_from_chroma
+from parse_cache import ParseCache
+from quantized_index import build_quantized
+from sharded_store import ShardedChroma, read_shards
+from store_versions import (
+    COMPLETE_MARKER, CURRENT_FILE, LOCK_FILE, LOG_FILE, STATUS_FILE, VERSIONS_DIR,
+    IngestLock, gc_versions, list_versions, new_version, publish, store_dir, version_dir, write_status,
+)
+
 # ---------- logging
 logging.basicConfig(level=logging.INFO)
 log = logging.getLogger(__name__)
@@ -46,6 +61,13 @@ print(f"[ingest] CONTEXT_DIR = {cfg.CONTEXT_DIR}")
 print(f"[ingest] PERSIST_DIR = {cfg.PERSIST_DIR}")
 print(f"[ingest] CHUNK_SIZE = {cfg.CHUNK_SIZE}, CHUNK_OVERLAP = {cfg.CHUNK_OVERLAP}")
 print(f"[ingest] INGEST_RESET = {cfg.INGEST_RESET}")
+print(f"[ingest] INGEST_MODE = {cfg.INGEST_MODE}, INGEST_LOAD_WORKERS = {cfg.INGEST_LOAD_WORKERS}")
+print(f"[ingest] INGEST_PREFETCH_FILES = {cfg.INGEST_PREFETCH_FILES}, INGEST_RESUME = {cfg.INGEST_RESUME}")
+print(f"[ingest] STORE_VERSIONS = {cfg.STORE_VERSIONS}, STORE_KEEP_VERSIONS = {cfg.STORE_KEEP_VERSIONS}")
+print(f"[ingest] SHARD_BY = {cfg.SHARD_BY or '(one collection)'}")
+print(f"[ingest] INGEST_EMBED_BATCH = {cfg.INGEST_EMBED_BATCH}, EMBED_CACHE_DIR = {cfg.EMBED_CACHE_DIR if cfg.EMBED_CACHE_ENABLED else '(disabled)'}")
+print(f"[ingest] PARSE_CACHE_DIR = {cfg.PARSE_CACHE_DIR if cfg.PARSE_CACHE_ENABLED else '(disabled)'}")
+print(f"[ingest] EMB_QUANTIZE = {cfg.EMB_QUANTIZE}, EMB_THREADS = {cfg.EMB_THREADS or '(torch default)'}, EMB_INFERENCE_MODE = {cfg.EMB_INFERENCE_MODE}")
 
 # ---------- helper functions
 INGEST_RUN_ID = os.urandom(4).hex()  # e.g., "a3f91c2d"
@@ -60,7 +82,7 @@ def _file_sha1(path: str) -> str:
             h.update(chunk)
     return h.hexdigest()
 
-def _base_metadata(file_path: str, corpus_root: str, doc_type: str) -> dict:
+def _base_metadata(file_path: str, corpus_root: str, doc_type: str, run_id: str | None = None) -> dict:
     p = Path(file_path)
     rel = os.path.relpath(str(p), start=corpus_root)
     return {
@@ -70,22 +92,15 @@ def _base_metadata(file_path: str, corpus_root: str, doc_type: str) -> dict:
         "doc_type": doc_type,                       # pdf/text/markdown/html
         "file_mtime": int(p.stat().st_mtime),       # seconds since epoch
         "ingested_at": _iso_utc_now(),              # for audit/debug
-        "ingest_run_id": INGEST_RUN_ID,             # track a specific run
+        "ingest_run_id": run_id or INGEST_RUN_ID,   # track a specific run
         # Optional: absolute path for debugging only (remove if you don't want it persisted)
         "source_abs": str(p.resolve()),
     }
 
 # ---------- utilities
-def load_documents(folder: str):
+def list_source_files(folder: str) -> list[str]:
     """
-    Load documents recursively from:
-      - PDF:  .pdf
-      - Text: .txt
-      - Markdown: .md
-      - HTML: .html / .htm
-
-    Adds richer metadata including:
-      - source (relative path), page, title, doc_type, file_ext, file_mtime, ingested_at, ingest_run_id, source_sha1
+    All supported files under folder (PDF, TXT, MD, HTML/HTM), de-duplicated and sorted.
     """
     patterns = [
         "**/*.pdf", "**/*.PDF",
@@ -99,89 +114,119 @@ def load_documents(folder: str):
     for pat in patterns:
         paths += glob.glob(os.path.join(folder, pat), recursive=True)
 
-    paths = sorted(set(paths))  # de-dupe + deterministic ordering
+    return sorted(set(paths))  # de-dupe + deterministic ordering
 
-    docs = []
+_parse_cache = None  # one per process (pool workers build their own or inherit it), see _get_parse_cache
 
-    for p in paths:
-        ext = os.path.splitext(p)[1].lower()
+def _get_parse_cache() -> ParseCache | None:
+    global _parse_cache
+    if not cfg.PARSE_CACHE_ENABLED:
+        return None
+    if _parse_cache is None or _parse_cache.root != cfg.PARSE_CACHE_DIR:
+        _parse_cache = ParseCache(cfg.PARSE_CACHE_DIR)
+    return _parse_cache
 
-        try:
-            if ext == ".pdf":
-                loader = PyPDFLoader(p)
-                loaded = loader.load()
+def _parse(p: str, kind: str, load, sha1: str, info: dict | None = None):
+    """
+    load() for a PDF / HTML file through the parse cache: a file whose content (sha1, computed once by
+    _load_file) and loader versions are unchanged is not parsed again. Records info["parse_cached"] when info is given.
+    """
+    cache = _get_parse_cache()
+    loaded = cache.get(sha1, kind, p) if cache is not None else None
+    if info is not None:
+        info["parse_cached"] = loaded is not None
+    if loaded is None:
+        loaded = load()
+        if cache is not None:
+            try:
+                cache.put(sha1, kind, loaded)
+            except OSError:
+                log.warning("[ingest] Could not write the parse cache entry for %s", p, exc_info=True)
+    return loaded
 
-                base = _base_metadata(p, folder, doc_type="pdf")
-                base["source_sha1"] = _file_sha1(p)
+def _load_file(p: str, folder: str, run_id: str, info: dict | None = None):
+    """
+    Load one file (PDF, TXT, MD, HTML / HTM) into Documents with base metadata: source (relative to folder),
+    page, title, doc_type, file_ext, file_mtime, ingested_at, ingest_run_id, source_sha1.
+    Returns [] if the file can't be loaded. Module-level so it can run in a process pool.
+    """
+    ext = os.path.splitext(p)[1].lower()
+
+    try:
+        sha1 = _file_sha1(p)  # parse cache key and source_sha1 metadata: the file is read for it once
 
-                for d in loaded:
-                    d.metadata.update(base)
-                    # normalize page metadata
-                    if "page" not in d.metadata and "page_number" in d.metadata:
-                        d.metadata["page"] = d.metadata["page_number"]
-                    d.metadata.setdefault("page", 1)
+        if ext == ".pdf":
+            loaded = _parse(p, "pdf", lambda: PyPDFLoader(p).load(), sha1, info)
 
-                docs.extend(loaded)
+            base = _base_metadata(p, folder, doc_type="pdf", run_id=run_id)
+            base["source_sha1"] = sha1
 
-            elif ext in (".txt", ".md"):
-                loader = TextLoader(p, encoding="utf-8")
-                loaded = loader.load()
+            for d in loaded:
+                d.metadata.update(base)
+                # normalize page metadata
+                if "page" not in d.metadata and "page_number" in d.metadata:
+                    d.metadata["page"] = d.metadata["page_number"]
+                d.metadata.setdefault("page", 1)
 
-                base = _base_metadata(p, folder, doc_type=("markdown" if ext == ".md" else "text"))
-                base["source_sha1"] = _file_sha1(p)
+            return loaded
 
-                for d in loaded:
-                    d.metadata.update(base)
-                    d.metadata.setdefault("page", 1)
+        elif ext in (".txt", ".md"):
+            loader = TextLoader(p, encoding="utf-8")
+            loaded = loader.load()
 
-                docs.extend(loaded)
+            base = _base_metadata(p, folder, doc_type=("markdown" if ext == ".md" else "text"), run_id=run_id)
+            base["source_sha1"] = sha1
 
-            elif ext in (".html", ".htm"):
-                loader = BSHTMLLoader(p, open_encoding="utf-8")
-                loaded = loader.load()
+            for d in loaded:
+                d.metadata.update(base)
+                d.metadata.setdefault("page", 1)
 
-                base = _base_metadata(p, folder, doc_type="html")
-                base["source_sha1"] = _file_sha1(p)
+            return loaded
 
-                for d in loaded:
-                    d.metadata.update(base)
-                    d.metadata.setdefault("page", 1)
+        elif ext in (".html", ".htm"):
+            loaded = _parse(p, "html", lambda: BSHTMLLoader(p, open_encoding="utf-8").load(), sha1, info)
 
-                docs.extend(loaded)
+            base = _base_metadata(p, folder, doc_type="html", run_id=run_id)
+            base["source_sha1"] = sha1
 
-        except UnicodeDecodeError:
-            log.warning("[ingest] Unicode decode error, retrying with latin-1: %s", p)
+            for d in loaded:
+                d.metadata.update(base)
+                d.metadata.setdefault("page", 1)
 
-            try:
-                if ext in (".txt", ".md"):
-                    loader = TextLoader(p, encoding="latin-1")
-                    doc_type = "markdown" if ext == ".md" else "text"
-                elif ext in (".html", ".htm"):
-                    loader = BSHTMLLoader(p, open_encoding="latin-1")
-                    doc_type = "html"
-                else:
-                    raise
+            return loaded
 
-                loaded = loader.load()
+    except UnicodeDecodeError:
+        log.warning("[ingest] Unicode decode error, retrying with latin-1: %s", p)
 
-                base = _base_metadata(p, folder, doc_type=doc_type)
-                base["source_sha1"] = _file_sha1(p)
+        try:
+            if ext in (".txt", ".md"):
+                loaded = TextLoader(p, encoding="latin-1").load()
+                doc_type = "markdown" if ext == ".md" else "text"
+            elif ext in (".html", ".htm"):
+                # cached under the same key: the next run gets this text without hitting the decode error
+                loaded = _parse(p, "html", lambda: BSHTMLLoader(p, open_encoding="latin-1").load(), sha1)
+                doc_type = "html"
+            else:
+                raise
 
-                for d in loaded:
-                    d.metadata.update(base)
-                    d.metadata.setdefault("page", 1)
+            base = _base_metadata(p, folder, doc_type=doc_type, run_id=run_id)
+            base["source_sha1"] = sha1
 
-                docs.extend(loaded)
+            for d in loaded:
+                d.metadata.update(base)
+                d.metadata.setdefault("page", 1)
 
-            except Exception:
-                log.exception("[ingest] Failed fallback load for %s", p)
-                continue
+            return loaded
 
         except Exception:
-            log.exception("[ingest] Failed to load %s", p)
-            continue
+            log.exception("[ingest] Failed fallback load for %s", p)
+            return []
+
+    except Exception:
+        log.exception("[ingest] Failed to load %s", p)
+        return []
 
-    return docs
+    return []
 
 def assign_chunk_ids(chunks):
     """
@@ -208,46 +253,34 @@ def assign_chunk_ids(chunks):
 
     return ids, chunks
 
-def print_ingest_stats(docs, chunks):
-    srcs = [d.metadata.get("source", "unknown") for d in docs]
-    exts = [os.path.splitext(s)[1].lower().lstrip(".") for s in srcs]
-    ext_counts = Counter(exts)
+def print_ingest_stats(docs=(), chunks=(), stats: IngestStats | None = None):
+    """
+    Pass docs + chunks, or the IngestStats aggregated while streaming them.
+    """
+    if stats is None:
+        stats = IngestStats()
+        stats.add_documents(docs)
+        stats.add_chunks(chunks)
 
     print("\n[ingest] ---------- Ingestion stats ----------")
-    print(f"[ingest] Loaded documents: {len(docs)}")
-    print(f"[ingest] Unique sources/files: {len(set(srcs))}")
-    print(f"[ingest] File types: {dict(ext_counts)}")
+    print(f"[ingest] Loaded documents: {stats.documents}")
+    print(f"[ingest] Unique sources/files: {len(stats.sources)}")
+    print(f"[ingest] File types: {dict(stats.file_types)}")
 
-    chunk_lens = [len(c.page_content or "") for c in chunks]
-    if not chunk_lens:
+    if not stats.chunks:
         print("[ingest] No chunks to report.")
         print("[ingest] -------------------------------------\n")
         return
 
-    chunk_lens_sorted = sorted(chunk_lens)
-    avg_len = int(statistics.mean(chunk_lens_sorted))
-    min_len = chunk_lens_sorted[0]
-    max_len = chunk_lens_sorted[-1]
-
-    def pct(p):
-        idx = int(round((p / 100) * (len(chunk_lens_sorted) - 1)))
-        return chunk_lens_sorted[idx]
+    s = stats.summary()
+    print(f"[ingest] Chunks: {s['chunks']}")
+    print(f"[ingest] Chunk length chars: min={s['min']}, avg={s['avg']}, p50={s['p50']}, p90={s['p90']}, p99={s['p99']}, max={s['max']}")
 
-    p50 = pct(50)
-    p90 = pct(90)
-    p99 = pct(99)
+    print(f"[ingest] Tiny chunks (<200 chars): {stats.count_lengths(below=200)}")
+    print(f"[ingest] Huge chunks (>2000 chars): {stats.count_lengths(above=2000)}")
 
-    print(f"[ingest] Chunks: {len(chunks)}")
-    print(f"[ingest] Chunk length chars: min={min_len}, avg={avg_len}, p50={p50}, p90={p90}, p99={p99}, max={max_len}")
-
-    tiny = sum(1 for n in chunk_lens if n < 200)
-    huge = sum(1 for n in chunk_lens if n > 2000)
-    print(f"[ingest] Tiny chunks (<200 chars): {tiny}")
-    print(f"[ingest] Huge chunks (>2000 chars): {huge}")
-
-    chunks_by_source = Counter(c.metadata.get("source", "unknown") for c in chunks)
     print("[ingest] Top sources by chunk count:")
-    for src, cnt in chunks_by_source.most_common(10):
+    for src, cnt in stats.chunks_by_source.most_common(10):
         print(f"  - {src}: {cnt}")
 
     print("[ingest] -------------------------------------\n")
@@ -261,27 +294,8 @@ def _safe_rmtree(path: str):
         raise ValueError(f"[ingest] Refusing to delete unsafe PERSIST_DIR: {ap}")
     shutil.rmtree(ap)
 
-# ---------- main
-def main():
-    if not os.path.isdir(cfg.CONTEXT_DIR):
-        raise FileNotFoundError(f"[ingest] CONTEXT_DIR not found: {cfg.CONTEXT_DIR}")
-
-    # Optional clean rebuild
-    if cfg.INGEST_RESET and os.path.isdir(cfg.PERSIST_DIR):
-        print(f"[ingest] INGEST_RESET=1 -> removing existing persisted store at {cfg.PERSIST_DIR}")
-        _safe_rmtree(cfg.PERSIST_DIR)
-
-    os.makedirs(cfg.PERSIST_DIR, exist_ok=True)
-
-    docs = load_documents(cfg.CONTEXT_DIR)
-    if not docs:
-        print(f"⚠️  No documents found in {cfg.CONTEXT_DIR}. Creating empty store.")
-        embeddings = HuggingFaceEmbeddings(model_name=cfg.EMB_MODEL)
-        Chroma(persist_directory=cfg.PERSIST_DIR, embedding_function=embeddings)
-        print(f"✅ Created empty Chroma at {cfg.PERSIST_DIR}")
-        return
-
-    splitter = RecursiveCharacterTextSplitter(
+def make_splitter():
+    return RecursiveCharacterTextSplitter(
         chunk_size=cfg.CHUNK_SIZE,
         chunk_overlap=cfg.CHUNK_OVERLAP,
         separators=[
@@ -297,29 +311,371 @@ def main():
         ],
     )
 
-    chunks = splitter.split_documents(docs)
-    print_ingest_stats(docs, chunks)
+def make_embeddings():
+    """
+    HuggingFace embeddings (EMB_QUANTIZE / EMB_THREADS applied) behind the on-disk embedding cache,
+    keyed by (EMB_MODEL + quantization, sha1(chunk text)).
+    """
+    base = build_embeddings(cfg)
+    cache = EmbeddingCache(cfg.EMBED_CACHE_DIR, embedding_key(cfg)) if cfg.EMBED_CACHE_ENABLED else None
+    return CachedEmbeddings(base, cache, batch_size=cfg.INGEST_EMBED_BATCH)
+
+def _load_and_split(p: str, folder: str, run_id: str):
+    """
+    One file through load -> split -> assign IDs. None if the file can't be loaded.
+    Module-level so it can run in a process pool; only the chunks travel back.
+    """
+    info = {}
+    docs = _load_file(p, folder, run_id, info)
+    if not docs:
+        return None
+    ids, chunks = assign_chunk_ids(make_splitter().split_documents(docs))
+    return {
+        "source": docs[0].metadata["source"],
+        "sha1": docs[0].metadata.get("source_sha1"),
+        "documents": len(docs),
+        "chunks": chunks,
+        "ids": ids,
+        "parse_cached": info.get("parse_cached"),  # None for files the cache doesn't cover (TXT / MD)
+    }
+
+def _isolated(fn, p: str, folder: str):
+    """
+    fn(p, folder, INGEST_RUN_ID) in a process of its own; None (the file is skipped) if that process dies.
+    """
+    try:
+        with ProcessPoolExecutor(max_workers=1) as one:
+            return one.submit(fn, p, folder, INGEST_RUN_ID).result()
+    except BrokenProcessPool:
+        log.error("[ingest] Parser process crashed on %s; skipping it", p)
+        return None
+
+def iter_loaded_files(folder: str, paths: list[str], workers: int = 1, prefetch: int = 4):
+    """
+    _load_and_split results in path order. At most max(prefetch, workers) files are prepared ahead of
+    the consumer (in a process pool when workers > 1, else on one background thread), so parsing
+    overlaps embedding without the parsed corpus piling up in memory.
+    A parser process that dies (segfault, OOM kill) fails every file in flight with it: the first of
+    them is retried alone and skipped if it crashes again, then a new pool takes the rest.
+    """
+    if workers <= 1:
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            yield from bounded_map(executor, _load_and_split, paths, max(prefetch, 1), folder, INGEST_RUN_ID)
+        return
 
-    ids, chunks = assign_chunk_ids(chunks)
-    embeddings = HuggingFaceEmbeddings(model_name=cfg.EMB_MODEL)
+    done = 0
+    while done < len(paths):
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                for loaded in bounded_map(executor, _load_and_split, paths[done:], max(prefetch, workers),
+                                          folder, INGEST_RUN_ID):
+                    done += 1
+                    yield loaded
+        except BrokenProcessPool:
+            yield _isolated(_load_and_split, paths[done], folder)
+            done += 1
+
+def stream_chunks(db, embeddings, paths: list[str], files: dict) -> IngestStats:
+    """
+    load -> split -> assign IDs -> embed -> upsert, INGEST_EMBED_BATCH chunks at a time.
+    After each batch, files whose chunks are all in the store are added to `files` (source -> manifest
+    entry) and saved as an unfinished manifest, so an interrupted run resumes from the last committed batch.
+    Chroma upserts by id, so re-adding a file's chunks replaces them in place.
+    """
+    stats = IngestStats()
+    parsed = {True: 0, False: 0}  # PDF / HTML files served from the parse cache vs parsed
+
+    def per_file():
+        for loaded in iter_loaded_files(cfg.CONTEXT_DIR, paths, cfg.INGEST_LOAD_WORKERS, cfg.INGEST_PREFETCH_FILES):
+            if loaded is None:
+                continue
+            if loaded["parse_cached"] is not None:
+                parsed[loaded["parse_cached"]] += 1
+            stats.add_source(loaded["source"], loaded["documents"])
+            stats.add_chunks(loaded["chunks"])
+            entry = {"sha1": loaded["sha1"], "chunk_ids": loaded["ids"]}
+            yield loaded["source"], entry, loaded["chunks"], loaded["ids"]
+
+    t0 = time.perf_counter()
+    done = 0
+    _report(files_total=len(files) + len(paths), files_committed=len(files), chunks_embedded=0)
+    for chunks, ids, committed in batched_with_commits(per_file(), cfg.INGEST_EMBED_BATCH):
+        if chunks:
+            db.add_documents(documents=chunks, ids=ids)
+            done += len(chunks)
+        if committed:
+            files.update(committed)
+            save_manifest(cfg.PERSIST_DIR, files, complete=False)
+        _report(files_committed=len(files), chunks_embedded=done)
+        elapsed = time.perf_counter() - t0
+        print(f"[ingest] Embedded {done} chunks, {len(files)} files committed "
+              f"({done / elapsed if elapsed > 0 else 0.0:.1f} chunks/sec)")
+    seconds = time.perf_counter() - t0
+
+    print_ingest_stats(stats=stats)
+    if cfg.PARSE_CACHE_ENABLED and (parsed[True] or parsed[False]):
+        print(f"[ingest] Parse cache: {parsed[True]} of {parsed[True] + parsed[False]} PDF/HTML files reused, "
+              f"{parsed[False]} parsed")
+    if done:
+        print_embedding_stats(embeddings, seconds)
+    return stats
+
+def print_embedding_stats(embeddings, seconds: float):
+    stats = embeddings.stats()
+    print("\n[ingest] ---------- Embedding stats ----------")
+    print(f"[ingest] Chunks: {stats['texts']}, cache hits: {stats['cache_hits']}, embedded by model: {stats['embedded']}")
+    print(f"[ingest] Model time: {stats['embed_seconds']:.2f}s ({stats['embedded_per_sec']:.1f} chunks/sec)")
+    print(f"[ingest] Embed + upsert time: {seconds:.2f}s ({stats['texts'] / seconds if seconds > 0 else 0.0:.1f} chunks/sec)")
+    print("[ingest] -------------------------------------\n")
+
+def build_search_indexes(db):
+    """
+    Side indexes derived from the store; rebuilt after every change so they share its chunk ids.
+    """
+    build_lexical_index(db)
+    n = export_from_chroma(db, cfg.PERSIST_DIR)
+    sizes = build_quantized(cfg.PERSIST_DIR)
+    print(f"[ingest] NumPy export: {n} vectors, " + ", ".join(f"{k}={v / 1024:.1f} KiB" for k, v in sizes.items()))
+
+def build_lexical_index(db):
+    """
+    Rebuild the BM25 index over every chunk currently in the store (same chunk ids as Chroma).
+    """
+    data = db.get(include=["documents", "metadatas"])
+    rows = sorted(zip(data["ids"], data["documents"], data["metadatas"]))
+    index = BM25Index.build([r[0] for r in rows], [r[1] or "" for r in rows], [r[2] or {} for r in rows])
+    index.save(os.path.join(cfg.PERSIST_DIR, LEXICAL_INDEX_FILE))
+    print(f"[ingest] BM25 index: {len(index)} chunks, {len(index.vocab)} terms")
+
+# ---------- manifest (file -> sha1 -> chunk_ids), drives INGEST_MODE=incremental
+MANIFEST_FILE = "ingest_manifest.json"
+
+def _ingest_params() -> dict:
+    # Anything that changes chunk text or vectors invalidates every file in the manifest.
+    return {"emb_model": embedding_key(cfg), "chunk_size": cfg.CHUNK_SIZE, "chunk_overlap": cfg.CHUNK_OVERLAP,
+            "shard_by": cfg.SHARD_BY}
+
+def load_manifest(persist_dir: str):
+    path = os.path.join(persist_dir, MANIFEST_FILE)
+    if not os.path.isfile(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_manifest(persist_dir: str, files: dict, complete: bool = True):
+    """
+    complete=False marks a checkpoint of a run still in progress: `files` are exactly the files whose
+    chunks are all in the store.
+    """
+    path = os.path.join(persist_dir, MANIFEST_FILE)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({**_ingest_params(), "updated_at": _iso_utc_now(), "complete": complete, "files": files},
+                  f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+def _params_match(manifest: dict) -> bool:
+    return params_match(manifest, _ingest_params())
+
+def open_store(embeddings):
+    """
+    The store at PERSIST_DIR: one Chroma collection, or one per source / doc_type with SHARD_BY.
+    """
+    if cfg.SHARD_BY:
+        return ShardedChroma(cfg.PERSIST_DIR, embeddings, shard_by=cfg.SHARD_BY)
+    return Chroma(persist_directory=cfg.PERSIST_DIR, embedding_function=embeddings)
+
+def ingest_incremental() -> bool:
+    """
+    Re-embed only files whose sha1 changed since the last run; delete chunks of
+    modified/removed files. Returns False when a full rebuild is required instead
+    (no manifest yet, or embedding/chunking parameters changed).
+    """
+    manifest = load_manifest(cfg.PERSIST_DIR) if os.path.isdir(cfg.PERSIST_DIR) else None
+    paths = {os.path.relpath(p, start=cfg.CONTEXT_DIR): p for p in list_source_files(cfg.CONTEXT_DIR)}
+    current = {s: _file_sha1(p) for s, p in paths.items()} if manifest is not None else {}
+
+    diff = diff_manifest(manifest, current, _ingest_params())
+    if diff["rebuild"] == "no manifest":
+        print("[ingest] No manifest found -> full rebuild")
+        return False
+    if diff["rebuild"]:
+        print("[ingest] EMB_MODEL/EMB_QUANTIZE/CHUNK_SIZE/CHUNK_OVERLAP/SHARD_BY changed since last run -> full rebuild")
+        return False
+
+    removed, changed, added = diff["removed"], diff["changed"], diff["added"]
+    print(f"[ingest] Incremental: {len(added)} added, {len(changed)} changed, "
+          f"{len(removed)} removed, {len(diff['unchanged'])} unchanged")
+
+    if not (removed or changed or added):
+        print(f"✅ Store at {cfg.PERSIST_DIR} is up to date")
+        return True
+
+    to_load = changed + added
+    embeddings = make_embeddings() if to_load else None
+    db = open_store(embeddings)
+
+    if diff["stale_ids"]:
+        db.delete(ids=diff["stale_ids"])
+        print(f"[ingest] Deleted {len(diff['stale_ids'])} stale chunks")
+
+    files = dict(diff["keep"])
+    save_manifest(cfg.PERSIST_DIR, files, complete=False)
+
+    if to_load:
+        stats = stream_chunks(db, embeddings, [paths[s] for s in to_load], files)
+        print(f"[ingest] Embedded {stats.chunks} chunks from {len(to_load)} files")
+
+    build_search_indexes(db)
+    save_manifest(cfg.PERSIST_DIR, files)
+    write_corpus_version(cfg.PERSIST_DIR, INGEST_RUN_ID, ingested_at=_iso_utc_now(),
+                         chunks=sum(len(e["chunk_ids"]) for e in files.values()))
+    print(f"✅ Incremental ingest complete for {cfg.PERSIST_DIR}")
+    return True
+
+def ingest_full(reset: bool):
+    # An unfinished manifest with the same parameters means the last run was interrupted:
+    # keep its committed files instead of starting over
+    manifest = load_manifest(cfg.PERSIST_DIR) if os.path.isdir(cfg.PERSIST_DIR) else None
+    resume = (cfg.INGEST_RESUME and manifest is not None and manifest.get("complete") is False
+              and _params_match(manifest))
+
+    # A store laid out for another SHARD_BY can't be added to
+    resharded = (os.path.isdir(cfg.PERSIST_DIR) and bool(os.listdir(cfg.PERSIST_DIR))
+                 and (read_shards(cfg.PERSIST_DIR) or {}).get("shard_by", "") != cfg.SHARD_BY)
+
+    # Optional clean rebuild
+    if resume:
+        print(f"[ingest] Resuming interrupted run: {len(manifest['files'])} files already committed")
+    elif (reset or resharded) and os.path.isdir(cfg.PERSIST_DIR):
+        why = "Reset" if reset else f"SHARD_BY={cfg.SHARD_BY or '(none)'} differs from the store's layout"
+        print(f"[ingest] {why} -> removing existing persisted store at {cfg.PERSIST_DIR}")
+        _safe_rmtree(cfg.PERSIST_DIR)
+
+    os.makedirs(cfg.PERSIST_DIR, exist_ok=True)
+
+    embeddings = make_embeddings()
+    db = open_store(embeddings)
+
+    paths = list_source_files(cfg.CONTEXT_DIR)
+    files = {}
+    if resume:
+        # Committed files that changed or disappeared since the interrupted run are redone / dropped
+        current = {os.path.relpath(p, start=cfg.CONTEXT_DIR): p for p in paths}
+        files = manifest["files"]
+        for s in [s for s, e in files.items() if s not in current or e.get("sha1") != _file_sha1(current[s])]:
+            del files[s]
+        # Only the kept files' chunks stay. The rest is stale: chunks of those files, and chunks the interrupted
+        # run upserted for files it never committed (since edited down to fewer chunks, or deleted)
+        kept = {cid for e in files.values() for cid in e.get("chunk_ids", [])}
+        stale_ids = [cid for cid in db.get(include=[])["ids"] if cid not in kept]
+        if stale_ids:
+            db.delete(ids=stale_ids)
+            print(f"[ingest] Deleted {len(stale_ids)} stale chunks")
+        paths = [p for s, p in current.items() if s not in files]
+
+    stream_chunks(db, embeddings, paths, files)
+    if not files:
+        print(f"⚠️  No documents found in {cfg.CONTEXT_DIR}. Creating empty store.")
+    build_search_indexes(db)
+
+    # Manifest lets the next INGEST_MODE=incremental run skip unchanged files
+    save_manifest(cfg.PERSIST_DIR, files)
+
+    # New corpus version -> backends drop cached answers from the previous ingest
+    chunks = sum(len(e["chunk_ids"]) for e in files.values())
+    write_corpus_version(cfg.PERSIST_DIR, INGEST_RUN_ID, ingested_at=_iso_utc_now(), chunks=chunks)
+    print(f"✅ Ingested {chunks} chunks into {cfg.PERSIST_DIR}")
+
+# ---------- store versions (blue/green)
+STORE_ROOT = cfg.PERSIST_DIR  # as configured; with STORE_VERSIONS=1 every run builds a new version under it
+
+def _report(**fields):
+    # Progress for GET /admin/ingest (versioned stores only: an in-place reset would delete the file)
+    if cfg.STORE_VERSIONS:
+        write_status(STORE_ROOT, **fields)
+
+def _pick_version(root: str) -> tuple[str, bool]:
+    """
+    (name, resumed): the unpublished version an interrupted run left behind, when it is newer than
+    CURRENT and was built with the same parameters (INGEST_RESUME=1); else a new empty version.
+    """
+    if cfg.INGEST_RESUME:
+        for v in list_versions(root):
+            if v["current"] or v["complete"]:
+                break
+            manifest = load_manifest(version_dir(root, v["name"]))
+            if manifest is not None and manifest.get("complete") is False and _params_match(manifest):
+                return v["name"], True
+    return new_version(root, INGEST_RUN_ID), False
+
+def ingest_in_place():
+    """
+    INGEST_MODE against cfg.PERSIST_DIR.
+    """
+    if cfg.INGEST_MODE == "incremental" and not cfg.INGEST_RESET:
+        if ingest_incremental():
+            return
+        # Stale chunks from the old parameters must not survive the rebuild
+        ingest_full(reset=True)
+        return
+
+    ingest_full(reset=cfg.INGEST_RESET)
+
+def ingest_new_version():
+    """
+    Builds into a new version under STORE_ROOT while backends keep serving CURRENT, then points
+    CURRENT at it (backends swap between requests) and deletes versions beyond STORE_KEEP_VERSIONS.
+    """
+    live = store_dir(STORE_ROOT)
+    name, resumed = _pick_version(STORE_ROOT)
+    target = version_dir(STORE_ROOT, name)
+
+    if resumed:
+        print(f"[ingest] Resuming unpublished version {name}")
+    elif cfg.INGEST_MODE == "incremental" and not cfg.INGEST_RESET and load_manifest(live) is not None:
+        # Incremental runs start from a copy of the version being served
+        shutil.copytree(live, target, dirs_exist_ok=True, ignore=shutil.ignore_patterns(
+            VERSIONS_DIR, CURRENT_FILE, STATUS_FILE, LOCK_FILE, LOG_FILE, COMPLETE_MARKER))
+    print(f"[ingest] Building store version {name} at {target} (serving: {live})")
+    _report(version=name, resumed=resumed)
+
+    cfg.PERSIST_DIR = target  # the rest of the run reads and writes the new version only
+    ingest_in_place()
+
+    if not os.path.isfile(os.path.join(target, COMPLETE_MARKER)):
+        # Incremental run with nothing to do: keep serving the current version
+        shutil.rmtree(target, ignore_errors=True)
+        _report(version=None)
+        return
+
+    publish(STORE_ROOT, name)
+    removed = gc_versions(STORE_ROOT, cfg.STORE_KEEP_VERSIONS)
+    _report(published=name, removed_versions=removed)
+    print(f"✅ Serving store version {name}" + (f" (removed {len(removed)} old versions)" if removed else ""))
+
+# ---------- main
+def main():
+    if not os.path.isdir(cfg.CONTEXT_DIR):
+        raise FileNotFoundError(f"[ingest] CONTEXT_DIR not found: {cfg.CONTEXT_DIR}")
+
+    if not cfg.STORE_VERSIONS:
+        ingest_in_place()
+        return
 
-    # Version-compatible insert (ids supported in some versions, not all)
+    lock = IngestLock(STORE_ROOT)
+    if not lock.acquire():
+        raise RuntimeError(f"[ingest] Another ingest is already running on {STORE_ROOT}")
     try:
-        Chroma.from_documents(
-            documents=chunks,
-            embedding=embeddings,
-            persist_directory=cfg.PERSIST_DIR,
-            ids=ids,
-        )
-    except TypeError:
-        log.warning("[ingest] Chroma.from_documents(ids=...) not supported; falling back to add_documents().")
-        db = Chroma(
-            persist_directory=cfg.PERSIST_DIR,
-            embedding_function=embeddings,
-        )
-        db.add_documents(documents=chunks, ids=ids)
-
-    print(f"✅ Ingested {len(chunks)} chunks into {cfg.PERSIST_DIR}")
+        _report(new_run=True, state="running", pid=os.getpid(), mode=cfg.INGEST_MODE, started_at=time.time())
+        ingest_new_version()
+    except BaseException as e:
+        _report(state="failed", error=f"{type(e).__name__}: {e}", finished_at=time.time())
+        raise
+    else:
+        _report(state="done", finished_at=time.time())
+    finally:
+        lock.release()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,37 @@
+# ---------- manifest diff (INGEST_MODE=incremental)
+# Manifest written by ingest.py after each run:
+#   {<ingest params>, "updated_at", "complete", "files": {source: {"sha1": ..., "chunk_ids": [...]}}}
+
+def params_match(manifest: dict, params: dict) -> bool:
+    """
+    True when the manifest was written with the same ingest parameters (anything that changes chunk text
+    or vectors: embedding model, chunking, sharding).
+    """
+    recorded = {"shard_by": "", **manifest}  # manifests from before SHARD_BY describe an unsharded store
+    return {k: recorded.get(k) for k in params} == params
+
+def diff_manifest(manifest: dict | None, current: dict, params: dict) -> dict:
+    """
+    What an incremental run has to do, given the last manifest, current {source: sha1} and this run's params.
+    Returns {"rebuild": reason | None, "added", "changed", "removed", "unchanged": sorted sources,
+    "stale_ids": chunk ids of changed + removed files, "keep": manifest entries of unchanged files}.
+    With a rebuild reason (no manifest, parameters changed) everything else is empty.
+    """
+    out = {"rebuild": None, "added": [], "changed": [], "removed": [], "unchanged": [], "stale_ids": [], "keep": {}}
+    if manifest is None:
+        return {**out, "rebuild": "no manifest"}
+    if not params_match(manifest, params):
+        return {**out, "rebuild": "parameters changed"}
+
+    known = manifest.get("files", {})
+    out["removed"] = sorted(set(known) - set(current))
+    for source in sorted(current):
+        if source not in known:
+            out["added"].append(source)
+        elif known[source].get("sha1") != current[source]:
+            out["changed"].append(source)
+        else:
+            out["unchanged"].append(source)
+            out["keep"][source] = known[source]
+    out["stale_ids"] = [cid for s in out["removed"] + out["changed"] for cid in known[s].get("chunk_ids", [])]
+    return out
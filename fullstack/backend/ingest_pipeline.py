@@ -0,0 +1,115 @@
+import os
+from collections import Counter, deque
+
+# ---------- bounded stages
+def bounded_map(executor, fn, items, ahead: int, *args):
+    """
+    Like executor.map(fn, items, ...) in item order, but with at most `ahead` calls submitted and not yet
+    consumed: a slow consumer (the embedder) holds the producers back instead of letting results pile up.
+    """
+    pending = deque()
+    try:
+        for item in items:
+            pending.append(executor.submit(fn, item, *args))
+            if len(pending) >= max(1, ahead):
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for fut in pending:
+            fut.cancel()
+
+def batched_with_commits(files, batch_size: int):
+    """
+    files yields (source, entry, chunks, ids) per file. Yields (chunks, ids, committed) with at most
+    batch_size chunks per batch; committed is {source: entry} for the files whose chunks are all in this
+    batch or an earlier one (files without chunks commit with the next batch). At most batch_size chunks
+    plus one file's chunks are held at a time.
+    """
+    buf_chunks, buf_ids = [], []
+    pending = []  # [end offset in buf, source, entry]
+
+    def cut(n: int):
+        chunks, ids = buf_chunks[:n], buf_ids[:n]
+        del buf_chunks[:n], buf_ids[:n]
+        committed = {}
+        while pending and pending[0][0] <= n:
+            _, source, entry = pending.pop(0)
+            committed[source] = entry
+        for p in pending:
+            p[0] -= n
+        return chunks, ids, committed
+
+    for source, entry, chunks, ids in files:
+        buf_chunks.extend(chunks)
+        buf_ids.extend(ids)
+        pending.append([len(buf_chunks), source, entry])
+        while len(buf_chunks) >= batch_size:
+            yield cut(batch_size)
+
+    if buf_chunks or pending:
+        yield cut(len(buf_chunks))
+
+# ---------- streaming stats
+class IngestStats:
+    """
+    Aggregates behind print_ingest_stats, updated one file at a time. Memory grows with the number
+    of sources and distinct chunk lengths (bounded by CHUNK_SIZE), not with the number of chunks.
+    """
+
+    def __init__(self):
+        self.documents = 0
+        self.sources = set()
+        self.file_types = Counter()
+        self.chunks = 0
+        self.total_chars = 0
+        self.lengths = Counter()  # chunk length in chars -> chunks; exact percentiles
+        self.chunks_by_source = Counter()
+
+    def add_source(self, source: str, documents: int):
+        self.documents += documents
+        self.sources.add(source)
+        self.file_types[os.path.splitext(source)[1].lower().lstrip(".")] += documents
+
+    def add_documents(self, docs):
+        for d in docs:
+            self.add_source(d.metadata.get("source", "unknown"), 1)
+
+    def add_chunks(self, chunks):
+        for c in chunks:
+            n = len(c.page_content or "")
+            self.chunks += 1
+            self.total_chars += n
+            self.lengths[n] += 1
+            self.chunks_by_source[c.metadata.get("source", "unknown")] += 1
+
+    def percentile(self, p: float) -> int:
+        """
+        Same rank as sorted(lengths)[round(p / 100 * (n - 1))].
+        """
+        rank = int(round((p / 100) * (self.chunks - 1)))
+        seen = 0
+        for length in sorted(self.lengths):
+            seen += self.lengths[length]
+            if seen > rank:
+                return length
+        return 0
+
+    def count_lengths(self, below: int | None = None, above: int | None = None) -> int:
+        return sum(n for length, n in self.lengths.items()
+                   if (below is None or length < below) and (above is None or length > above))
+
+    def summary(self) -> dict:
+        if not self.chunks:
+            return {"documents": self.documents, "sources": len(self.sources), "chunks": 0}
+        return {
+            "documents": self.documents,
+            "sources": len(self.sources),
+            "chunks": self.chunks,
+            "min": min(self.lengths),
+            "avg": int(self.total_chars / self.chunks),
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "max": max(self.lengths),
+        }
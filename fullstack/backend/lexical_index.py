@@ -0,0 +1,134 @@
+import os, re, json
+from collections import Counter
+
+import numpy as np
+
+INDEX_FILE = "bm25_index.npz"
+
+# Compound tokens keep "$60/day", "3.2", "14-character" intact; their parts are indexed too.
+_TOKEN_RE = re.compile(r"[\w$%]+(?:[./:'-][\w$%]+)*")
+_PART_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have if in into is it its of on or such that the "
+    "their then there these they this to was were will with what which who how when where do does "
+    "can i my we our you your".split()
+)
+
+def tokenize(text: str) -> list[str]:
+    tokens = []
+    for tok in _TOKEN_RE.findall((text or "").lower()):
+        if tok not in _STOPWORDS:
+            tokens.append(tok)
+        if not tok.isalnum():
+            tokens.extend(p for p in _PART_RE.findall(tok) if p not in _STOPWORDS and p != tok)
+    return tokens
+
+class BM25Index:
+    """
+    Compact in-memory BM25 (Okapi) inverted index over the chunks in the vector store.
+
+    Postings are stored CSR-style: for term t, rows doc_ids[indptr[t]:indptr[t+1]]
+    with term frequencies tfs[...]. Chunk ids, texts and metadata are kept so the
+    lexical path can return documents without touching Chroma or the embedding model.
+    """
+
+    def __init__(self, ids, texts, metadatas, vocab, indptr, doc_ids, tfs, doc_len, k1=1.5, b=0.75):
+        self.ids = ids
+        self.texts = texts
+        self.metadatas = metadatas
+        self.vocab = vocab  # term -> term index
+        self.indptr = indptr
+        self.doc_ids = doc_ids
+        self.tfs = tfs
+        self.doc_len = doc_len
+        self.k1 = k1
+        self.b = b
+
+        n = len(ids)
+        self.avgdl = float(doc_len.mean()) if n else 0.0
+        df = np.diff(indptr).astype(np.float64)
+        self.idf = np.log(1.0 + (n - df + 0.5) / (df + 0.5)) if n else df
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def build(cls, ids: list[str], texts: list[str], metadatas: list[dict], k1=1.5, b=0.75):
+        postings = {}  # term -> [(row, tf)]
+        doc_len = np.zeros(len(ids), dtype=np.int32)
+        for row, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            doc_len[row] = sum(counts.values())
+            for term, tf in counts.items():
+                postings.setdefault(term, []).append((row, tf))
+
+        terms = sorted(postings)
+        vocab = {t: i for i, t in enumerate(terms)}
+        indptr = np.zeros(len(terms) + 1, dtype=np.int64)
+        for i, t in enumerate(terms):
+            indptr[i + 1] = indptr[i] + len(postings[t])
+
+        doc_ids = np.empty(int(indptr[-1]), dtype=np.int32)
+        tfs = np.empty(int(indptr[-1]), dtype=np.uint16)
+        for i, t in enumerate(terms):
+            rows, counts = zip(*postings[t])
+            doc_ids[indptr[i]:indptr[i + 1]] = rows
+            tfs[indptr[i]:indptr[i + 1]] = np.minimum(counts, np.iinfo(np.uint16).max)
+
+        return cls(list(ids), list(texts), list(metadatas), vocab, indptr, doc_ids, tfs, doc_len, k1, b)
+
+    def search(self, query: str, k: int) -> list[tuple[int, float]]:
+        """
+        Returns [(row, bm25_score)] best-first, only rows that share a term with the query.
+        """
+        if not len(self):
+            return []
+
+        scores = np.zeros(len(self), dtype=np.float64)
+        norm = self.k1 * (1.0 - self.b + self.b * self.doc_len / (self.avgdl or 1.0))
+        for term in set(tokenize(query)):
+            t = self.vocab.get(term)
+            if t is None:
+                continue
+            s, e = self.indptr[t], self.indptr[t + 1]
+            rows = self.doc_ids[s:e]
+            tf = self.tfs[s:e].astype(np.float64)
+            scores[rows] += self.idf[t] * tf * (self.k1 + 1.0) / (tf + norm[rows])
+
+        hits = np.flatnonzero(scores > 0)
+        if hits.size == 0:
+            return []
+        k = min(k, hits.size)
+        top = hits[np.argpartition(-scores[hits], k - 1)[:k]]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(r), float(scores[r])) for r in top]
+
+    # ---------- persistence
+    def save(self, path: str):
+        tmp = path + ".tmp.npz"
+        payload = json.dumps({"ids": self.ids, "texts": self.texts, "metadatas": self.metadatas,
+                              "terms": sorted(self.vocab, key=self.vocab.get), "k1": self.k1, "b": self.b})
+        np.savez_compressed(
+            tmp,
+            payload=np.frombuffer(payload.encode("utf-8"), dtype=np.uint8),
+            indptr=self.indptr, doc_ids=self.doc_ids, tfs=self.tfs, doc_len=self.doc_len,
+        )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str):
+        with np.load(path) as z:
+            payload = json.loads(z["payload"].tobytes().decode("utf-8"))
+            vocab = {t: i for i, t in enumerate(payload["terms"])}
+            return cls(payload["ids"], payload["texts"], payload["metadatas"], vocab,
+                       z["indptr"], z["doc_ids"], z["tfs"], z["doc_len"], payload["k1"], payload["b"])
+
+def reciprocal_rank_fusion(rankings: list[list[str]], k: int = 60) -> list[tuple[str, float]]:
+    """
+    Fuse several best-first id rankings: score(id) = sum(1 / (k + rank)).
+    """
+    scores = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, start=1):
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda x: x[1], reverse=True)
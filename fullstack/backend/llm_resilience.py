@@ -0,0 +1,317 @@
+import time, random, asyncio, logging, threading
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import openai
+
+# ---------- logging
+logging.basicConfig(level=logging.INFO)
+log = logging.getLogger(__name__)
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+class CircuitOpenError(RuntimeError):
+    """Every model's circuit breaker is open: fail fast instead of waiting out LLM_TIMEOUT."""
+
+# ---------- helpers
+def is_retryable(exc) -> bool:
+    if isinstance(exc, (openai.RateLimitError, openai.APIConnectionError)):  # the latter includes APITimeoutError
+        return True
+    return getattr(exc, "status_code", None) in RETRYABLE_STATUS
+
+def retry_after_s(exc) -> float | None:
+    response = getattr(exc, "response", None)
+    value = response.headers.get("retry-after") if response is not None else None
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+class LatencyWindow:
+    """
+    Rolling window of recent successful call latencies (seconds).
+    """
+
+    def __init__(self, size: int = 200, min_samples: int = 10):
+        self.min_samples = min_samples
+        self._values = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float):
+        with self._lock:
+            self._values.append(seconds)
+
+    def percentile(self, p: float) -> float | None:
+        with self._lock:
+            if len(self._values) < self.min_samples:
+                return None
+            values = sorted(self._values)
+        return values[min(len(values) - 1, int(round(p / 100.0 * (len(values) - 1))))]
+
+class CircuitBreaker:
+    """
+    closed -> open after failure_threshold consecutive retryable failures (0 = never opens);
+    open -> half_open after reset_s, letting a single trial call through;
+    half_open -> closed on success, back to open on failure.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_s: float = 30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_s = reset_s
+        self.clock = clock
+        self._failures = 0
+        self._opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    def _state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        return "half_open" if self.clock() - self._opened_at >= self.reset_s else "open"
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state()
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self._state()
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures, self._opened_at, self._trial = 0, None, False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial = False
+            if self.failure_threshold and (self._opened_at is not None or self._failures >= self.failure_threshold):
+                if self._opened_at is None:
+                    log.warning("[llm] circuit opened after %d consecutive failures", self._failures)
+                self._opened_at = self.clock()
+
+# ---------- resilient LLM
+class ResilientLLM:
+    """
+    Wraps LangChain chat models (invoke / ainvoke / stream) with, per call:
+      - jittered exponential backoff retries on 429 / 5xx / connection errors (Retry-After honoured);
+      - optional hedging: a second identical request once the first has run longer than the
+        recent p95 latency (at least hedge_min_s); the first response wins;
+      - a circuit breaker per model, so a provider that keeps failing is skipped immediately;
+      - a fallback model tried when the primary is exhausted or its circuit is open.
+    The wrapped models should be built with max_retries=0 so retries don't multiply.
+    With hedging, sync calls run on a pool of hedge_threads: size it for two requests per calling thread,
+    or calls queue behind each other there.
+    """
+
+    def __init__(self, primary, fallback=None, retries: int = 2, backoff_base_s: float = 0.5,
+                 backoff_max_s: float = 8.0, hedge: bool = False, hedge_min_s: float = 1.0,
+                 breaker_failures: int = 5, breaker_reset_s: float = 30.0, hedge_threads: int = 16):
+        self.targets = [("primary", primary, CircuitBreaker(breaker_failures, breaker_reset_s))]
+        if fallback is not None:
+            self.targets.append(("fallback", fallback, CircuitBreaker(breaker_failures, breaker_reset_s)))
+        self.retries = max(0, int(retries))
+        self.backoff_base_s = backoff_base_s
+        self.backoff_max_s = backoff_max_s
+        self.hedge = hedge
+        self.hedge_min_s = hedge_min_s
+        self.latency = LatencyWindow()
+
+        self._pool = ThreadPoolExecutor(max_workers=hedge_threads, thread_name_prefix="llm-hedge") if hedge else None
+        self._counts = Counter()
+        self._counts_lock = threading.Lock()
+
+    def _count(self, name: str):
+        with self._counts_lock:
+            self._counts[name] += 1
+
+    def backoff_s(self, attempt: int, exc) -> float:
+        server_hint = retry_after_s(exc)
+        if server_hint is not None:
+            return min(server_hint, self.backoff_max_s)
+        return random.uniform(0.0, min(self.backoff_max_s, self.backoff_base_s * (2 ** attempt)))
+
+    def hedge_delay_s(self) -> float:
+        return max(self.hedge_min_s, self.latency.percentile(95) or 0.0)
+
+    def _targets(self):
+        for i, target in enumerate(self.targets):
+            if i > 0:
+                self._count("fallbacks")
+            yield target
+
+    def _allow(self, breaker) -> bool:
+        if breaker.allow():
+            return True
+        self._count("rejected")
+        return False
+
+    def _failed(self, breaker, attempt: int, exc) -> float | None:
+        """
+        Book-keeping for a failed call. Returns the backoff before the next attempt on this model,
+        or None to move on to the next model (not retryable, or out of retries).
+        """
+        if not is_retryable(exc):
+            breaker.record_success()  # the provider answered; the same request would fail again
+            return None
+        breaker.record_failure()
+        if attempt >= self.retries:
+            return None
+        self._count("retries")
+        return self.backoff_s(attempt, exc)
+
+    def _succeeded(self, name: str, breaker, t0: float):
+        breaker.record_success()
+        if name == "primary":
+            self.latency.add(time.perf_counter() - t0)
+
+    def _no_result(self, error):
+        self._count("failures")
+        raise error or CircuitOpenError("[llm] circuit open for every model")
+
+    # ---- sync
+    def _call(self, target, messages):
+        if self._pool is None:
+            return target.invoke(messages)
+
+        first = self._pool.submit(target.invoke, messages)
+        done, _ = wait([first], timeout=self.hedge_delay_s())
+        if done:
+            return first.result()
+
+        self._count("hedges")
+        second = self._pool.submit(target.invoke, messages)
+        pending, error = {first, second}, None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                if fut.exception() is None:
+                    if fut is second:
+                        self._count("hedge_wins")
+                    return fut.result()  # the other request can't be aborted; it finishes in the pool
+                error = fut.exception()
+        raise error
+
+    def invoke(self, messages):
+        self._count("calls")
+        error = None
+        for name, target, breaker in self._targets():
+            for attempt in range(self.retries + 1):
+                if not self._allow(breaker):
+                    break
+                t0 = time.perf_counter()
+                try:
+                    result = self._call(target, messages)
+                except Exception as e:
+                    error = e
+                    delay = self._failed(breaker, attempt, e)
+                    if delay is None:
+                        break
+                    time.sleep(delay)
+                    continue
+                self._succeeded(name, breaker, t0)
+                return result
+        self._no_result(error)
+
+    # ---- async
+    async def _acall(self, target, messages):
+        if not self.hedge:
+            return await target.ainvoke(messages)
+
+        first = asyncio.ensure_future(target.ainvoke(messages))
+        done, _ = await asyncio.wait({first}, timeout=self.hedge_delay_s())
+        if done:
+            return first.result()
+
+        self._count("hedges")
+        second = asyncio.ensure_future(target.ainvoke(messages))
+        pending, error = {first, second}, None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is second:
+                            self._count("hedge_wins")
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()  # closes the losing HTTP request
+
+    async def ainvoke(self, messages):
+        self._count("calls")
+        error = None
+        for name, target, breaker in self._targets():
+            for attempt in range(self.retries + 1):
+                if not self._allow(breaker):
+                    break
+                t0 = time.perf_counter()
+                try:
+                    result = await self._acall(target, messages)
+                except Exception as e:
+                    error = e
+                    delay = self._failed(breaker, attempt, e)
+                    if delay is None:
+                        break
+                    await asyncio.sleep(delay)
+                    continue
+                self._succeeded(name, breaker, t0)
+                return result
+        self._no_result(error)
+
+    # ---- streaming
+    def stream(self, messages):
+        """
+        target.stream with retries / breaker / fallback applied until the first chunk arrives.
+        Errors after that propagate: part of the answer has already been sent. No hedging.
+        """
+        self._count("calls")
+        error = None
+        for name, target, breaker in self._targets():
+            for attempt in range(self.retries + 1):
+                if not self._allow(breaker):
+                    break
+                t0 = time.perf_counter()
+                chunks = target.stream(messages)
+                try:
+                    first = next(chunks)
+                except StopIteration:
+                    self._succeeded(name, breaker, t0)
+                    return
+                except Exception as e:
+                    chunks.close()
+                    error = e
+                    delay = self._failed(breaker, attempt, e)
+                    if delay is None:
+                        break
+                    time.sleep(delay)
+                    continue
+
+                breaker.record_success()
+                try:
+                    yield first
+                    yield from chunks
+                finally:
+                    chunks.close()
+                return
+        self._no_result(error)
+
+    def stats(self) -> dict:
+        with self._counts_lock:
+            counts = dict(self._counts)
+        p95 = self.latency.percentile(95)
+        return {
+            **{k: counts.get(k, 0) for k in ("calls", "retries", "hedges", "hedge_wins", "fallbacks", "rejected", "failures")},
+            "latency_p95_s": p95,
+            "hedge_delay_s": self.hedge_delay_s() if self.hedge else None,
+            "breakers": {name: breaker.state for name, _, breaker in self.targets},
+        }
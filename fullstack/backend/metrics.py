@@ -0,0 +1,145 @@
+import os, time, contextvars
+from contextlib import contextmanager
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess,
+)
+
+# ---------- metrics
+# stage:   embed, search, rerank, pack, prompt, llm, validate
+# outcome: answered, low_relevance_refusal, validation_refusal, model_refusal, llm_error, retrieval_error, cached
+# With several gunicorn workers set PROMETHEUS_MULTIPROC_DIR (an empty directory) so /metrics
+# aggregates every worker instead of reporting whichever one answered the scrape.
+
+STAGE_SECONDS = Histogram(
+    "rag_stage_seconds", "Time spent in one pipeline stage of a /chat request",
+    ["stage", "outcome"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+REQUEST_SECONDS = Histogram(
+    "rag_request_seconds", "End-to-end answer_and_sources time",
+    ["outcome"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60),
+)
+REQUESTS = Counter("rag_requests_total", "Answered /chat requests", ["outcome", "coalesced"])
+CHUNKS = Histogram(
+    "rag_chunks", "Chunks per request: retrieved by the first stage / sent to the LLM",
+    ["kind"],
+    buckets=(0, 1, 2, 3, 4, 5, 8, 10, 15, 20, 30, 50),
+)
+LLM_TOKENS = Histogram(
+    "rag_llm_tokens", "Prompt / completion tokens per LLM call, as reported by the provider",
+    ["kind"],
+    buckets=(50, 100, 250, 500, 1000, 1500, 2000, 3000, 4000, 6000, 8000),
+)
+
+# ---------- per-request timings
+class RequestTimings:
+    """
+    Stage durations and counts of one request. Stages are exclusive: time spent in a stage
+    nested inside another (e.g. embed inside search) is only counted for the inner one.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.counts = {}
+        self.coalesced = False
+        self.outcome = None
+        self.total_s = None
+        self._stack = []
+
+    @contextmanager
+    def stage(self, name: str):
+        t0 = time.perf_counter()
+        self._stack.append(0.0)
+        try:
+            yield
+        finally:
+            nested = self._stack.pop()
+            elapsed = time.perf_counter() - t0
+            self.stages[name] = self.stages.get(name, 0.0) + elapsed - nested
+            if self._stack:
+                self._stack[-1] += elapsed
+
+    def count(self, name: str, value: int):
+        self.counts[name] = value
+
+    def finish(self, outcome: str):
+        """
+        Records the request in the Prometheus metrics (once).
+        """
+        if self.total_s is not None:
+            return
+        self.outcome = outcome
+        self.total_s = time.perf_counter() - self.started
+        for name, seconds in self.stages.items():
+            STAGE_SECONDS.labels(name, outcome).observe(seconds)
+        REQUEST_SECONDS.labels(outcome).observe(self.total_s)
+        REQUESTS.labels(outcome, "true" if self.coalesced else "false").inc()
+        for kind in ("retrieved", "context"):
+            if f"{kind}_chunks" in self.counts:
+                CHUNKS.labels(kind).observe(self.counts[f"{kind}_chunks"])
+        for kind in ("prompt", "completion"):
+            if f"{kind}_tokens" in self.counts:
+                LLM_TOKENS.labels(kind).observe(self.counts[f"{kind}_tokens"])
+
+    def as_dict(self) -> dict:
+        return {
+            "outcome": self.outcome,
+            "coalesced": self.coalesced,
+            "total_ms": round((self.total_s or 0.0) * 1000.0, 2),
+            "stages_ms": {name: round(s * 1000.0, 2) for name, s in self.stages.items()},
+            **self.counts,
+        }
+
+_current = contextvars.ContextVar("rag_request_timings", default=None)
+
+@contextmanager
+def track(timings: RequestTimings):
+    """
+    Makes timings the target of stage() / count() in this thread or task (and in contexts copied from it).
+    """
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
+
+def current() -> RequestTimings | None:
+    return _current.get()
+
+@contextmanager
+def stage(name: str):
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    with timings.stage(name):
+        yield
+
+def count(name: str, value: int):
+    timings = _current.get()
+    if timings is not None:
+        timings.count(name, value)
+
+def token_usage(llm_resp) -> dict:
+    """
+    {"prompt_tokens": n, "completion_tokens": m} from a LangChain chat response, when the provider reported usage.
+    """
+    usage = getattr(llm_resp, "usage_metadata", None) or {}
+    if usage:
+        return {"prompt_tokens": usage.get("input_tokens", 0), "completion_tokens": usage.get("output_tokens", 0)}
+    usage = (getattr(llm_resp, "response_metadata", None) or {}).get("token_usage") or {}
+    return {k: usage[k] for k in ("prompt_tokens", "completion_tokens") if k in usage}
+
+# ---------- exposition
+def render_latest():
+    """
+    Returns (body, content_type) for GET /metrics.
+    """
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
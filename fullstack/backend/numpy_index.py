@@ -0,0 +1,127 @@
+import os, json
+
+import numpy as np
+
+INDEX_DIR = "numpy_index"
+
+# ---------- export
+def export_from_chroma(db, persist_dir: str) -> int:
+    """
+    Dump every chunk embedding in the store to <persist_dir>/numpy_index/:
+      vectors.f32  float32 matrix (N x dim), memory-mapped at query time
+      docs.json    parallel arrays: ids, texts, metadatas
+      meta.json    {"count", "dim", "space"}
+    Rows are sorted by chunk id. Returns the number of rows written.
+    """
+    data = db.get(include=["embeddings", "documents", "metadatas"])
+    rows = sorted(zip(data["ids"], range(len(data["ids"]))))
+    order = [i for _, i in rows]
+
+    embeddings = data.get("embeddings")
+    if embeddings is None or len(order) == 0:
+        mat = np.zeros((0, 0), dtype=np.float32)
+    else:
+        mat = np.asarray(embeddings, dtype=np.float32)[order]
+
+    space = getattr(db, "space", None) or (db._collection.metadata or {}).get("hnsw:space", "l2")  # ShardedChroma: .space
+
+    out_dir = os.path.join(persist_dir, INDEX_DIR)
+    tmp_dir = out_dir + ".tmp"
+    os.makedirs(tmp_dir, exist_ok=True)
+    mat.tofile(os.path.join(tmp_dir, "vectors.f32"))
+    with open(os.path.join(tmp_dir, "docs.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "ids": [data["ids"][i] for i in order],
+            "texts": [data["documents"][i] or "" for i in order],
+            "metadatas": [data["metadatas"][i] or {} for i in order],
+        }, f)
+    with open(os.path.join(tmp_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"count": int(mat.shape[0]), "dim": int(mat.shape[1]) if mat.ndim == 2 else 0, "space": space}, f)
+
+    # Swap the finished directory in; readers only ever see a complete export
+    if os.path.isdir(out_dir):
+        old_dir = out_dir + ".old"
+        os.replace(out_dir, old_dir)
+        os.replace(tmp_dir, out_dir)
+        for name in os.listdir(old_dir):
+            os.remove(os.path.join(old_dir, name))
+        os.rmdir(old_dir)
+    else:
+        os.replace(tmp_dir, out_dir)
+    return int(mat.shape[0])
+
+# ---------- exact search
+def distances_from_dots(dots, sq_norms, q, space: str):
+    """
+    Chroma's distance for each row from its dot product with q and its squared norm.
+    """
+    if space == "cosine":
+        denom = np.sqrt(sq_norms) * float(np.linalg.norm(q))
+        return 1.0 - dots / np.where(denom > 0, denom, 1.0)
+    if space == "ip":
+        return 1.0 - dots
+    return np.maximum(sq_norms - 2.0 * dots + float(q @ q), 0.0)
+
+class NumpyIndex:
+    """
+    Exact top-k over a memory-mapped float32 matrix: one matmul per query.
+    Distances use the collection's hnsw:space so the caller can apply the same
+    relevance function as the Chroma path (l2 -> squared L2, cosine -> 1 - cos, ip -> 1 - dot).
+    """
+
+    def __init__(self, vectors, ids, texts, metadatas, space: str = "l2"):
+        self.vectors = vectors
+        self.ids = ids
+        self.texts = texts
+        self.metadatas = metadatas
+        self.space = space
+        self.sq_norms = np.einsum("ij,ij->i", vectors, vectors) if len(ids) else np.zeros(0, dtype=np.float32)
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def load(cls, persist_dir: str):
+        base = os.path.join(persist_dir, INDEX_DIR)
+        with open(os.path.join(base, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        with open(os.path.join(base, "docs.json"), "r", encoding="utf-8") as f:
+            docs = json.load(f)
+
+        count, dim = meta["count"], meta["dim"]
+        if count:
+            vectors = np.memmap(os.path.join(base, "vectors.f32"), dtype=np.float32, mode="r", shape=(count, dim))
+        else:
+            vectors = np.zeros((0, dim), dtype=np.float32)
+        return cls(vectors, docs["ids"], docs["texts"], docs["metadatas"], meta.get("space", "l2"))
+
+    def distances(self, qvec, rows=None):
+        """
+        Distances to every row, or only to `rows` (reads just those rows of the memmap).
+        """
+        q = np.asarray(qvec, dtype=np.float32)
+        if rows is None:
+            return distances_from_dots(self.vectors @ q, self.sq_norms, q, self.space)
+        return distances_from_dots(self.vectors[rows] @ q, self.sq_norms[rows], q, self.space)
+
+    def search(self, qvec, k: int) -> list[tuple[int, float]]:
+        """
+        Returns [(row, distance)] nearest-first.
+        """
+        if not len(self):
+            return []
+        d = self.distances(qvec)
+        k = min(k, d.shape[0])
+        top = np.argpartition(d, k - 1)[:k]
+        top = top[np.argsort(d[top], kind="stable")]
+        return [(int(r), float(d[r])) for r in top]
+
+# ---------- main (export an existing store without re-ingesting)
+if __name__ == "__main__":
+    from config import Config
+    from sharded_store import open_vectorstore
+    from store_versions import store_dir
+
+    store = store_dir(Config().PERSIST_DIR)
+    n = export_from_chroma(open_vectorstore(store), store)
+    print(f"✅ Exported {n} vectors to {os.path.join(store, INDEX_DIR)}")
@@ -0,0 +1,69 @@
+import os, gzip, json, hashlib
+
+from langchain_core.documents import Document
+
+# ---------- loader versions
+PARSE_FORMAT = 1  # bump when the cached payload changes
+
+# Packages whose version changes the text a loader extracts
+LOADER_PACKAGES = {
+    "pdf": ("langchain-community", "pypdf"),
+    "html": ("langchain-community", "beautifulsoup4", "lxml"),
+}
+
+def loader_version(kind: str) -> str:
+    """
+    e.g. "pdf/1 langchain-community==0.2.19 pypdf==5.1.0"; a new version of any of them misses the cache.
+    """
+    from importlib.metadata import version, PackageNotFoundError
+
+    parts = [f"{kind}/{PARSE_FORMAT}"]
+    for pkg in LOADER_PACKAGES[kind]:
+        try:
+            parts.append(f"{pkg}=={version(pkg)}")
+        except PackageNotFoundError:
+            parts.append(f"{pkg}==none")
+    return " ".join(parts)
+
+# ---------- on-disk cache
+class ParseCache:
+    """
+    Content-addressed cache of loader output: (sha1 of the file, loader version) -> extracted pages.
+
+    Layout:
+      <root>/<sha1[:2]>/<sha1>-<sha1(loader version)[:12]>.json.gz
+        {"loader": ..., "pages": [[page text, page metadata], ...]}
+
+    Page metadata is what the loader produced, minus "source" (the file's path, restored on read).
+    Files are written to a temp name and renamed, so parallel ingest workers never see a partial entry.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self._versions = {}  # kind -> loader version
+
+    def _path(self, sha1: str, kind: str) -> str:
+        if kind not in self._versions:
+            self._versions[kind] = loader_version(kind)
+        tag = hashlib.sha1(self._versions[kind].encode("utf-8")).hexdigest()[:12]
+        return os.path.join(self.root, sha1[:2], f"{sha1}-{tag}.json.gz")
+
+    def get(self, sha1: str, kind: str, source: str) -> list | None:
+        """
+        The cached Documents for this file content, or None on a miss (or an unreadable entry).
+        """
+        try:
+            with gzip.open(self._path(sha1, kind), "rt", encoding="utf-8") as f:
+                pages = json.load(f)["pages"]
+        except (OSError, ValueError, EOFError, KeyError, TypeError):
+            return None
+        return [Document(page_content=text, metadata={"source": source, **meta}) for text, meta in pages]
+
+    def put(self, sha1: str, kind: str, docs: list):
+        path = self._path(sha1, kind)
+        pages = [[d.page_content, {k: v for k, v in d.metadata.items() if k != "source"}] for d in docs]
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with gzip.open(tmp, "wt", encoding="utf-8", compresslevel=6) as f:
+            json.dump({"loader": self._versions[kind], "pages": pages}, f, separators=(",", ":"), default=str)
+        os.replace(tmp, path)
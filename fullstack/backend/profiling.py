@@ -0,0 +1,212 @@
+import os, sys, json, time, random, pstats, hashlib, cProfile, logging, threading
+from collections import Counter
+from contextlib import contextmanager
+
+# ---------- logging
+logging.basicConfig(level=logging.INFO)
+log = logging.getLogger(__name__)
+
+FORMATS = ("collapsed", "pstats")
+
+# ---------- stack sampling
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+class StackSampler:
+    """
+    Samples one thread's Python stack every interval_s from a background thread.
+    counts maps "root;...;leaf" to the number of samples (collapsed-stack / flamegraph.pl format).
+    """
+
+    def __init__(self, thread_id: int, interval_s: float = 0.005):
+        self.thread_id = thread_id
+        self.interval_s = interval_s
+        self.counts = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval_s):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame))
+                frame = frame.f_back
+            if stack:
+                self.counts[";".join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        self._thread.join()
+        return self.counts
+
+def write_collapsed(counts: Counter, path: str):
+    with open(path, "w", encoding="utf-8") as f:
+        for stack, n in counts.most_common():
+            f.write(f"{stack} {n}\n")
+
+def request_label(path: str, question: str = "") -> str:
+    """
+    "<path> q=<sha1(question)[:12]>": profiles land on disk, so they identify a question (the same
+    question gets the same hash) without storing what the user asked.
+    """
+    if not question:
+        return path
+    return f"{path} q={hashlib.sha1(question.encode('utf-8')).hexdigest()[:12]}"
+
+# ---------- request profiler
+class RequestProfiler:
+    """
+    Opt-in profiling of whole requests. A request is profiled when it asks for it (forced),
+    when the admin armed the next N requests, or with probability sample_rate.
+    Output goes to out_dir as <name>.collapsed (stack samples) or <name>.pstats (cProfile),
+    plus <name>.json with the trigger, label and duration; only the newest max_files are kept.
+    When nothing is armed and sample_rate is 0, trigger() is a couple of attribute reads.
+
+    From Python 3.12 cProfile records every thread of the process, not just the one that enabled it,
+    so a pstats profile is only taken when the request is the one in flight (request_started /
+    request_finished count them); otherwise it is stack-sampled. Requests that start while cProfile
+    runs still end up in it: their number is recorded as "overlapping" in <name>.json.
+    """
+
+    def __init__(self, out_dir: str, sample_rate: float = 0.0, fmt: str = "collapsed",
+                 interval_ms: float = 5.0, max_files: int = 200):
+        if fmt not in FORMATS:
+            raise RuntimeError(f"[profile] format must be one of {FORMATS}, got: {fmt}")
+        self.out_dir = out_dir
+        self.sample_rate = sample_rate
+        self.fmt = fmt
+        self.interval_s = max(0.001, interval_ms / 1000.0)
+        self.max_files = max(1, max_files)
+        self.armed = 0
+        self._lock = threading.Lock()
+        self._cprofile_lock = threading.Lock()  # one cProfile at a time (required from Python 3.12)
+        self._in_flight = 0
+        self._started = 0
+
+    # ---- request accounting (every request of the worker, profiled or not)
+    def request_started(self):
+        with self._lock:
+            self._in_flight += 1
+            self._started += 1
+
+    def request_finished(self):
+        with self._lock:
+            self._in_flight -= 1
+
+    # ---- control
+    def configure(self, arm: int | None = None, sample_rate: float | None = None, fmt: str | None = None):
+        with self._lock:
+            if arm is not None:
+                self.armed = max(0, int(arm))
+            if sample_rate is not None:
+                self.sample_rate = min(1.0, max(0.0, float(sample_rate)))
+            if fmt is not None:
+                if fmt not in FORMATS:
+                    raise ValueError(f"format must be one of {FORMATS}")
+                self.fmt = fmt
+
+    def state(self) -> dict:
+        return {"armed": self.armed, "sample_rate": self.sample_rate, "format": self.fmt, "dir": self.out_dir}
+
+    def trigger(self, forced: bool = False) -> str | None:
+        if forced:
+            return "request"
+        if self.armed:
+            with self._lock:
+                if self.armed:
+                    self.armed -= 1
+                    return "armed"
+        if self.sample_rate and random.random() < self.sample_rate:
+            return "sampled"
+        return None
+
+    # ---- profiling
+    @contextmanager
+    def profile(self, trigger: str, label: str = ""):
+        """
+        Profiles the enclosed block (run on the current thread) and writes the output files.
+        Yields a dict whose "name" is set before the block runs.
+        """
+        now = time.time()
+        name = f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(now))}.{int(now * 1000) % 1000:03d}-{os.getpid()}-{random.randrange(16**4):04x}"
+        info = {"name": name}
+        fmt = self.fmt
+        profiler = sampler = None
+        started = self._started
+
+        if fmt == "pstats":
+            # cProfile would also record the other requests' threads: sample this one instead
+            if self._in_flight <= 1 and self._cprofile_lock.acquire(blocking=False):
+                profiler = cProfile.Profile()
+            else:
+                fmt = "collapsed"
+        if profiler is not None:
+            profiler.enable()
+        else:
+            sampler = StackSampler(threading.get_ident(), self.interval_s)
+            sampler.start()
+
+        t0 = time.perf_counter()
+        try:
+            yield info
+        finally:
+            duration = time.perf_counter() - t0
+            meta = {
+                "trigger": trigger, "label": label[:200], "format": fmt,
+                "duration_ms": round(duration * 1000.0, 1), "created": time.time(), "pid": os.getpid(),
+            }
+            if profiler is not None:
+                profiler.disable()
+                self._cprofile_lock.release()
+                meta["overlapping"] = self._started - started
+            counts = sampler.stop() if sampler is not None else None
+            try:
+                self._write(name, fmt, profiler, counts, meta)
+            except Exception:
+                log.exception("[profile] failed to write %s", name)
+
+    def _write(self, name: str, fmt: str, profiler, counts, meta: dict):
+        os.makedirs(self.out_dir, exist_ok=True)
+        base = os.path.join(self.out_dir, name)
+        if fmt == "pstats":
+            pstats.Stats(profiler).dump_stats(base + ".pstats")
+            meta["file"] = name + ".pstats"
+        else:
+            write_collapsed(counts, base + ".collapsed")
+            meta["file"] = name + ".collapsed"
+            meta["samples"] = sum(counts.values())
+        with open(base + ".json", "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        log.info("[profile] %s (%s, %.0f ms) -> %s", name, meta["trigger"], meta["duration_ms"], meta["file"])
+        self._prune()
+
+    def _prune(self):
+        metas = sorted(n for n in os.listdir(self.out_dir) if n.endswith(".json"))
+        for meta in metas[:-self.max_files]:
+            stem = meta[:-len(".json")]
+            for ext in (".json", ".collapsed", ".pstats"):
+                try:
+                    os.remove(os.path.join(self.out_dir, stem + ext))
+                except FileNotFoundError:
+                    pass
+
+    # ---- listing
+    def list(self) -> list[dict]:
+        """
+        Newest first.
+        """
+        if not os.path.isdir(self.out_dir):
+            return []
+        out = []
+        for name in sorted((n for n in os.listdir(self.out_dir) if n.endswith(".json")), reverse=True):
+            try:
+                with open(os.path.join(self.out_dir, name), "r", encoding="utf-8") as f:
+                    out.append({"name": name[:-len(".json")], **json.load(f)})
+            except (OSError, ValueError):
+                continue
+        return out
@@ -0,0 +1,120 @@
+import os
+
+import numpy as np
+
+from numpy_index import NumpyIndex, INDEX_DIR, distances_from_dots
+
+CODE_FILES = {"int8": "codes_int8.npz", "binary": "codes_binary.npz"}
+
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+_SCAN_BLOCK = 65536  # rows dequantized at a time; bounds the float32 scratch memory
+
+# ---------- build (from the NumPy export, so codes share its row order)
+def _savez(path: str, **arrays):
+    tmp = path + ".tmp.npz"
+    np.savez(tmp, **arrays)
+    os.replace(tmp, path)
+
+def build_quantized(persist_dir: str) -> dict:
+    """
+    Writes int8 (per-dimension min/max scalar) and 1-bit (sign around the mean) codes next to
+    the float export in <persist_dir>/numpy_index/. Returns {mode: bytes of codes}.
+    """
+    base = NumpyIndex.load(persist_dir)
+    out_dir = os.path.join(persist_dir, INDEX_DIR)
+    vectors = np.asarray(base.vectors, dtype=np.float32)
+    dim = vectors.shape[1] if vectors.ndim == 2 else 0
+
+    if len(base):
+        lo, hi = vectors.min(axis=0), vectors.max(axis=0)
+        center = vectors.mean(axis=0)
+    else:
+        lo = hi = center = np.zeros(dim, dtype=np.float32)
+    scale = np.where(hi > lo, (hi - lo) / 255.0, 1.0).astype(np.float32)
+    codes = (np.clip(np.rint((vectors - lo) / scale), 0, 255) - 128).astype(np.int8)
+    bits = np.packbits(vectors > center, axis=1)
+
+    _savez(os.path.join(out_dir, CODE_FILES["int8"]), codes=codes, lo=lo.astype(np.float32), scale=scale)
+    _savez(os.path.join(out_dir, CODE_FILES["binary"]), bits=bits, center=center.astype(np.float32))
+    return {"float32": int(vectors.nbytes), "int8": int(codes.nbytes), "binary": int(bits.nbytes)}
+
+# ---------- search
+class QuantizedIndex:
+    """
+    Two-stage search: scan compact codes for `candidates` rows, then rescore only those rows
+    with the exact float32 vectors (memory-mapped, so only candidate rows are read).
+    Same interface as NumpyIndex: search(qvec, k) -> [(row, exact distance)], texts, metadatas.
+    """
+
+    def __init__(self, base: NumpyIndex, mode: str, arrays: dict, candidates: int = 50):
+        self.base = base
+        self.mode = mode
+        self.candidates = max(1, int(candidates))
+        self.texts = base.texts
+        self.metadatas = base.metadatas
+
+        if mode == "int8":
+            self.codes, self.lo, self.scale = arrays["codes"], arrays["lo"], arrays["scale"]
+            deq_sq = np.zeros(len(base), dtype=np.float32)
+            for s in range(0, len(base), _SCAN_BLOCK):
+                deq = self._dequantize(s, s + _SCAN_BLOCK)
+                deq_sq[s:s + deq.shape[0]] = np.einsum("ij,ij->i", deq, deq)
+            self.deq_sq_norms = deq_sq
+        elif mode == "binary":
+            self.bits, self.center = arrays["bits"], arrays["center"]
+        else:
+            raise ValueError(f"[quant] unknown mode: {mode}")
+
+    def __len__(self):
+        return len(self.base)
+
+    @classmethod
+    def load(cls, persist_dir: str, mode: str, candidates: int = 50):
+        with np.load(os.path.join(persist_dir, INDEX_DIR, CODE_FILES[mode])) as z:
+            arrays = {name: z[name] for name in z.files}
+        return cls(NumpyIndex.load(persist_dir), mode, arrays, candidates)
+
+    def code_bytes(self) -> int:
+        return int(self.codes.nbytes if self.mode == "int8" else self.bits.nbytes)
+
+    def _dequantize(self, start: int, end: int):
+        return (self.codes[start:end].astype(np.float32) + 128.0) * self.scale + self.lo
+
+    def approx_distances(self, qvec):
+        q = np.asarray(qvec, dtype=np.float32)
+        if self.mode == "binary":
+            qbits = np.packbits(q > self.center)
+            return _POPCOUNT[np.bitwise_xor(self.bits, qbits)].sum(axis=1, dtype=np.int32)
+
+        # x_hat . q = (codes + 128) . (scale * q) + lo . q, without materializing all of x_hat at once
+        qs = self.scale * q
+        offset = float((128.0 * self.scale + self.lo) @ q)
+        dots = np.empty(len(self), dtype=np.float32)
+        for s in range(0, len(self), _SCAN_BLOCK):
+            block = self.codes[s:s + _SCAN_BLOCK]
+            dots[s:s + block.shape[0]] = block.astype(np.float32) @ qs + offset
+        return distances_from_dots(dots, self.deq_sq_norms, q, self.base.space)
+
+    def search(self, qvec, k: int, candidates: int | None = None) -> list[tuple[int, float]]:
+        """
+        Returns [(row, exact distance)] nearest-first among the best `candidates` by code distance.
+        """
+        if not len(self):
+            return []
+        approx = self.approx_distances(qvec)
+        c = min(len(self), max(k, candidates or self.candidates))
+        rows = np.sort(np.argpartition(approx, c - 1)[:c])  # sorted -> sequential memmap reads
+
+        exact = self.base.distances(qvec, rows)
+        k = min(k, c)
+        top = np.argpartition(exact, k - 1)[:k]
+        top = top[np.argsort(exact[top], kind="stable")]
+        return [(int(rows[i]), float(exact[i])) for i in top]
+
+# ---------- main (build codes for an existing export without re-ingesting)
+if __name__ == "__main__":
+    from config import Config
+    from store_versions import store_dir
+
+    sizes = build_quantized(store_dir(Config().PERSIST_DIR))
+    print("✅ Quantized codes written: " + ", ".join(f"{k}={v / 1024:.1f} KiB" for k, v in sizes.items()))
@@ -0,0 +1,83 @@
+import time, hashlib, threading
+from collections import OrderedDict
+
+# ---------- cross-encoder reranker
+class CrossEncoderReranker:
+    """
+    Second retrieval stage: scores (query, chunk) pairs with a local cross-encoder and keeps the best top_n.
+
+    Scores are cached in an LRU keyed by (query, sha1(chunk text)), so a repeated or popular
+    question only runs the model for chunks it has not scored yet. The model is loaded on first use.
+    """
+
+    def __init__(self, model_name: str, cache_size: int = 4096, model=None):
+        self.model_name = model_name
+        self.cache_size = max(0, int(cache_size))
+        self._model = model
+        self._model_lock = threading.Lock()
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.predict_seconds = 0.0
+
+    @property
+    def model(self):
+        with self._model_lock:
+            if self._model is None:
+                from sentence_transformers import CrossEncoder
+                self._model = CrossEncoder(self.model_name)
+            return self._model
+
+    def _get(self, key):
+        with self._lock:
+            score = self._cache.get(key)
+            if score is None:
+                self.misses += 1
+                return None
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return score
+
+    def _put(self, key, score: float):
+        if not self.cache_size:
+            return
+        with self._lock:
+            self._cache[key] = score
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def scores(self, query: str, texts: list[str]) -> list[float]:
+        keys = [(query, hashlib.sha1((t or "").encode("utf-8")).hexdigest()) for t in texts]
+        out = [self._get(k) for k in keys]
+
+        todo = [i for i, s in enumerate(out) if s is None]
+        if todo:
+            t0 = time.perf_counter()
+            predicted = self.model.predict([(query, texts[i]) for i in todo])
+            self.predict_seconds += time.perf_counter() - t0
+            for i, s in zip(todo, predicted):
+                out[i] = float(s)
+                self._put(keys[i], out[i])
+        return out
+
+    def rerank(self, query: str, docs: list, top_n: int) -> list:
+        """
+        docs: LangChain Documents. Returns up to top_n [(doc, rerank_score)] best-first;
+        ties keep the incoming (first-stage) order.
+        """
+        scored = list(zip(docs, self.scores(query, [d.page_content for d in docs])))
+        scored.sort(key=lambda x: x[1], reverse=True)
+        return scored[:top_n]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "model": self.model_name,
+                "cache_entries": len(self._cache),
+                "hits": self.hits,
+                "misses": self.misses,
+                "predict_seconds": self.predict_seconds,
+            }
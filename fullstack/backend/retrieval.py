@@ -0,0 +1,247 @@
+# ---------- retrieval
+# The retrieval half of the RAG pipeline: query embeddings, the served store (and the side indexes ingest.py
+# writes next to it) and retrieve(). No LLM client is built here, so run_eval.py --mode retrieval and the
+# search benches can import this module alone; backend.py imports it for the answer pipeline.
+import os, logging, threading
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.documents import Document
+
+from corpus_version import read_corpus_version
+from lexical_index import BM25Index, INDEX_FILE as LEXICAL_INDEX_FILE, reciprocal_rank_fusion
+from numpy_index import NumpyIndex, INDEX_DIR as NUMPY_INDEX_DIR
+from quantized_index import QuantizedIndex, CODE_FILES as QUANT_CODE_FILES
+from embed_service import BatchedEmbeddings, RemoteEmbeddings
+from embedding_runtime import build_embeddings
+from store_versions import store_dir
+from sharded_store import ShardedChroma, open_vectorstore, where_clause, matches
+from config import Config
+import metrics
+
+log = logging.getLogger(__name__)
+cfg = Config()
+
+# ---------- query embeddings
+def make_embeddings():
+    """
+    Query embeddings: the shared embedding service (embed_service.py) when EMBED_SERVICE_SOCKET is set,
+    else the local model, micro-batched across this worker's threads with EMBED_MICROBATCH=1.
+    """
+    local = lambda: build_embeddings(cfg)
+    if cfg.EMBED_SERVICE_SOCKET:
+        return RemoteEmbeddings(cfg.EMBED_SERVICE_SOCKET, fallback=local)
+    if cfg.EMBED_MICROBATCH:
+        return BatchedEmbeddings(local(), cfg.EMBED_BATCH_MAX, cfg.EMBED_BATCH_WAIT_MS)
+    return local()
+
+class LazyEmbeddings:
+    """
+    Builds the embeddings with make() on first use. RETRIEVAL_MODE=lexical never embeds a query, so the
+    model is only loaded if a search falls back to vectors (no BM25 index next to the store).
+    """
+
+    def __init__(self, make):
+        self._make = make
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        with self._lock:
+            if self._model is None:
+                self._model = self._make()
+            return self._model
+
+    def embed_query(self, text: str):
+        return self.model.embed_query(text)
+
+    def embed_documents(self, texts: list[str]):
+        return self.model.embed_documents(texts)
+
+embeddings = LazyEmbeddings(make_embeddings) if cfg.RETRIEVAL_MODE == "lexical" else make_embeddings()
+
+# Searches of a sharded store (SHARD_BY at ingest) run on this pool, one task per shard
+_shard_pool = ThreadPoolExecutor(max_workers=cfg.SHARD_THREADS, thread_name_prefix="rag-shard")
+
+def open_store(path: str):
+    return open_vectorstore(path, embeddings, pool=_shard_pool)
+
+# The store served: PERSIST_DIR itself, or the version its CURRENT file points at (blue/green ingest)
+store_path = store_dir(cfg.PERSIST_DIR)
+vectordb = open_store(store_path)
+_store_lock = threading.Lock()
+_retired_store = None  # previously served version, closed at the next swap
+
+def refresh_store() -> bool:
+    """
+    Called before each request (one stat() of CURRENT): when ingest has published a new version,
+    open it and make it the store new requests use. A request still running on the old handle keeps
+    working; it is closed only at the following swap. Returns True when it swapped.
+    """
+    global store_path, vectordb, _retired_store
+    path = store_dir(cfg.PERSIST_DIR)
+    if path == store_path:
+        return False
+    with _store_lock:
+        if path == store_path:
+            return False
+        db = open_store(path)
+        if _retired_store not in (None, path):  # Chroma shares one client per path: don't close the one just reopened
+            _close_store(_retired_store)
+        _retired_store, store_path, vectordb = store_path, path, db
+    log.info("[rag] now serving store %s (corpus version %s)", path, read_corpus_version(path))
+    return True
+
+def _close_store(path: str):
+    from chromadb.api.shared_system_client import SharedSystemClient
+
+    system = SharedSystemClient._identifier_to_system.pop(path, None)
+    if system is not None:
+        system.stop()
+
+# ---------- search
+class _PerCorpusVersion:
+    """
+    An index file written by ingest.py next to the store, (re)loaded whenever the served
+    store or its corpus version changes. path(store) and load(store) take the store directory.
+    get() returns None if it is missing or unreadable.
+    """
+
+    def __init__(self, name: str, path, load):
+        self.name = name
+        self.path = path
+        self.load = load
+        self._version = None
+        self._value = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        store = store_path
+        version = (store, read_corpus_version(store))
+        with self._lock:
+            if self._version != version:
+                value = None
+                path = self.path(store)
+                try:
+                    if os.path.exists(path):
+                        value = self.load(store)
+                except Exception:
+                    log.exception("[rag] failed to load %s from %s", self.name, path)
+                if value is None:
+                    log.warning("[rag] No %s at %s; falling back to Chroma", self.name, path)
+                self._version, self._value = version, value
+            return self._value
+
+_lexical = _PerCorpusVersion(
+    "BM25 index",
+    lambda store: os.path.join(store, LEXICAL_INDEX_FILE),
+    lambda store: BM25Index.load(os.path.join(store, LEXICAL_INDEX_FILE)),
+)
+_numpy = _PerCorpusVersion(
+    "NumPy index",
+    lambda store: os.path.join(store, NUMPY_INDEX_DIR),
+    NumpyIndex.load,
+)
+
+def lexical_index():
+    return _lexical.get()
+
+_quantized = _PerCorpusVersion(
+    f"{cfg.QUANT_MODE} quantized index",
+    lambda store: os.path.join(store, NUMPY_INDEX_DIR, QUANT_CODE_FILES[cfg.QUANT_MODE]),
+    lambda store: QuantizedIndex.load(store, cfg.QUANT_MODE, cfg.QUANT_CANDIDATES),
+)
+
+def local_vector_index():
+    """
+    The in-process index selected by SEARCH_ENGINE (None -> query Chroma).
+    """
+    if cfg.SEARCH_ENGINE == "numpy":
+        return _numpy.get()
+    if cfg.SEARCH_ENGINE == "quantized":
+        return _quantized.get()
+    return None
+
+def _doc_key(doc) -> str:
+    return doc.metadata.get("chunk_id") or doc.page_content
+
+def _vector_search(q: str, qvec, k: int, filters: dict | None = None):
+    if qvec is None:
+        with metrics.stage("embed"):
+            qvec = embeddings.embed_query(q)
+    qvec = [float(x) for x in qvec]
+
+    db = vectordb
+    relevance_fn = db._select_relevance_score_fn()
+    index = local_vector_index() if not filters else None  # metadata filters need Chroma's `where`
+    if index is not None:
+        # Search over the exported matrix (exact, or codes + exact rescoring); Chroma's distances -> same relevance scores
+        hits = [
+            (Document(page_content=index.texts[row], metadata=dict(index.metadatas[row])), distance)
+            for row, distance in index.search(qvec, k)
+        ]
+    elif isinstance(db, ShardedChroma):
+        # Only the shards a filter or the question points at, searched in parallel
+        shards = db.route(q, filters, by_name=cfg.SHARD_ROUTING)
+        metrics.count("shards_searched", len(shards))
+        hits = db.similarity_search_by_vector_with_relevance_scores(qvec, k=k, filter=where_clause(filters), shards=shards)
+    else:
+        hits = db.similarity_search_by_vector_with_relevance_scores(qvec, k=k, filter=where_clause(filters))
+    results = [(doc, relevance_fn(distance)) for doc, distance in hits]
+    return sorted(results, key=lambda x: float(x[1]), reverse=True)
+
+def _lexical_search(index, q: str, k: int, filters: dict | None = None):
+    if filters:
+        # BM25 has no metadata filter: rank everything, keep the first k matching rows
+        rows = [(row, score) for row, score in index.search(q, len(index)) if matches(index.metadatas[row], filters)]
+    else:
+        rows = index.search(q, k)
+    return [
+        (Document(page_content=index.texts[row], metadata=dict(index.metadatas[row])), score)
+        for row, score in rows[:k]
+    ]
+
+def retrieve(q: str, qvec=None, k: int | None = None, filters: dict | None = None):
+    """
+    Returns (results, relevant): up to k (default TOP_K) [(doc, score)] best-first, and whether
+    the relevance gate passed. Depends on RETRIEVAL_MODE:
+      vector  - score = relevance; gate: top relevance >= MIN_RELEVANCE
+      hybrid  - score = reciprocal rank fusion of vector + BM25 ranks; gate: top vector relevance >= MIN_RELEVANCE
+      lexical - score = BM25, no embedding call at all; gate: top BM25 >= LEXICAL_MIN_SCORE
+    Pass a precomputed query embedding to skip re-embedding the question.
+    filters ({"source" / "doc_type": [values]}) restricts every mode to matching chunks.
+    """
+    k = k or cfg.TOP_K
+    index = lexical_index() if cfg.RETRIEVAL_MODE != "vector" else None
+
+    if cfg.RETRIEVAL_MODE == "lexical" and index is not None:
+        results = _lexical_search(index, q, k, filters)
+        return results, bool(results) and results[0][1] >= cfg.LEXICAL_MIN_SCORE
+
+    if cfg.RETRIEVAL_MODE == "hybrid" and index is not None:
+        n = max(k, cfg.HYBRID_CANDIDATES)
+        vec = _vector_search(q, qvec, n, filters)
+        lex = _lexical_search(index, q, n, filters)
+
+        docs = {_doc_key(d): d for d, _ in lex}
+        docs.update({_doc_key(d): d for d, _ in vec})
+        fused = reciprocal_rank_fusion(
+            [[_doc_key(d) for d, _ in vec], [_doc_key(d) for d, _ in lex]], k=cfg.RRF_K
+        )
+        results = [(docs[key], score) for key, score in fused[:k]]
+        return results, bool(vec) and float(vec[0][1]) >= cfg.MIN_RELEVANCE
+
+    results = _vector_search(q, qvec, k, filters)
+    return results, bool(results) and float(results[0][1]) >= cfg.MIN_RELEVANCE
+
+def reopen_store():
+    """
+    For forked workers (see backend.reopen_vectordb): a new shard pool and a fresh Chroma client for this process.
+    """
+    global vectordb, store_path, _retired_store, _shard_pool
+    from chromadb.api.shared_system_client import SharedSystemClient
+
+    SharedSystemClient.clear_system_cache()
+    _shard_pool = ThreadPoolExecutor(max_workers=cfg.SHARD_THREADS, thread_name_prefix="rag-shard")  # threads don't survive fork
+    store_path, _retired_store = store_dir(cfg.PERSIST_DIR), None
+    vectordb = open_store(store_path)
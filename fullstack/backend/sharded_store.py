@@ -0,0 +1,231 @@
+import os, re, json, hashlib, logging, threading
+
+# ---------- logging
+logging.basicConfig(level=logging.INFO)
+log = logging.getLogger(__name__)
+
+# ---------- layout
+# <store>/shards.json   {"shard_by": "source" | "doc_type", "shards": {shard key: Chroma collection name}}
+# A store without shards.json is a single Chroma collection.
+SHARDS_FILE = "shards.json"
+SHARD_FIELDS = ("source", "doc_type")
+
+def is_sharded(store: str) -> bool:
+    return os.path.isfile(os.path.join(store, SHARDS_FILE))
+
+def read_shards(store: str) -> dict | None:
+    try:
+        with open(os.path.join(store, SHARDS_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def shard_key(metadata: dict, shard_by: str) -> str:
+    return str(metadata.get(shard_by) or "unknown")
+
+def collection_name(key: str) -> str:
+    """
+    Chroma collection name for a shard key: readable prefix + hash (names are limited to 63 chars of [A-Za-z0-9._-]).
+    """
+    slug = re.sub(r"[^A-Za-z0-9]+", "-", key).strip("-")[:40]
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:8]
+    return f"shard-{slug}-{digest}" if slug else f"shard-{digest}"
+
+# ---------- filters + routing
+def normalize_filter(raw) -> dict | None:
+    """
+    Request filter {"source": "a.pdf" | [...], "doc_type": ...} -> {field: sorted values}, None when empty.
+    Raises ValueError on anything else.
+    """
+    if raw is None or raw == {}:
+        return None
+    if not isinstance(raw, dict):
+        raise ValueError("filter must be an object")
+    out = {}
+    for field, value in raw.items():
+        if field not in SHARD_FIELDS:
+            raise ValueError(f"filter fields: {', '.join(SHARD_FIELDS)}")
+        values = [value] if isinstance(value, str) else value
+        if not isinstance(values, list) or not values or not all(isinstance(v, str) and v for v in values):
+            raise ValueError(f"filter.{field} must be a string or a non-empty list of strings")
+        out[field] = sorted(set(values))
+    return out
+
+def where_clause(filters: dict | None) -> dict | None:
+    """
+    Chroma `where` for a normalized filter.
+    """
+    if not filters:
+        return None
+    clauses = [{field: {"$in": values}} for field, values in sorted(filters.items())]
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+def matches(metadata: dict, filters: dict) -> bool:
+    return all(str(metadata.get(field)) in values for field, values in filters.items())
+
+def _words(text: str) -> str:
+    return " ".join(re.findall(r"[a-z0-9]+", text.lower()))
+
+def named_shards(question: str, keys) -> list[str]:
+    """
+    Source shards whose title (file name without extension, "_" / "-" as spaces) appears in the question,
+    e.g. "what does the travel policy say ..." -> Travel_Policy.pdf.
+    """
+    q = f" {_words(question)} "
+    out = []
+    for key in keys:
+        title = _words(os.path.splitext(os.path.basename(key))[0])
+        if title and f" {title} " in q:
+            out.append(key)
+    return out
+
+def merge_hits(per_shard, k: int) -> list:
+    """
+    [(doc, distance)] lists from several shards -> the k closest overall (each shard returns its own top-k,
+    so this is the top-k of the union).
+    """
+    return sorted((hit for hits in per_shard for hit in hits), key=lambda hit: float(hit[1]))[:k]
+
+# ---------- store
+def open_vectorstore(store: str, embedding_function=None, pool=None):
+    """
+    Whatever ingest built at `store`: a ShardedChroma when it has shards.json, else the single Chroma collection.
+    """
+    if is_sharded(store):
+        return ShardedChroma(store, embedding_function, pool=pool)
+    from langchain_chroma import Chroma
+
+    return Chroma(persist_directory=store, embedding_function=embedding_function)
+
+class ShardedChroma:
+    """
+    One Chroma collection per source or doc_type in a single persist directory, listed in shards.json.
+    Covers the Chroma calls ingest and the backend make (add_documents, delete, get,
+    similarity_search_by_vector_with_relevance_scores); a search runs on every shard (or the routed
+    subset) on `pool`, in parallel when one is given, and merges the top-k by distance.
+    Shards are logical: every collection lives in the same Chroma client and sqlite file, each with its
+    own HNSW index, so the parallel fan-out overlaps index queries but not storage I/O or locking.
+    """
+
+    def __init__(self, persist_dir: str, embedding_function=None, shard_by: str | None = None, pool=None):
+        self.persist_dir = persist_dir
+        self.embedding_function = embedding_function
+        self.pool = pool
+        manifest = read_shards(persist_dir) or {}
+        self.shard_by = manifest.get("shard_by") or shard_by
+        if self.shard_by not in SHARD_FIELDS:
+            raise ValueError(f"[store] shard_by must be one of {SHARD_FIELDS}, got: {self.shard_by}")
+        if shard_by and shard_by != self.shard_by:
+            raise ValueError(f"[store] {persist_dir} is sharded by {self.shard_by}, not {shard_by}")
+        self.shards = {key: self._open(name) for key, name in manifest.get("shards", {}).items()}
+        self._lock = threading.Lock()
+
+    def _open(self, name: str):
+        from langchain_chroma import Chroma
+
+        return Chroma(persist_directory=self.persist_dir, collection_name=name,
+                      embedding_function=self.embedding_function)
+
+    def _shard(self, key: str):
+        with self._lock:
+            if key not in self.shards:
+                self.shards[key] = self._open(collection_name(key))
+                self._save()
+            return self.shards[key]
+
+    def _save(self):
+        os.makedirs(self.persist_dir, exist_ok=True)
+        path = os.path.join(self.persist_dir, SHARDS_FILE)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"shard_by": self.shard_by,
+                       "shards": {key: db._collection.name for key, db in sorted(self.shards.items())}}, f, indent=2)
+        os.replace(tmp, path)
+
+    @property
+    def space(self) -> str:
+        """
+        hnsw:space of the shards (all created with the same settings).
+        """
+        for db in self.shards.values():
+            return (db._collection.metadata or {}).get("hnsw:space", "l2")
+        return "l2"
+
+    # ---- writes
+    def add_documents(self, documents, ids):
+        """
+        Embeds the whole batch in one call, then upserts each shard's part.
+        """
+        vectors = self.embedding_function.embed_documents([d.page_content for d in documents])
+        groups = {}
+        for doc, id_, vec in zip(documents, ids, vectors):
+            groups.setdefault(shard_key(doc.metadata, self.shard_by), []).append((doc, id_, vec))
+        for key, rows in groups.items():
+            self._shard(key)._collection.upsert(
+                ids=[id_ for _, id_, _ in rows],
+                embeddings=[[float(x) for x in vec] for _, _, vec in rows],
+                documents=[doc.page_content for doc, _, _ in rows],
+                metadatas=[doc.metadata for doc, _, _ in rows],
+            )
+        return list(ids)
+
+    def delete(self, ids):
+        """
+        Deletes ids from every shard; shards left empty are dropped, so routing never picks them.
+        """
+        with self._lock:
+            for key, db in list(self.shards.items()):
+                db.delete(ids=ids)
+                if db._collection.count() == 0:
+                    db.delete_collection()
+                    del self.shards[key]
+            self._save()
+
+    # ---- reads
+    def get(self, include=None) -> dict:
+        """
+        Every shard's rows concatenated (same keys as Chroma.get).
+        """
+        out = {"ids": []}
+        for key in sorted(self.shards):
+            data = self.shards[key].get(include=include)
+            out["ids"].extend(data["ids"])
+            for field in include or ():
+                values = data.get(field)  # embeddings come back as a numpy array
+                out.setdefault(field, []).extend(list(values) if values is not None else [])
+        return out
+
+    def _select_relevance_score_fn(self):
+        for db in self.shards.values():
+            return db._select_relevance_score_fn()
+        from langchain_core.vectorstores import VectorStore
+
+        return VectorStore._euclidean_relevance_score_fn
+
+    def route(self, question: str, filters: dict | None = None, by_name: bool = True) -> list[str]:
+        """
+        Shards worth searching: those matching a filter on the shard field, else (sharded by source,
+        by_name) those whose title the question names, else all of them.
+        """
+        if filters and self.shard_by in filters:
+            return [key for key in self.shards if key in filters[self.shard_by]]
+        if by_name and self.shard_by == "source":
+            named = named_shards(question, self.shards)
+            if named:
+                return named
+        return list(self.shards)
+
+    def similarity_search_by_vector_with_relevance_scores(self, embedding, k: int = 4, filter=None, shards=None):
+        """
+        [(doc, distance)] closest first, over `shards` (default: all).
+        """
+        targets = [self.shards[key] for key in (self.shards if shards is None else shards) if key in self.shards]
+
+        def search(db):
+            return db.similarity_search_by_vector_with_relevance_scores(embedding, k=k, filter=filter)
+
+        if self.pool is None or len(targets) < 2:
+            per_shard = [search(db) for db in targets]
+        else:
+            per_shard = list(self.pool.map(search, targets))
+        return merge_hits(per_shard, k)
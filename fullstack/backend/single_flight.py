@@ -0,0 +1,196 @@
+import os, json, time, asyncio, hashlib, logging, threading
+from collections import Counter
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows: coalescing stays per worker
+    fcntl = None
+
+# ---------- logging
+logging.basicConfig(level=logging.INFO)
+log = logging.getLogger(__name__)
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+# ---------- single flight
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key: the first caller (leader) runs fn, the others
+    wait for it and get the same result (or exception). Nothing is kept once the call completes.
+
+    With lock_dir set, leaders of different worker processes on the host also coalesce: they
+    take an flock on <lock_dir>/<sha1(key)>.lock; the one holding it runs fn and leaves the
+    result in <sha1(key)>.result (JSON, so a file planted there can't run code) for the workers
+    that waited on the lock. They get it as json.loads returns it (lists for tuples, str dict keys);
+    a result that isn't JSON-serialisable is not shared. A worker that waits longer than wait_s runs fn itself.
+    """
+
+    def __init__(self, lock_dir: str = "", wait_s: float = 60.0, poll_s: float = 0.02):
+        self.lock_dir = lock_dir
+        if lock_dir and fcntl is None:
+            log.warning("[rag] fcntl unavailable; single-flight coalescing is per worker only")
+            self.lock_dir = ""
+        if self.lock_dir:
+            os.makedirs(self.lock_dir, mode=0o700, exist_ok=True)
+        self.wait_s = wait_s
+        self.poll_s = poll_s
+
+        self._calls = {}  # key -> _Call
+        self._tasks = {}  # key -> asyncio.Task (event-loop callers)
+        self._lock = threading.Lock()
+        self._counts = Counter()
+        self._last_prune = 0.0
+
+    def _count(self, name: str, n: int = 1):
+        with self._lock:
+            self._counts[name] += n
+
+    # ---- threads
+    def do(self, key: str, fn, share=lambda result: True):
+        """
+        Returns (result, shared). shared is True when the result came from another caller's fn.
+        share(result) decides whether a result may be handed to other workers (e.g. not failures).
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            self._count("coalesced")
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        self._count("leaders")
+        try:
+            if self.lock_dir:
+                call.result, shared = self._across_workers(key, fn, share)
+            else:
+                call.result, shared = fn(), False
+            return call.result, shared
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    # ---- workers (flock + result file)
+    def _paths(self, key: str):
+        base = os.path.join(self.lock_dir, hashlib.sha1(key.encode("utf-8")).hexdigest())
+        return base + ".lock", base + ".result"
+
+    def _across_workers(self, key: str, fn, share):
+        lock_path, result_path = self._paths(key)
+        started = time.time()
+        deadline = time.monotonic() + self.wait_s
+        waited = False
+
+        fd = os.open(lock_path, os.O_CREAT | os.O_RDWR, 0o644)
+        try:
+            while True:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    waited = True
+                    if time.monotonic() >= deadline:
+                        log.warning("[rag] single-flight wait exceeded %.0fs; answering without the lock", self.wait_s)
+                        self._count("wait_timeouts")
+                        return fn(), False
+                    time.sleep(self.poll_s)
+
+            try:
+                if waited:
+                    result = self._read_result(result_path, since=started)
+                    if result is not None:
+                        self._count("coalesced_across_workers")
+                        return result, True
+                result = fn()
+                if share(result):
+                    self._write_result(result_path, result)
+                return result, False
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)
+
+    def _read_result(self, path: str, since: float):
+        """
+        The result left by the worker that held the lock while we waited; older files are ignored.
+        """
+        try:
+            if os.stat(path).st_mtime < since:
+                return None
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_result(self, path: str, result):
+        tmp = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(result, f)
+            os.replace(tmp, path)
+        except (OSError, TypeError, ValueError):
+            log.exception("[rag] failed to write single-flight result %s", path)
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+        self._prune()
+
+    def _prune(self):
+        """
+        Removes result files nobody can still be waiting for; at most once per wait_s. Lock files stay (empty).
+        """
+        now = time.time()
+        if now - self._last_prune < self.wait_s:
+            return
+        self._last_prune = now
+        for name in os.listdir(self.lock_dir):
+            if name.endswith(".result"):
+                path = os.path.join(self.lock_dir, name)
+                try:
+                    if now - os.stat(path).st_mtime > self.wait_s:
+                        os.remove(path)
+                except OSError:
+                    pass
+
+    # ---- event loop
+    async def ado(self, key: str, coro_fn):
+        """
+        Async variant of do() for callers on one event loop (per worker only).
+        The leader's coroutine runs as a task, so a cancelled leader request doesn't fail the others.
+        """
+        task = self._tasks.get(key)
+        shared = task is not None
+        if shared:
+            self._count("coalesced")
+        else:
+            self._count("leaders")
+            task = asyncio.ensure_future(coro_fn())
+            self._tasks[key] = task
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        return await asyncio.shield(task), shared
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = dict(self._counts)
+            in_flight = len(self._calls)
+        return {
+            "across_workers": bool(self.lock_dir),
+            "in_flight": in_flight + len(self._tasks),
+            **{k: counts.get(k, 0) for k in ("leaders", "coalesced", "coalesced_across_workers", "wait_timeouts")},
+        }
@@ -0,0 +1,202 @@
+import os, json, time, shutil, logging
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows: no guard against two concurrent ingests
+    fcntl = None
+
+# ---------- logging
+logging.basicConfig(level=logging.INFO)
+log = logging.getLogger(__name__)
+
+# ---------- layout
+# <root>/versions/<name>/   one complete store each (Chroma + side indexes + manifest + corpus_version.json)
+# <root>/CURRENT            name of the version being served, replaced atomically by publish()
+# <root>/ingest_status.json progress of the last / running ingest
+# <root>/ingest.log         output of an ingest started through POST /admin/ingest
+# A root without CURRENT is an unversioned store: the root itself is served.
+CURRENT_FILE = "CURRENT"
+VERSIONS_DIR = "versions"
+STATUS_FILE = "ingest_status.json"
+LOCK_FILE = ".ingest.lock"
+LOG_FILE = "ingest.log"
+COMPLETE_MARKER = "corpus_version.json"  # written by ingest once a version is fully built
+
+_memo = {}  # CURRENT path -> ((inode, mtime_ns), name)
+
+def _write_json(path: str, data: dict):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)
+
+def current_version(root: str) -> str | None:
+    """
+    Name in <root>/CURRENT, or None for an unversioned store. Re-reads only when the file changes.
+    """
+    path = os.path.join(root, CURRENT_FILE)
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+
+    stamp = (st.st_ino, st.st_mtime_ns)  # publish() replaces the file, so the inode changes too
+    memo = _memo.get(path)
+    if memo and memo[0] == stamp:
+        return memo[1]
+
+    with open(path, "r", encoding="utf-8") as f:
+        name = f.read().strip() or None
+    _memo[path] = (stamp, name)
+    return name
+
+def version_dir(root: str, name: str) -> str:
+    return os.path.join(root, VERSIONS_DIR, name)
+
+def store_dir(root: str) -> str:
+    """
+    Directory of the store to serve: the CURRENT version, else root itself.
+    """
+    name = current_version(root)
+    return version_dir(root, name) if name else root
+
+def new_version(root: str, run_id: str) -> str:
+    """
+    Creates an empty version directory; names sort by creation time.
+    """
+    name = f"{time.strftime('%Y%m%d-%H%M%S', time.gmtime())}-{run_id}"
+    os.makedirs(version_dir(root, name))
+    return name
+
+def publish(root: str, name: str):
+    """
+    Points CURRENT at name. Readers see either the old or the new name, never a partial file.
+    """
+    if not os.path.isdir(version_dir(root, name)):
+        raise FileNotFoundError(f"[store] no version {name} under {root}")
+    path = os.path.join(root, CURRENT_FILE)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(name + "\n")
+    os.replace(tmp, path)
+    log.info("[store] %s now serves version %s", root, name)
+
+def list_versions(root: str) -> list[dict]:
+    """
+    Newest first: {"name", "current", "complete"}; complete versions finished their ingest.
+    """
+    base = os.path.join(root, VERSIONS_DIR)
+    if not os.path.isdir(base):
+        return []
+    current = current_version(root)
+    return [
+        {"name": name, "current": name == current,
+         "complete": os.path.isfile(os.path.join(base, name, COMPLETE_MARKER))}
+        for name in sorted(os.listdir(base), reverse=True)
+        if os.path.isdir(os.path.join(base, name))
+    ]
+
+def gc_versions(root: str, keep: int, protect: tuple = ()) -> list[str]:
+    """
+    Deletes every version except CURRENT, the newest `keep` other complete versions (rollback, and
+    workers still finishing requests on the previous one) and `protect`. Run it with the ingest lock
+    held so a version being built is never collected. Returns the removed names.
+    keep is at least 1: a worker keeps serving the previous version until its next request's refresh_store().
+    """
+    keep = max(1, keep)
+    kept = 0
+    removed = []
+    for v in list_versions(root):
+        if v["current"] or v["name"] in protect:
+            continue
+        if v["complete"] and kept < keep:
+            kept += 1
+            continue
+        shutil.rmtree(version_dir(root, v["name"]), ignore_errors=True)
+        removed.append(v["name"])
+    if removed:
+        log.info("[store] removed old versions: %s", ", ".join(removed))
+    return removed
+
+# ---------- ingest lock + status
+class IngestLock:
+    """
+    flock on <root>/.ingest.lock, held for the whole ingest; released by the OS if the process dies.
+    """
+
+    def __init__(self, root: str):
+        self.path = os.path.join(root, LOCK_FILE)
+        self._fd = None
+
+    def acquire(self) -> bool:
+        if fcntl is None:
+            return True
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        self._fd = fd
+        return True
+
+    def release(self):
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+
+    def held_elsewhere(self) -> bool:
+        """
+        True while another process holds the lock (an ingest is running).
+        """
+        if fcntl is None or self._fd is not None or not os.path.exists(self.path):
+            return False
+        if not self.acquire():
+            return True
+        self.release()
+        return False
+
+def write_status(root: str, new_run: bool = False, **fields) -> dict:
+    """
+    Merges fields into <root>/ingest_status.json (only the ingest process writes it);
+    new_run=True starts from an empty status.
+    """
+    os.makedirs(root, exist_ok=True)
+    status = {**({} if new_run else read_status(root)), **fields, "updated_at": time.time()}
+    _write_json(os.path.join(root, STATUS_FILE), status)
+    return status
+
+def read_status(root: str) -> dict:
+    try:
+        with open(os.path.join(root, STATUS_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _alive(pid) -> bool:
+    try:
+        os.kill(int(pid), 0)
+    except (TypeError, ValueError, ProcessLookupError):
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def ingest_status(root: str) -> dict:
+    """
+    Last written status plus the live state. "starting" (written by whoever launched the ingest
+    process) counts as running while that process is alive; a "starting" or "running" ingest
+    that no longer holds the lock was interrupted.
+    """
+    status = read_status(root)
+    running = IngestLock(root).held_elsewhere()
+    if status.get("state") == "starting" and _alive(status.get("pid")):
+        running = True
+    elif status.get("state") in ("starting", "running") and not running:
+        status["state"] = "interrupted"
+    status["running"] = running
+    status["current"] = current_version(root)
+    status["versions"] = list_versions(root)
+    return status
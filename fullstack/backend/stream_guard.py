@@ -0,0 +1,56 @@
+import re
+
+# ---------- streaming validation
+class StreamGuard:
+    """
+    Line-by-line version of backend.validate_response's citation rules for a streamed response.
+
+    feed() returns the lines completed by a text delta that passed the checks.
+    It only flags output that validate_response would reject anyway
+    (a [n] outside the context, or a "[n] ref" line that doesn't match its label),
+    so stopping early never discards an answer the blocking path would accept.
+    """
+
+    def __init__(self, allowed_refs: dict, max_chars: int):
+        self.allowed_refs = allowed_refs
+        self.max_chars = max_chars
+        self.text = ""
+        self.violation = None  # reason string once a rule is broken
+        self._pending = ""
+
+    @property
+    def over_limit(self) -> bool:
+        return len(self.text) > self.max_chars
+
+    def feed(self, delta: str) -> list[str]:
+        self.text += delta or ""
+        self._pending += delta or ""
+        lines = []
+        while "\n" in self._pending and self.violation is None:
+            line, self._pending = self._pending.split("\n", 1)
+            if self._check(line):
+                lines.append(line)
+        return lines
+
+    def finish(self) -> list[str]:
+        line, self._pending = self._pending, ""
+        if line and self.violation is None and self._check(line):
+            return [line]
+        return []
+
+    def _check(self, line: str) -> bool:
+        # Explicit refusals pass through validate_response unchanged.
+        if "i cannot answer" in self.text.lower():
+            return True
+
+        for n in re.findall(r"\[(\d+)\]", line):
+            if int(n) not in self.allowed_refs:
+                self.violation = f"citation [{n}] is not in the context"
+                return False
+
+        m = re.match(r"^\[(\d+)\]\s+(.+)$", line)
+        if m and m.group(2).strip() != self.allowed_refs[int(m.group(1))]:
+            self.violation = f"source [{m.group(1)}] does not match the context label"
+            return False
+
+        return True
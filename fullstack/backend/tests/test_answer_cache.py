@@ -0,0 +1,54 @@
+import sys
+from pathlib import Path
+
+BACKEND_ROOT = Path(__file__).resolve().parents[1]  # .../fullstack/backend
+sys.path.insert(0, str(BACKEND_ROOT))
+
+from answer_cache import AnswerCache, normalize_question  # noqa: E402
+
+
+def test_normalize_question_keeps_exact_tokens():
+    assert normalize_question("  What is the $60/day LIMIT?? ") == "what is the $60/day limit"
+    assert normalize_question("Section 3.2 - remote work.") == "section 3.2 remote work"
+
+
+def test_exact_and_semantic_hits():
+    cache = AnswerCache(max_entries=10, ttl_s=60, sim_threshold=0.95)
+    cache.put("q1", {"answer": "a1"}, "v1", vec=[1.0, 0.0])
+
+    result, _ = cache.lookup("q1", "v1")
+    assert result == {"answer": "a1"}
+
+    result, vec = cache.lookup("q1 rephrased", "v1", embed=lambda: [0.99, 0.05])
+    assert result == {"answer": "a1"}
+    assert vec == [0.99, 0.05]
+
+    result, _ = cache.lookup("other", "v1", embed=lambda: [0.0, 1.0])
+    assert result is None
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["semantic_hits"], stats["misses"]) == (2, 1, 1)
+
+
+def test_lru_eviction_and_version_invalidation():
+    cache = AnswerCache(max_entries=2, ttl_s=60, sim_threshold=0.95)
+    cache.put("a", {"answer": "a"}, "v1")
+    cache.put("b", {"answer": "b"}, "v1")
+    cache.lookup("a", "v1")  # a is now most recently used
+    cache.put("c", {"answer": "c"}, "v1")
+
+    assert cache.lookup("b", "v1")[0] is None
+    assert cache.lookup("a", "v1")[0] == {"answer": "a"}
+    assert cache.stats()["evictions"] == 1
+
+    assert cache.lookup("a", "v2")[0] is None
+    assert cache.stats()["invalidations"] == 2
+
+
+def test_ttl_expiry():
+    cache = AnswerCache(max_entries=2, ttl_s=0.0001, sim_threshold=0.95)
+    cache.put("a", {"answer": "a"}, "v1")
+    import time
+    time.sleep(0.01)
+    assert cache.lookup("a", "v1")[0] is None
+    assert cache.stats()["expirations"] == 1
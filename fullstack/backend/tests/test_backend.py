@@ -0,0 +1,300 @@
+import os
+import sys
+import time
+import asyncio
+import threading
+import types
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+from langchain_core.documents import Document
+
+BACKEND_ROOT = Path(__file__).resolve().parents[1]  # .../fullstack/backend
+sys.path.insert(0, str(BACKEND_ROOT))
+
+# backend.py reads these on import (Config() validates them); the model and LLM are replaced below
+DEFAULT_ENV = {
+    "SEED": "42",
+    "EMB_MODEL": "sentence-transformers/all-MiniLM-L6-v2",
+    "CONTEXT_DIR": "../context_data",
+    "CHUNK_SIZE": "1100",
+    "CHUNK_OVERLAP": "160",
+    "INGEST_RESET": "0",
+    "TOP_K": "5",
+    "MIN_RELEVANCE": "0.25",
+    "MAX_ANSWER_CHARS": "2000",
+    "MAX_PER_SOURCE": "2",
+    "OPENROUTER_API_KEY": "ci_dummy_key",
+    "OPENAI_API_BASE": "https://openrouter.ai/api/v1",
+    "LLM_MODEL_NAME": "google/gemma-3-27b-it:free",
+    "LLM_TEMPERATURE": "0",
+    "LLM_MAX_TOKENS": "1024",
+    "LLM_TIMEOUT": "60",
+    "OPENROUTER_SITE_URL": "http://localhost:8000",
+    "OPENROUTER_APP_NAME": "Quantic-AI-RAG",
+    "REFUSAL_TEXT": "REFUSED",
+    "ALLOWED_ORIGINS": "*",
+    "PORT": "8000",
+}
+
+ANSWER = "Answer:\nThe per diem is $60 [1].\n\nSources:\n[1] travel.pdf p.1\n\nDocuments:\ntravel.pdf"
+DOCS = [Document(page_content="Meal per diem is $60/day.", metadata={"source": "travel.pdf", "page": 0})]
+
+
+class FakeEmbeddings:
+    def __init__(self):
+        self.calls = []
+
+    def embed_documents(self, texts):
+        self.calls.append(list(texts))
+        return [[float(len(t)), 1.0] for t in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+class FakeLLM:
+    """
+    Replies with replies[question] (ANSWER by default); an Exception value is raised instead,
+    a callable is called (on the LLM call's thread) for the reply.
+    """
+
+    def __init__(self, replies=None):
+        self.replies = replies or {}
+        self.questions = []
+
+    def _reply(self, messages):
+        question = messages[-1].content.split("\n", 1)[0][len("Question: "):]
+        self.questions.append(question)
+        reply = self.replies.get(question, ANSWER)
+        if callable(reply):
+            reply = reply()
+        if isinstance(reply, Exception):
+            raise reply
+        return types.SimpleNamespace(content=reply)
+
+    def invoke(self, messages):
+        return self._reply(messages)
+
+    async def ainvoke(self, messages):
+        return self._reply(messages)
+
+
+@pytest.fixture(scope="module")
+def rag(tmp_path_factory):
+    """
+    backend.py imported against an empty store, with a fake embedding model.
+    """
+    mp = pytest.MonkeyPatch()
+    for k, v in DEFAULT_ENV.items():
+        mp.setenv(k, os.environ.get(k, v))
+    mp.setenv("PERSIST_DIR", str(tmp_path_factory.mktemp("store")))
+    mp.setenv("EMBED_SERVICE_SOCKET", "")
+    mp.setenv("REFUSAL_TEXT", "REFUSED")  # asserted below; test_smoke.py sets a long one at collection time
+    import embedding_runtime
+    mp.setattr(embedding_runtime, "build_embeddings", lambda cfg: FakeEmbeddings())
+    mp.syspath_prepend(str(BACKEND_ROOT))  # pytest puts fullstack/ first, where "backend" is this package
+    mp.delitem(sys.modules, "backend", raising=False)
+
+    import backend
+    yield backend
+    sys.modules.pop("backend", None)
+    mp.undo()
+
+
+@pytest.fixture
+def stubbed(rag, monkeypatch):
+    """
+    No answer cache or single flight, a fake LLM, and retrieval returning DOCS (refused for questions with "off-topic").
+    """
+    llm = FakeLLM()
+    monkeypatch.setattr(rag, "answer_cache", None)
+    monkeypatch.setattr(rag, "single_flight", None)
+    monkeypatch.setattr(rag, "resilient_llm", llm)
+    monkeypatch.setattr(rag, "retrieve", lambda q, qvec=None, k=None, filters=None: (
+        [(d, 0.9) for d in DOCS], "off-topic" not in q))
+    return llm
+
+
+def test_async_answer_matches_sync_answer(rag, stubbed):
+    stubbed.replies = {
+        "llm down?": RuntimeError("provider unavailable"),
+        "bad citation?": ANSWER.replace("[1] travel.pdf p.1", "[1] other.pdf p.9"),
+        "refuses?": "Answer:\nI cannot answer from the provided context.\n\nSources:\n(empty)",
+    }
+    questions = ["per diem?", "off-topic question", "llm down?", "bad citation?", "refuses?", "  "]
+
+    for q in questions:
+        sync = rag.answer_and_sources(q)
+        assert asyncio.run(rag.aanswer_and_sources(q)) == sync
+
+    assert rag.answer_and_sources("per diem?")["answer"] == ANSWER
+    assert rag.answer_and_sources("off-topic question")["answer"] == "REFUSED"
+    assert rag.answer_and_sources("llm down?")["answer"] == rag.LLM_FAILED_TEXT
+
+
+def test_asgi_chat_profiles_the_request(rag, stubbed, monkeypatch, tmp_path):
+    import json
+    import asgi
+    from profiling import RequestProfiler
+
+    monkeypatch.setattr(asgi, "profiler", RequestProfiler(str(tmp_path)))
+    monkeypatch.setattr(asgi.cfg, "ADMIN_TOKEN", "s3cret")
+
+    def post(headers):
+        sent = []
+        body = [{"type": "http.request", "body": json.dumps({"question": "per diem?"}).encode()}]
+
+        async def receive():
+            return body.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {"type": "http", "method": "POST", "path": "/chat", "query_string": b"", "headers": headers}
+        asyncio.run(asgi.app(scope, receive, send))
+        return dict(sent[0]["headers"]), json.loads(sent[1]["body"])
+
+    headers, plain = post([])
+    assert b"x-profile-id" not in headers
+
+    headers, profiled = post([(b"x-profile", b"1"), (b"x-admin-token", b"s3cret")])
+    assert profiled == plain == json.loads(json.dumps(rag.answer_and_sources("per diem?")))
+    [entry] = asgi.profiler.list()
+    assert entry["name"] == headers[b"x-profile-id"].decode()
+    assert entry["label"].startswith("/chat q=") and "per diem" not in json.dumps(entry)
+
+
+def test_answer_from_another_worker_keeps_int_source_numbers(rag, stubbed, monkeypatch):
+    shared = [{"answer": ANSWER, "sources": {"1": "travel.pdf p.1"}, "cached": False}, "answered"]  # as read from JSON
+    monkeypatch.setattr(rag, "single_flight", types.SimpleNamespace(do=lambda key, fn, share: (shared, True)))
+
+    assert rag.answer_and_sources("per diem?")["sources"] == {1: "travel.pdf p.1"}
+    assert stubbed.questions == []
+
+
+def test_retrieval_imports_without_the_llm_client(tmp_path):
+    import subprocess
+
+    env = {**os.environ, **{k: os.environ.get(k, v) for k, v in DEFAULT_ENV.items()},
+           "PERSIST_DIR": str(tmp_path), "EMBED_SERVICE_SOCKET": str(tmp_path / "none.sock")}  # no model loaded
+    code = "import sys, retrieval; print(sorted(m for m in ('backend', 'langchain_openai', 'openai') if m in sys.modules))"
+    out = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_ROOT, env=env, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "[]"
+
+
+def test_lexical_mode_loads_no_embedding_model(tmp_path):
+    import subprocess
+
+    env = {**os.environ, **{k: os.environ.get(k, v) for k, v in DEFAULT_ENV.items()},
+           "PERSIST_DIR": str(tmp_path), "EMBED_SERVICE_SOCKET": "", "RETRIEVAL_MODE": "lexical"}
+    code = "import sys, retrieval; print('langchain_huggingface' in sys.modules, type(retrieval.embeddings).__name__)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_ROOT, env=env, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "False LazyEmbeddings"
+
+
+@pytest.fixture
+def batch_pool(rag, monkeypatch):
+    """
+    Sets the size of the worker's batch LLM pool: pool(n).
+    """
+    pools = []
+
+    def pool(n):
+        pools.append(ThreadPoolExecutor(max_workers=n, thread_name_prefix="test-batch"))
+        monkeypatch.setattr(rag, "_batch_llm_pool", pools[-1])
+        return pools[-1]
+
+    yield pool
+    for p in pools:
+        p.shutdown(wait=True)
+
+
+def test_batch_answers_repeated_questions_once(rag, stubbed):
+    rag.embeddings.calls.clear()
+    results = rag.answer_many(["Per diem?", "  per diem ", "off-topic question", "", "per diem?"])
+
+    assert [r["answer"] for r in results] == [ANSWER, ANSWER, rag.cfg.REFUSAL_TEXT, "Please provide a question.", ANSWER]
+    assert stubbed.questions == ["Per diem?"]  # the first spelling is the one asked
+    assert rag.embeddings.calls == [["Per diem?", "off-topic question"]]  # one embedding call for the batch
+
+
+def test_batch_results_in_input_order_when_finished_out_of_order(rag, stubbed, batch_pool):
+    batch_pool(2)
+    fast_done = threading.Event()
+
+    def slow():
+        assert fast_done.wait(5)
+        return ANSWER.replace("$60", "$61")
+
+    def fast():
+        fast_done.set()
+        return ANSWER
+
+    stubbed.replies = {"slow?": slow, "fast?": fast}
+    assert [i for i, _ in rag.iter_answer_many(["slow?", "fast?"])] == [1, 0]
+
+    fast_done.clear()
+    results = rag.answer_many(["slow?", "fast?"])
+    assert [r["answer"] for r in results] == [ANSWER.replace("$60", "$61"), ANSWER]
+
+
+def test_batch_item_failures_stay_with_their_item(rag, stubbed, monkeypatch):
+    generate = rag._generate
+
+    def boom_on(q, ctx):
+        if q == "boom?":
+            raise KeyError("bug")
+        return generate(q, ctx)
+
+    monkeypatch.setattr(rag, "_generate", boom_on)
+    stubbed.replies = {"llm down?": RuntimeError("provider unavailable")}
+    results = rag.answer_many(["per diem?", "boom?", "llm down?", "per diem again?"])
+
+    assert results[1] == {"error": "Internal server error"}
+    assert results[2]["answer"] == rag.LLM_FAILED_TEXT
+    assert results[0]["answer"] == results[3]["answer"] == ANSWER
+
+
+def test_closing_a_batch_cancels_llm_calls_not_started(rag, stubbed, batch_pool):
+    pool = batch_pool(1)
+    started, release = threading.Event(), threading.Event()
+
+    def blocked():
+        started.set()
+        assert release.wait(5)
+        return ANSWER
+
+    stubbed.replies = {q: blocked for q in ("a?", "b?", "c?")}
+    batch = rag.iter_answer_many(["off-topic question", "a?", "b?", "c?"])
+    assert next(batch) == (0, {"answer": rag.cfg.REFUSAL_TEXT, "sources": [], "cached": False})  # no LLM call needed
+    assert started.wait(5)
+    time.sleep(0.05)  # let the other searches finish and queue their LLM calls
+    batch.close()
+    release.set()
+
+    pool.submit(lambda: None).result(timeout=5)  # the pool has run (or dropped) everything queued before
+    assert len(stubbed.questions) == 1
+
+
+def test_batch_concurrency_is_shared_by_concurrent_batches(rag, stubbed, batch_pool):
+    batch_pool(2)
+    lock, running, peak = threading.Lock(), [0], [0]
+
+    def tracked():
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+        return ANSWER
+
+    stubbed.replies = {f"q{i}?": tracked for i in range(6)}
+    with ThreadPoolExecutor(max_workers=2) as clients:
+        batches = [clients.submit(rag.answer_many, [f"q{i}?" for i in r]) for r in (range(3), range(3, 6))]
+        results = [r for b in batches for r in b.result(timeout=10)]
+
+    assert [r["answer"] for r in results] == [ANSWER] * 6
+    assert peak[0] == 2
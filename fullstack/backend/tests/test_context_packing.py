@@ -0,0 +1,58 @@
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+
+BACKEND_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND_ROOT))
+
+from context_packing import merge_texts, overlap_length, pack_context  # noqa: E402
+
+
+@dataclass
+class Doc:
+    page_content: str
+    metadata: dict = field(default_factory=dict)
+
+
+def _chunk(source, page, idx, text):
+    return Doc(text, {"source": source, "page": page, "chunk_index": idx, "chunk_id": f"{source}::p{page}::c{idx:03d}"})
+
+
+def test_overlap_is_removed_when_merging():
+    a = "Employees may work remotely up to three days per week."
+    b = "up to three days per week. Full-time remote needs approval."
+    assert overlap_length(a, b) == len("up to three days per week.")
+    assert merge_texts(a, b) == "Employees may work remotely up to three days per week. Full-time remote needs approval."
+    assert merge_texts("no shared text here", "something else") == "no shared text here\nsomething else"
+
+
+def test_adjacent_chunks_merge_and_keep_best_rank():
+    docs = [
+        _chunk("B.pdf", 2, 0, "Other policy text."),
+        _chunk("A.pdf", 4, 1, "the per diem is $60/day. Receipts are required."),
+        _chunk("A.pdf", 4, 0, "Meals: the per diem is $60/day."),
+        _chunk("A.pdf", 4, 3, "Not adjacent to the others."),
+    ]
+    packed = pack_context(docs)
+
+    assert [d.page_content for d in packed] == [
+        "Other policy text.",
+        "Meals: the per diem is $60/day. Receipts are required.",
+        "Not adjacent to the others.",
+    ]
+    assert packed[1].metadata["page"] == 4
+    assert packed[1].metadata["merged_chunk_ids"] == ["A.pdf::p4::c000", "A.pdf::p4::c001"]
+
+
+def test_max_per_source_and_token_budget():
+    docs = [_chunk("A.pdf", p, 0, "x" * 400) for p in range(3)] + [_chunk("B.pdf", 0, 0, "y" * 40)]
+
+    capped = pack_context(docs, max_per_source=2)
+    assert [(d.metadata["source"], d.metadata["page"]) for d in capped] == [("A.pdf", 0), ("A.pdf", 1), ("B.pdf", 0)]
+
+    # 100 tokens each for A, 10 for B: the second A block doesn't fit, the smaller B block still does
+    budgeted = pack_context(docs, max_per_source=2, token_budget=150)
+    assert [(d.metadata["source"], d.metadata["page"]) for d in budgeted] == [("A.pdf", 0), ("B.pdf", 0)]
+
+    # the best block is always kept
+    assert len(pack_context(docs, token_budget=10)) == 1
@@ -0,0 +1,78 @@
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+BACKEND_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND_ROOT))
+
+import embed_service  # noqa: E402
+from embed_service import BatchedEmbeddings, EmbeddingServer, RemoteEmbeddings  # noqa: E402
+
+
+class FakeModel:
+    def __init__(self):
+        self.calls = []
+
+    def embed_documents(self, texts):
+        self.calls.append(len(texts))
+        return [[float(len(t)), 1.0, -0.5] for t in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def test_concurrent_queries_share_a_batch():
+    model = FakeModel()
+    emb = BatchedEmbeddings(model, max_batch=16, max_wait_ms=200)
+    texts = ["x" * i for i in range(1, 9)]
+    out = {}
+
+    threads = [threading.Thread(target=lambda t=t: out.__setitem__(t, emb.embed_query(t))) for t in texts]
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+
+    assert all(out[t] == [float(len(t)), 1.0, -0.5] for t in texts)
+    assert sum(model.calls) == 8
+    assert len(model.calls) < 8
+
+
+def test_socket_roundtrip_and_fallback(tmp_path, monkeypatch):
+    requests = []
+    read_texts = embed_service._Handler._read_texts
+
+    def counting(handler):
+        request = read_texts(handler)
+        requests.append(request)
+        return request
+
+    monkeypatch.setattr(embed_service._Handler, "_read_texts", counting)
+
+    path = str(tmp_path / "embed.sock")
+    model = FakeModel()
+    server = EmbeddingServer(path, BatchedEmbeddings(model, max_wait_ms=0))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        client = RemoteEmbeddings(path, fallback=None)
+        assert client.embed_query("abcd") == [4.0, 1.0, -0.5]
+        assert len(requests) == 1
+
+        # A batch is one request and one model call, not one per text
+        assert client.embed_documents(["ab", "é", "xyz"]) == [[2.0, 1.0, -0.5], [1.0, 1.0, -0.5], [3.0, 1.0, -0.5]]
+        assert len(requests) == 2 and model.calls == [1, 3]
+        assert client.embed_documents([]) == [] and len(requests) == 2
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    fallback = FakeModel()
+    missing = RemoteEmbeddings(str(tmp_path / "missing.sock"), fallback=lambda: fallback)
+    assert missing.embed_query("abc") == [3.0, 1.0, -0.5]
+    assert missing.embed_documents(["a", "bb"]) == [[1.0, 1.0, -0.5], [2.0, 1.0, -0.5]]
+    assert fallback.calls == [1, 2]
+
+    with pytest.raises(OSError):
+        RemoteEmbeddings(str(tmp_path / "missing.sock")).embed_query("abc")
@@ -0,0 +1,61 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+
+BACKEND_ROOT = Path(__file__).resolve().parents[1]  # .../fullstack/backend
+sys.path.insert(0, str(BACKEND_ROOT))
+
+from embedding_cache import EmbeddingCache, CachedEmbeddings  # noqa: E402
+
+
+class CountingEmbeddings:
+    def __init__(self):
+        self.calls = []
+
+    def embed_documents(self, texts):
+        self.calls.append(len(texts))
+        return [[float(len(t)), 1.0, 0.5] for t in texts]
+
+    def embed_query(self, text):
+        return [0.0, 0.0, 0.0]
+
+
+def test_cache_persists_and_skips_model(tmp_path):
+    base = CountingEmbeddings()
+    emb = CachedEmbeddings(base, EmbeddingCache(str(tmp_path), "org/model"), batch_size=2)
+    first = emb.embed_documents(["a", "bb", "ccc"])
+    assert base.calls == [2, 1]
+
+    # Fresh process: cache is reloaded from disk, only the new text hits the model
+    base2 = CountingEmbeddings()
+    emb2 = CachedEmbeddings(base2, EmbeddingCache(str(tmp_path), "org/model"), batch_size=2)
+    second = emb2.embed_documents(["ccc", "a", "dddd"])
+    assert base2.calls == [1]
+    assert second[:2] == [first[2], first[0]]
+    assert emb2.stats()["cache_hits"] == 2
+
+
+def test_cache_is_per_model(tmp_path):
+    EmbeddingCache(str(tmp_path), "model-a").put_many(["k"], [[1.0, 2.0]])
+    assert EmbeddingCache(str(tmp_path), "model-a").get_many(["k"])["k"].tolist() == [1.0, 2.0]
+    assert EmbeddingCache(str(tmp_path), "model-b").get_many(["k"]) == {}
+
+
+def test_rows_and_key_left_by_a_crash_are_trimmed(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), "m")
+    cache.put_many(["a"], [[1.0, 1.0]])
+
+    # Crash mid-append: two rows with no key, half of a third row, and a key line cut short
+    with open(cache._vectors_path, "ab") as f:
+        f.write(np.asarray([[9.0, 9.0], [8.0, 8.0]], dtype=np.float32).tobytes() + b"\x00\x00")
+    with open(cache._keys_path, "a", encoding="utf-8") as f:
+        f.write("x")
+
+    reopened = EmbeddingCache(str(tmp_path), "m")
+    assert len(reopened) == 1
+    reopened.put_many(["b", "c"], [[2.0, 2.0], [3.0, 3.0]])
+
+    for c in (reopened, EmbeddingCache(str(tmp_path), "m")):
+        got = c.get_many(["a", "b", "c", "x"])
+        assert {k: v.tolist() for k, v in got.items()} == {"a": [1.0, 1.0], "b": [2.0, 2.0], "c": [3.0, 3.0]}
@@ -0,0 +1,25 @@
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+
+BACKEND_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND_ROOT))
+
+from embedding_runtime import cosine_drift, embedding_key  # noqa: E402
+
+
+def test_embedding_key_separates_quantized_vectors():
+    assert embedding_key(SimpleNamespace(EMB_MODEL="m", EMB_QUANTIZE=False)) == "m"
+    assert embedding_key(SimpleNamespace(EMB_MODEL="m", EMB_QUANTIZE=True)) == "m@int8"
+
+
+def test_cosine_drift():
+    a = np.array([[1.0, 0.0], [0.0, 2.0]])
+    drift = cosine_drift(a, a * 3.0)
+    assert drift["texts"] == 2
+    assert np.isclose(drift["mean_cosine"], 1.0) and np.isclose(drift["min_cosine"], 1.0)
+
+    drift = cosine_drift(a, [[0.0, 1.0], [0.0, 1.0]])
+    assert np.isclose(drift["min_cosine"], 0.0) and np.isclose(drift["mean_cosine"], 0.5)
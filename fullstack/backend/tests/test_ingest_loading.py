@@ -0,0 +1,148 @@
+import os
+import sys
+import shutil
+from pathlib import Path
+
+import pytest
+
+BACKEND_ROOT = Path(__file__).resolve().parents[1]  # .../fullstack/backend
+CONTEXT_DATA = BACKEND_ROOT.parent / "context_data"
+sys.path.insert(0, str(BACKEND_ROOT))
+
+# ingest.py reads these on import (Config() validates them)
+DEFAULT_ENV = {
+    "SEED": "42",
+    "EMB_MODEL": "sentence-transformers/all-MiniLM-L6-v2",
+    "CHUNK_SIZE": "1100",
+    "CHUNK_OVERLAP": "160",
+    "INGEST_RESET": "0",
+    "TOP_K": "5",
+    "MIN_RELEVANCE": "0.25",
+    "MAX_ANSWER_CHARS": "2000",
+    "MAX_PER_SOURCE": "2",
+    "OPENROUTER_API_KEY": "ci_dummy_key",
+    "OPENAI_API_BASE": "https://openrouter.ai/api/v1",
+    "LLM_MODEL_NAME": "google/gemma-3-27b-it:free",
+    "LLM_TEMPERATURE": "0",
+    "LLM_MAX_TOKENS": "1024",
+    "LLM_TIMEOUT": "60",
+    "OPENROUTER_SITE_URL": "http://localhost:8000",
+    "OPENROUTER_APP_NAME": "Quantic-AI-RAG",
+    "REFUSAL_TEXT": "REFUSED",
+    "ALLOWED_ORIGINS": "*",
+    "PORT": "8000",
+}
+
+
+@pytest.fixture(scope="module")
+def corpus(tmp_path_factory):
+    root = tmp_path_factory.mktemp("corpus")
+    pdf = next(iter(sorted(CONTEXT_DATA.glob("*.pdf"))), None)
+    if pdf is not None:
+        shutil.copy(pdf, root / pdf.name)
+    (root / "hr").mkdir()
+    (root / "hr" / "leave.md").write_text("# Leave\n\n" + "Employees accrue paid time off monthly. " * 60)
+    (root / "notes.txt").write_text("Report security incidents within one hour.\n" * 40)
+    (root / "travel.html").write_text("<html><head><title>Travel</title></head><body><p>Per diem is $60.</p></body></html>")
+    return root
+
+
+@pytest.fixture(scope="module")
+def ingest(corpus, tmp_path_factory):
+    mp = pytest.MonkeyPatch()
+    for k, v in DEFAULT_ENV.items():
+        mp.setenv(k, os.environ.get(k, v))
+    mp.setenv("CONTEXT_DIR", str(corpus))
+    mp.setenv("PERSIST_DIR", str(tmp_path_factory.mktemp("store")))
+    mp.setenv("PARSE_CACHE_ENABLED", "0")  # every run parses: serial and pooled output must not depend on the cache
+    import ingest
+    yield ingest
+    mp.undo()
+
+
+def crash_on_bad(p, folder, run_id):
+    if p.endswith("bad.txt"):
+        os._exit(1)  # like a segfault in a parser
+    return {"source": os.path.relpath(p, folder)}
+
+
+def summary(loaded):
+    if loaded is None:
+        return None
+    skip = {"ingested_at"}
+    return (loaded["source"], loaded["ids"],
+            [(c.page_content, {k: v for k, v in c.metadata.items() if k not in skip}) for c in loaded["chunks"]])
+
+
+def test_pooled_loading_matches_serial_order_and_metadata(ingest, corpus):
+    paths = ingest.list_source_files(str(corpus))
+    serial = [summary(x) for x in ingest.iter_loaded_files(str(corpus), paths, workers=1)]
+    pooled = [summary(x) for x in ingest.iter_loaded_files(str(corpus), paths, workers=3, prefetch=1)]
+
+    assert [s[0] for s in serial] == sorted(os.path.relpath(p, corpus) for p in paths)
+    assert pooled == serial
+
+
+def test_a_crashing_parser_fails_only_its_file(ingest, corpus, tmp_path, monkeypatch):
+    for name in ("a.txt", "bad.txt", "c.txt", "d.txt", "e.txt"):
+        (tmp_path / name).write_text(f"{name} text\n")
+    paths = sorted(str(p) for p in tmp_path.iterdir())
+    monkeypatch.setattr(ingest, "_load_and_split", crash_on_bad)  # forked workers inherit the patch
+
+    loaded = list(ingest.iter_loaded_files(str(tmp_path), paths, workers=2))
+    assert [x and x["source"] for x in loaded] == ["a.txt", None, "c.txt", "d.txt", "e.txt"]
+
+
+def test_each_file_is_hashed_once_and_the_parse_cache_built_once(ingest, corpus, tmp_path, monkeypatch):
+    monkeypatch.setattr(ingest.cfg, "PARSE_CACHE_ENABLED", True)
+    monkeypatch.setattr(ingest.cfg, "PARSE_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(ingest, "_parse_cache", None)
+    hashed, caches = [], []
+    file_sha1, parse_cache = ingest._file_sha1, ingest.ParseCache
+    monkeypatch.setattr(ingest, "_file_sha1", lambda p: hashed.append(p) or file_sha1(p))
+    monkeypatch.setattr(ingest, "ParseCache", lambda root: caches.append(root) or parse_cache(root))
+
+    html = str(corpus / "travel.html")
+    infos = [{}, {}]
+    loaded = [ingest._load_file(html, str(corpus), "run", info) for info in infos]
+
+    assert [info["parse_cached"] for info in infos] == [False, True]
+    assert loaded[0][0].metadata["source_sha1"] == loaded[1][0].metadata["source_sha1"] == file_sha1(html)
+    assert hashed == [html, html]  # once per load
+    assert caches == [str(tmp_path)]  # once per process
+
+
+class FakeEmbeddings:
+    def embed_documents(self, texts):
+        return [[float(len(t) % 7 + 1), 1.0, 0.5] for t in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def test_resume_drops_chunks_of_files_the_interrupted_run_never_committed(ingest, tmp_path, monkeypatch):
+    corpus, store = tmp_path / "corpus", tmp_path / "store"
+    corpus.mkdir()
+    (corpus / "a.txt").write_text("Alpha policy text. " * 40)
+    (corpus / "b.txt").write_text("Bravo policy sentence number one. " * 200)
+    for name, value in {"CONTEXT_DIR": str(corpus), "PERSIST_DIR": str(store), "INGEST_RESUME": True,
+                        "SHARD_BY": "", "INGEST_EMBED_BATCH": 4, "INGEST_LOAD_WORKERS": 1}.items():
+        monkeypatch.setattr(ingest.cfg, name, value)
+    monkeypatch.setattr(ingest, "make_embeddings", lambda: ingest.CachedEmbeddings(FakeEmbeddings(), None, batch_size=4))
+
+    def store_ids():
+        return set(ingest.open_store(FakeEmbeddings()).get(include=[])["ids"])
+
+    ingest.ingest_full(reset=True)
+    files = ingest.load_manifest(str(store))["files"]
+    assert len(files["b.txt"]["chunk_ids"]) > 3
+
+    # Interrupted after b.txt's chunks were upserted but before it was committed; then b.txt shrinks
+    del files["b.txt"]
+    ingest.save_manifest(str(store), files, complete=False)
+    (corpus / "b.txt").write_text("Bravo policy sentence number one. " * 40)
+
+    ingest.ingest_full(reset=False)
+    files = ingest.load_manifest(str(store))["files"]
+    assert len(files["b.txt"]["chunk_ids"]) < 3
+    assert store_ids() == {cid for entry in files.values() for cid in entry["chunk_ids"]}
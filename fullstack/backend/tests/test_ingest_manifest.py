@@ -0,0 +1,43 @@
+import sys
+from pathlib import Path
+
+BACKEND_ROOT = Path(__file__).resolve().parents[1]  # .../fullstack/backend
+sys.path.insert(0, str(BACKEND_ROOT))
+
+from ingest_manifest import diff_manifest, params_match  # noqa: E402
+
+PARAMS = {"emb_model": "m", "chunk_size": 1100, "chunk_overlap": 160, "shard_by": ""}
+
+
+def manifest(**files):
+    return {**PARAMS, "complete": True, "files": {
+        source: {"sha1": sha1, "chunk_ids": [f"{source}::c{i}" for i in range(2)]} for source, sha1 in files.items()
+    }}
+
+
+def test_added_changed_removed_unchanged_and_stale_ids():
+    last = manifest(**{"a.pdf": "1", "b.md": "2", "gone.txt": "3"})
+    diff = diff_manifest(last, {"a.pdf": "1", "b.md": "22", "new.html": "4"}, PARAMS)
+
+    assert diff["rebuild"] is None
+    assert (diff["added"], diff["changed"], diff["removed"], diff["unchanged"]) == (
+        ["new.html"], ["b.md"], ["gone.txt"], ["a.pdf"])
+    assert diff["stale_ids"] == ["gone.txt::c0", "gone.txt::c1", "b.md::c0", "b.md::c1"]
+    assert diff["keep"] == {"a.pdf": last["files"]["a.pdf"]}
+
+    same = diff_manifest(last, {"a.pdf": "1", "b.md": "2", "gone.txt": "3"}, PARAMS)
+    assert not (same["added"] or same["changed"] or same["removed"] or same["stale_ids"])
+    assert same["keep"] == last["files"]
+
+
+def test_no_manifest_or_other_params_force_a_rebuild():
+    assert diff_manifest(None, {"a.pdf": "1"}, PARAMS)["rebuild"] == "no manifest"
+
+    for changed in ({"chunk_size": 900}, {"emb_model": "m@int8"}, {"shard_by": "source"}):
+        diff = diff_manifest(manifest(**{"a.pdf": "1"}), {"a.pdf": "1"}, {**PARAMS, **changed})
+        assert diff["rebuild"] == "parameters changed"
+        assert diff["stale_ids"] == [] and diff["keep"] == {}
+
+    old = manifest(**{"a.pdf": "1"})
+    del old["shard_by"]  # written before SHARD_BY existed: an unsharded store
+    assert params_match(old, PARAMS) and not params_match(old, {**PARAMS, "shard_by": "source"})
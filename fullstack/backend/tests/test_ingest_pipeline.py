@@ -0,0 +1,68 @@
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from types import SimpleNamespace
+
+BACKEND_ROOT = Path(__file__).resolve().parents[1]  # .../fullstack/backend
+sys.path.insert(0, str(BACKEND_ROOT))
+
+from ingest_pipeline import IngestStats, bounded_map, batched_with_commits  # noqa: E402
+
+
+def chunk(source: str, n: int):
+    return SimpleNamespace(page_content="x" * n, metadata={"source": source})
+
+
+def test_bounded_map_keeps_order_and_limits_work_ahead():
+    started = []
+
+    def work(i):
+        started.append(i)
+        return i * 10
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = []
+        for consumed, value in enumerate(bounded_map(pool, work, range(20), 3)):
+            assert len(started) <= consumed + 3  # never more than 3 calls ahead of the consumer
+            results.append(value)
+    assert results == [i * 10 for i in range(20)]
+
+
+def test_batches_commit_a_file_only_once_all_its_chunks_are_in():
+    files = [
+        ("a", {"n": 3}, ["a0", "a1", "a2"], [1, 2, 3]),
+        ("empty", {"n": 0}, [], []),
+        ("b", {"n": 4}, ["b0", "b1", "b2", "b3"], [4, 5, 6, 7]),
+    ]
+    batches = list(batched_with_commits(iter(files), 2))
+
+    assert [b[0] for b in batches] == [["a0", "a1"], ["a2", "b0"], ["b1", "b2"], ["b3"]]
+    assert [b[1] for b in batches] == [[1, 2], [3, 4], [5, 6], [7]]
+    assert [sorted(b[2]) for b in batches] == [[], ["a", "empty"], [], ["b"]]
+
+
+def test_batches_flush_trailing_files_without_chunks():
+    batches = list(batched_with_commits(iter([("a", {}, ["a0"], [1]), ("e", {}, [], [])]), 1))
+    assert batches == [(["a0"], [1], {"a": {}}), ([], [], {"e": {}})]
+    assert list(batched_with_commits(iter([]), 4)) == []
+
+
+def test_streaming_stats_match_the_list_based_numbers():
+    lengths = [150, 900, 1000, 1000, 1100, 2100, 400, 999]
+    chunks = [chunk("a.pdf" if i % 3 else "b.md", n) for i, n in enumerate(lengths)]
+
+    stats = IngestStats()
+    stats.add_documents([SimpleNamespace(metadata={"source": "a.pdf"})] * 3)
+    stats.add_source("b.md", 1)
+    stats.add_chunks(chunks[:5])
+    stats.add_chunks(chunks[5:])
+
+    ordered = sorted(lengths)
+    summary = stats.summary()
+    assert summary["documents"] == 4 and summary["sources"] == 2 and summary["chunks"] == 8
+    assert dict(stats.file_types) == {"pdf": 3, "md": 1}
+    assert (summary["min"], summary["max"], summary["avg"]) == (150, 2100, int(sum(lengths) / 8))
+    for p in (50, 90, 99):
+        assert summary[f"p{p}"] == ordered[int(round(p / 100 * 7))]
+    assert stats.count_lengths(below=200) == 1 and stats.count_lengths(above=2000) == 1
+    assert stats.chunks_by_source.most_common(1) == [("a.pdf", 5)]
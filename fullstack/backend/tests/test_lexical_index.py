@@ -0,0 +1,38 @@
+import sys
+from pathlib import Path
+
+BACKEND_ROOT = Path(__file__).resolve().parents[1]  # .../fullstack/backend
+sys.path.insert(0, str(BACKEND_ROOT))
+
+from lexical_index import BM25Index, tokenize, reciprocal_rank_fusion  # noqa: E402
+
+TEXTS = [
+    "Meal reimbursements are capped at $60/day without pre-approval.",
+    "Passwords must be at least 14 characters long.",
+    "The handbook references a $75 per day travel meal guidance.",
+]
+
+
+def test_tokenize_keeps_exact_tokens_and_parts():
+    toks = tokenize("Capped at $60/day (Section 3.2)")
+    assert "$60/day" in toks and "60" in toks and "3.2" in toks
+    assert "at" not in toks
+
+
+def test_bm25_ranks_exact_token_matches_first(tmp_path):
+    index = BM25Index.build(["a", "b", "c"], TEXTS, [{"source": s} for s in "abc"])
+    assert index.search("14 characters", k=2)[0][0] == 1
+    assert index.search("$60/day meals", k=3)[0][0] == 0
+    assert index.search("unrelated words", k=3) == []
+
+    path = str(tmp_path / "bm25.npz")
+    index.save(path)
+    loaded = BM25Index.load(path)
+    assert loaded.search("14 characters", k=2) == index.search("14 characters", k=2)
+    assert loaded.metadatas[1] == {"source": "b"}
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    fused = reciprocal_rank_fusion([["x", "y", "z"], ["y", "w"]], k=60)
+    assert fused[0][0] == "y"
+    assert {key for key, _ in fused} == {"x", "y", "z", "w"}
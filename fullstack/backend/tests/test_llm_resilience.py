@@ -0,0 +1,148 @@
+import sys
+import time
+import asyncio
+from pathlib import Path
+
+import httpx
+import openai
+import pytest
+
+BACKEND_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND_ROOT))
+
+from llm_resilience import CircuitBreaker, CircuitOpenError, ResilientLLM  # noqa: E402
+
+
+def _status_error(status: int, headers=None):
+    request = httpx.Request("POST", "http://llm.test/v1/chat/completions")
+    response = httpx.Response(status, headers=headers or {}, request=request)
+    cls = openai.RateLimitError if status == 429 else openai.APIStatusError
+    if status == 400:
+        cls = openai.BadRequestError
+    return cls(f"status {status}", response=response, body=None)
+
+
+class FakeModel:
+    """Plays back a script: an exception to raise, a float to sleep before answering, or a reply."""
+
+    def __init__(self, name, script):
+        self.name = name
+        self.script = list(script)
+        self.calls = 0
+
+    def invoke(self, messages):
+        self.calls += 1
+        step = self.script.pop(0) if self.script else "ok"
+        if isinstance(step, Exception):
+            raise step
+        if isinstance(step, float):
+            time.sleep(step)
+        return f"{self.name}:{self.calls}"
+
+    async def ainvoke(self, messages):
+        self.calls += 1
+        step = self.script.pop(0) if self.script else "ok"
+        if isinstance(step, Exception):
+            raise step
+        if isinstance(step, float):
+            await asyncio.sleep(step)
+        return f"{self.name}:{self.calls}"
+
+    def stream(self, messages):
+        self.calls += 1
+        step = self.script.pop(0) if self.script else "ok"
+        if isinstance(step, Exception):
+            raise step
+        yield from ["a", "b"]
+
+
+def _llm(primary, fallback=None, **kw):
+    kw.setdefault("backoff_base_s", 0.0)
+    return ResilientLLM(primary, fallback=fallback, **kw)
+
+
+def test_retries_retryable_errors_then_succeeds():
+    primary = FakeModel("p", [_status_error(429), _status_error(503)])
+    llm = _llm(primary, retries=2)
+    assert llm.invoke([]) == "p:3"
+    assert llm.stats()["retries"] == 2
+
+
+def test_non_retryable_error_goes_straight_to_fallback():
+    primary = FakeModel("p", [_status_error(400)])
+    fallback = FakeModel("f", [])
+    llm = _llm(primary, fallback, retries=3)
+    assert llm.invoke([]) == "f:1"
+    assert primary.calls == 1
+    assert llm.stats()["fallbacks"] == 1
+
+
+def test_raises_last_error_when_every_model_is_exhausted():
+    primary = FakeModel("p", [_status_error(503)] * 3)
+    llm = _llm(primary, retries=2)
+    with pytest.raises(openai.APIStatusError):
+        llm.invoke([])
+    assert primary.calls == 3
+
+
+def test_retry_after_header_is_honoured_up_to_the_cap():
+    llm = _llm(FakeModel("p", []), backoff_max_s=2.0)
+    assert llm.backoff_s(0, _status_error(429, {"retry-after": "1.5"})) == 1.5
+    assert llm.backoff_s(0, _status_error(429, {"retry-after": "60"})) == 2.0
+
+
+def test_breaker_opens_rejects_then_half_opens():
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=2, reset_s=10.0, clock=lambda: now[0])
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+    now[0] = 10.0
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    assert not breaker.allow()  # a single trial call
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    now[0] = 20.0
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_open_circuit_fails_fast_without_calling_the_model():
+    primary = FakeModel("p", [_status_error(503)] * 10)
+    llm = _llm(primary, retries=0, breaker_failures=2)
+    for _ in range(2):
+        with pytest.raises(openai.APIStatusError):
+            llm.invoke([])
+    with pytest.raises(CircuitOpenError):
+        llm.invoke([])
+    assert primary.calls == 2
+    stats = llm.stats()
+    assert stats["rejected"] == 1 and stats["breakers"]["primary"] == "open"
+
+
+def test_hedge_wins_when_the_first_request_is_slow():
+    primary = FakeModel("p", [1.0, "ok"])
+    llm = _llm(primary, hedge=True, hedge_min_s=0.05)
+    t0 = time.perf_counter()
+    assert llm.invoke([]) == "p:2"
+    assert time.perf_counter() - t0 < 0.5
+    assert llm.stats()["hedge_wins"] == 1
+
+
+def test_async_hedge_cancels_the_slow_request():
+    primary = FakeModel("p", [1.0, "ok"])
+    llm = _llm(primary, hedge=True, hedge_min_s=0.05)
+    assert asyncio.run(llm.ainvoke([])) == "p:2"
+    assert llm.stats()["hedges"] == 1
+
+
+def test_stream_retries_before_the_first_chunk():
+    primary = FakeModel("p", [_status_error(502)])
+    llm = _llm(primary, retries=1)
+    assert list(llm.stream([])) == ["a", "b"]
+    assert primary.calls == 2
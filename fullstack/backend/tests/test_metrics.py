@@ -0,0 +1,57 @@
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+BACKEND_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND_ROOT))
+
+import metrics  # noqa: E402
+
+
+def _sample(name, labels):
+    return metrics.REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_nested_stages_are_exclusive():
+    timings = metrics.RequestTimings()
+    with metrics.track(timings):
+        with metrics.stage("search"):
+            with metrics.stage("embed"):
+                time.sleep(0.05)
+            time.sleep(0.01)
+
+    assert timings.stages["embed"] >= 0.05
+    assert timings.stages["search"] < 0.05
+
+
+def test_stage_and_count_are_noops_without_a_request():
+    with metrics.stage("embed"):
+        metrics.count("retrieved_chunks", 3)
+    assert metrics.current() is None
+
+
+def test_finish_records_histograms_once():
+    before = _sample("rag_stage_seconds_count", {"stage": "llm", "outcome": "llm_error"})
+    requests_before = _sample("rag_requests_total", {"outcome": "llm_error", "coalesced": "false"})
+
+    timings = metrics.RequestTimings()
+    with metrics.track(timings):
+        with metrics.stage("llm"):
+            pass
+        metrics.count("context_chunks", 4)
+    timings.finish("llm_error")
+    timings.finish("llm_error")
+
+    assert _sample("rag_stage_seconds_count", {"stage": "llm", "outcome": "llm_error"}) == before + 1
+    assert _sample("rag_requests_total", {"outcome": "llm_error", "coalesced": "false"}) == requests_before + 1
+    body = timings.as_dict()
+    assert body["outcome"] == "llm_error" and body["context_chunks"] == 4 and "llm" in body["stages_ms"]
+
+
+def test_token_usage_from_langchain_response():
+    resp = SimpleNamespace(usage_metadata={"input_tokens": 900, "output_tokens": 120, "total_tokens": 1020})
+    assert metrics.token_usage(resp) == {"prompt_tokens": 900, "completion_tokens": 120}
+
+    resp = SimpleNamespace(usage_metadata=None, response_metadata={"token_usage": {"prompt_tokens": 10}})
+    assert metrics.token_usage(resp) == {"prompt_tokens": 10}
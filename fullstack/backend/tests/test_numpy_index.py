@@ -0,0 +1,37 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+
+BACKEND_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND_ROOT))
+
+from numpy_index import NumpyIndex  # noqa: E402
+
+
+def _index(space):
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(50, 8)).astype(np.float32)
+    ids = [f"c{i:03d}" for i in range(50)]
+    return NumpyIndex(vectors, ids, [""] * 50, [{"chunk_id": i} for i in ids], space), vectors, rng
+
+
+def test_l2_search_matches_brute_force():
+    index, vectors, rng = _index("l2")
+    q = rng.normal(size=8).astype(np.float32)
+
+    expected = np.sum((vectors - q) ** 2, axis=1)
+    hits = index.search(q, 5)
+
+    assert [r for r, _ in hits] == list(np.argsort(expected)[:5])
+    assert np.allclose([d for _, d in hits], np.sort(expected)[:5], atol=1e-4)
+
+
+def test_cosine_distance_and_small_index():
+    index, vectors, rng = _index("cosine")
+    q = rng.normal(size=8).astype(np.float32)
+
+    cos = vectors @ q / (np.linalg.norm(vectors, axis=1) * np.linalg.norm(q))
+    assert np.allclose(index.distances(q), 1.0 - cos, atol=1e-5)
+    assert len(index.search(q, 500)) == 50
+    assert NumpyIndex(np.zeros((0, 8), dtype=np.float32), [], [], []).search(q, 5) == []
@@ -0,0 +1,48 @@
+import gzip
+import sys
+from pathlib import Path
+
+from langchain_core.documents import Document
+
+BACKEND_ROOT = Path(__file__).resolve().parents[1]  # .../fullstack/backend
+sys.path.insert(0, str(BACKEND_ROOT))
+
+import parse_cache  # noqa: E402
+from parse_cache import ParseCache  # noqa: E402
+
+SHA1 = "ab" + "0" * 38
+
+
+def pages():
+    return [
+        Document(page_content="Page one text", metadata={"source": "/old/path/a.pdf", "page": 0, "page_label": "i"}),
+        Document(page_content="Página dos", metadata={"source": "/old/path/a.pdf", "page": 1, "page_label": "ii"}),
+    ]
+
+
+def test_round_trip_restores_text_page_metadata_and_current_source(tmp_path):
+    cache = ParseCache(str(tmp_path))
+    assert cache.get(SHA1, "pdf", "a.pdf") is None
+
+    cache.put(SHA1, "pdf", pages())
+    got = ParseCache(str(tmp_path)).get(SHA1, "pdf", "/new/path/a.pdf")
+
+    assert [d.page_content for d in got] == ["Page one text", "Página dos"]
+    assert [d.metadata for d in got] == [
+        {"source": "/new/path/a.pdf", "page": 0, "page_label": "i"},
+        {"source": "/new/path/a.pdf", "page": 1, "page_label": "ii"},
+    ]
+    assert cache.get(SHA1, "html", "a.pdf") is None  # other loader, other key
+
+
+def test_new_loader_version_misses_and_corrupt_entries_read_as_misses(tmp_path, monkeypatch):
+    ParseCache(str(tmp_path)).put(SHA1, "pdf", pages())
+
+    monkeypatch.setattr(parse_cache, "loader_version", lambda kind: f"{kind}/1 pypdf==99.0")
+    assert ParseCache(str(tmp_path)).get(SHA1, "pdf", "a.pdf") is None
+    monkeypatch.undo()
+
+    (entry,) = (tmp_path / SHA1[:2]).glob("*.json.gz")
+    with gzip.open(entry, "wt", encoding="utf-8") as f:
+        f.write('{"pages": [["trunc')
+    assert ParseCache(str(tmp_path)).get(SHA1, "pdf", "a.pdf") is None
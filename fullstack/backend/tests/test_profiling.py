@@ -0,0 +1,85 @@
+import sys
+import time
+import pstats
+from pathlib import Path
+
+BACKEND_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND_ROOT))
+
+from profiling import RequestProfiler, request_label  # noqa: E402
+
+
+def _busy(seconds: float):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        sum(i * i for i in range(200))
+
+
+def test_off_by_default_and_armed_requests_count_down(tmp_path):
+    p = RequestProfiler(str(tmp_path))
+    assert p.trigger() is None
+    assert p.trigger(forced=True) == "request"
+
+    p.configure(arm=2)
+    assert [p.trigger(), p.trigger(), p.trigger()] == ["armed", "armed", None]
+
+    p.configure(sample_rate=1.0)
+    assert p.trigger() == "sampled"
+
+
+def test_collapsed_output_contains_the_profiled_function(tmp_path):
+    p = RequestProfiler(str(tmp_path), interval_ms=1)
+    with p.profile("request", "/chat why") as info:
+        _busy(0.1)
+
+    [entry] = p.list()
+    assert entry["name"] == info["name"] and entry["trigger"] == "request" and entry["samples"] > 0
+    lines = (tmp_path / entry["file"]).read_text().splitlines()
+    assert any("_busy (test_profiling.py" in line for line in lines)
+    stack, count = lines[0].rsplit(" ", 1)
+    assert int(count) > 0 and ";" in stack
+
+
+def test_pstats_output_loads(tmp_path):
+    p = RequestProfiler(str(tmp_path), fmt="pstats")
+    with p.profile("armed"):
+        _busy(0.02)
+
+    [entry] = p.list()
+    stats = pstats.Stats(str(tmp_path / entry["file"]))
+    assert any(func[2] == "_busy" for func in stats.stats)
+
+
+def test_keeps_only_the_newest_profiles(tmp_path):
+    p = RequestProfiler(str(tmp_path), max_files=2)
+    for _ in range(3):
+        with p.profile("sampled"):
+            pass
+        time.sleep(0.002)  # names start with a millisecond timestamp
+    assert len(p.list()) == 2
+    assert len(list(tmp_path.glob("*.collapsed"))) == 2
+
+
+def test_pstats_only_while_no_other_request_is_in_flight(tmp_path):
+    p = RequestProfiler(str(tmp_path), fmt="pstats", interval_ms=1)
+    p.request_started()  # the profiled request
+    p.request_started()  # another one, on another thread: cProfile would record it too
+    with p.profile("armed"):
+        _busy(0.02)
+    p.request_finished()
+
+    with p.profile("armed"):
+        p.request_started()  # starts while cProfile runs
+        p.request_finished()
+    p.request_finished()
+
+    alone, concurrent = p.list()  # newest first
+    assert concurrent["format"] == "collapsed" and concurrent["file"].endswith(".collapsed")
+    assert alone["format"] == "pstats" and alone["overlapping"] == 1
+
+
+def test_labels_hash_the_question():
+    label = request_label("/chat", "What is my manager's home address?")
+    assert label.startswith("/chat q=") and "address" not in label
+    assert label == request_label("/chat", "What is my manager's home address?")
+    assert request_label("/chat") == "/chat"
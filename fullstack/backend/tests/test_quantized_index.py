@@ -0,0 +1,55 @@
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+
+BACKEND_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND_ROOT))
+
+from numpy_index import NumpyIndex, export_from_chroma  # noqa: E402
+from quantized_index import QuantizedIndex, build_quantized  # noqa: E402
+
+
+class FakeStore:
+    """Just enough of langchain's Chroma for export_from_chroma."""
+
+    def __init__(self, vectors):
+        self.vectors = vectors
+        self._collection = SimpleNamespace(metadata={"hnsw:space": "l2"})
+
+    def get(self, include):
+        ids = [f"c{i:04d}" for i in range(len(self.vectors))]
+        return {"ids": ids, "embeddings": self.vectors, "documents": ids, "metadatas": [{"chunk_id": i} for i in ids]}
+
+
+def _store(tmp_path):
+    rng = np.random.default_rng(1)
+    vectors = rng.normal(size=(400, 32)).astype(np.float32)
+    export_from_chroma(FakeStore(vectors), str(tmp_path))
+    sizes = build_quantized(str(tmp_path))
+    return rng, sizes
+
+
+def test_codes_are_compact_and_rescoring_is_exact(tmp_path):
+    rng, sizes = _store(tmp_path)
+    assert sizes == {"float32": 400 * 32 * 4, "int8": 400 * 32, "binary": 400 * 32 // 8}
+
+    exact = NumpyIndex.load(str(tmp_path))
+    q = rng.normal(size=32).astype(np.float32)
+    for mode in ("int8", "binary"):
+        index = QuantizedIndex.load(str(tmp_path), mode)
+        # every row as a candidate -> the float rescoring alone decides the ranking
+        assert index.search(q, 5, candidates=400) == exact.search(q, 5)
+
+
+def test_int8_recall_with_few_candidates(tmp_path):
+    rng, _ = _store(tmp_path)
+    exact = NumpyIndex.load(str(tmp_path))
+    index = QuantizedIndex.load(str(tmp_path), "int8", candidates=20)
+
+    hits = 0
+    for _ in range(20):
+        q = rng.normal(size=32).astype(np.float32)
+        hits += len({r for r, _ in index.search(q, 5)} & {r for r, _ in exact.search(q, 5)})
+    assert hits / 100 >= 0.95
@@ -0,0 +1,49 @@
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+BACKEND_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND_ROOT))
+
+from reranker import CrossEncoderReranker  # noqa: E402
+
+
+class FakeCrossEncoder:
+    """Score = number of query words in the chunk."""
+
+    def __init__(self):
+        self.pairs = 0
+
+    def predict(self, pairs):
+        self.pairs += len(pairs)
+        return [float(len(set(q.split()) & set(t.split()))) for q, t in pairs]
+
+
+def _docs(*texts):
+    return [SimpleNamespace(page_content=t, metadata={"chunk_id": i}) for i, t in enumerate(texts)]
+
+
+def test_rerank_orders_by_score_and_keeps_top_n():
+    model = FakeCrossEncoder()
+    r = CrossEncoderReranker("fake", model=model)
+    docs = _docs("nothing here", "per diem meals", "meals only", "per diem for meals abroad")
+
+    top = r.rerank("per diem meals", docs, top_n=2)
+    assert [d.metadata["chunk_id"] for d, _ in top] == [1, 3]
+    assert [s for _, s in top] == [3.0, 3.0]
+
+
+def test_scores_are_cached_per_query_and_text():
+    model = FakeCrossEncoder()
+    r = CrossEncoderReranker("fake", cache_size=3, model=model)
+    docs = _docs("a b", "b c", "c d")
+
+    r.rerank("b", docs, 3)
+    r.rerank("b", docs, 3)
+    assert model.pairs == 3
+    assert r.stats()["hits"] == 3
+
+    r.rerank("c", docs[:1], 1)  # evicts the least recently used entry
+    assert r.stats()["cache_entries"] == 3
+    r.rerank("b", docs, 3)
+    assert model.pairs == 5
@@ -0,0 +1,73 @@
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+BACKEND_ROOT = Path(__file__).resolve().parents[1]  # .../fullstack/backend
+sys.path.insert(0, str(BACKEND_ROOT))
+
+from sharded_store import (  # noqa: E402
+    ShardedChroma, collection_name, named_shards, normalize_filter, where_clause,
+)
+
+
+class FakeShard:
+    def __init__(self, hits):
+        self.hits = hits  # [(doc, distance)] closest first
+        self.calls = []
+
+    def similarity_search_by_vector_with_relevance_scores(self, embedding, k=4, filter=None):
+        self.calls.append(filter)
+        return self.hits[:k]
+
+
+def sharded(tmp_path, shards: dict, shard_by="source", pool=None):
+    db = ShardedChroma(str(tmp_path), shard_by=shard_by, pool=pool)
+    db.shards = shards
+    return db
+
+
+def test_fan_out_merges_the_global_top_k(tmp_path):
+    a = FakeShard([("a1", 0.1), ("a2", 0.5), ("a3", 0.9)])
+    b = FakeShard([("b1", 0.2), ("b2", 0.3), ("b3", 0.4)])
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        db = sharded(tmp_path, {"a.pdf": a, "b.pdf": b}, pool=pool)
+        hits = db.similarity_search_by_vector_with_relevance_scores([0.0], k=4, filter={"doc_type": "pdf"})
+
+    assert hits == [("a1", 0.1), ("b1", 0.2), ("b2", 0.3), ("b3", 0.4)]
+    assert a.calls == b.calls == [{"doc_type": "pdf"}]
+
+    only_b = db.similarity_search_by_vector_with_relevance_scores([0.0], k=2, shards=["b.pdf", "gone.pdf"])
+    assert only_b == [("b1", 0.2), ("b2", 0.3)] and len(a.calls) == 1
+
+
+def test_routing_by_filter_and_by_policy_name(tmp_path):
+    keys = ["hr/Travel_Policy.pdf", "hr/Leave-Policy.md", "it/security.txt"]
+    db = sharded(tmp_path, {k: FakeShard([]) for k in keys})
+
+    assert db.route("What is the per diem in the travel policy?") == ["hr/Travel_Policy.pdf"]
+    assert db.route("How many days off?") == keys
+    assert db.route("How many days off?", by_name=False) == keys
+    assert db.route("anything", normalize_filter({"source": ["it/security.txt", "nope.pdf"]})) == ["it/security.txt"]
+    assert named_shards("policy travel", keys) == []  # the whole title, in order
+
+    by_type = sharded(tmp_path, {"pdf": FakeShard([]), "text": FakeShard([])}, shard_by="doc_type")
+    assert by_type.route("travel policy", {"doc_type": ["text"]}) == ["text"]
+    assert by_type.route("travel policy", {"source": ["x.pdf"]}) == ["pdf", "text"]  # other fields: Chroma `where` only
+
+
+def test_filters_and_collection_names():
+    assert normalize_filter(None) is None and normalize_filter({}) is None
+    f = normalize_filter({"source": "b.pdf", "doc_type": ["pdf", "pdf", "text"]})
+    assert f == {"source": ["b.pdf"], "doc_type": ["pdf", "text"]}
+    assert where_clause(f) == {"$and": [{"doc_type": {"$in": ["pdf", "text"]}}, {"source": {"$in": ["b.pdf"]}}]}
+    assert where_clause({"source": ["b.pdf"]}) == {"source": {"$in": ["b.pdf"]}}
+    for bad in ("b.pdf", {"title": "x"}, {"source": []}, {"source": [1]}):
+        with pytest.raises(ValueError):
+            normalize_filter(bad)
+
+    name = collection_name("hr/Travel Policy (2024).pdf")
+    assert name.startswith("shard-hr-Travel-Policy-2024-pdf-") and len(name) <= 63
+    assert collection_name("x" * 200) != collection_name("x" * 199) and len(collection_name("x" * 200)) <= 63
+    assert collection_name("é").startswith("shard-") and 3 <= len(collection_name("é")) <= 63
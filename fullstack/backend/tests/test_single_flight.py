@@ -0,0 +1,143 @@
+import sys
+import time
+import asyncio
+import threading
+import multiprocessing
+from pathlib import Path
+
+import pytest
+
+BACKEND_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND_ROOT))
+
+from single_flight import SingleFlight  # noqa: E402
+
+
+def _slow(calls, value, delay=0.2):
+    def fn():
+        calls.append(1)
+        time.sleep(delay)
+        return value
+    return fn
+
+
+def _run_concurrently(n, target):
+    results = [None] * n
+
+    def run(i):
+        results[i] = target()
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def test_concurrent_callers_share_one_call():
+    sf = SingleFlight()
+    calls = []
+    results = _run_concurrently(8, lambda: sf.do("k", _slow(calls, {"answer": "a"})))
+
+    assert len(calls) == 1
+    assert all(r == {"answer": "a"} for r, _ in results)
+    assert sum(shared for _, shared in results) == 7
+    assert sf.stats()["coalesced"] == 7 and sf.stats()["in_flight"] == 0
+
+
+def test_different_keys_and_later_calls_run_separately():
+    sf = SingleFlight()
+    calls = []
+    _run_concurrently(2, lambda: sf.do(threading.current_thread().name, _slow(calls, 1, 0.05)))
+    sf.do("k", _slow(calls, 1, 0.0))
+    sf.do("k", _slow(calls, 1, 0.0))
+    assert len(calls) == 4
+
+
+def test_leader_exception_reaches_waiters():
+    sf = SingleFlight()
+
+    def boom():
+        time.sleep(0.1)
+        raise ValueError("llm down")
+
+    errors = []
+
+    def call():
+        try:
+            sf.do("k", boom)
+        except ValueError as e:
+            errors.append(e)
+
+    _run_concurrently(4, call)
+    assert len(errors) == 4
+
+
+def test_async_callers_share_one_call():
+    sf = SingleFlight()
+    calls = []
+
+    async def answer():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"answer": "a"}
+
+    async def main():
+        return await asyncio.gather(*(sf.ado("k", answer) for _ in range(5)))
+
+    results = asyncio.run(main())
+    assert len(calls) == 1
+    assert [shared for _, shared in results].count(True) == 4
+
+
+def _worker(lock_dir, counter, out):
+    sf = SingleFlight(lock_dir, wait_s=5.0, poll_s=0.005)
+
+    def fn():
+        with counter.get_lock():
+            counter.value += 1
+        time.sleep(0.3)
+        return {"answer": "a", "sources": {1: "policy.pdf p.1"}}
+
+    result, shared = sf.do("k", fn)
+    out.put((result, shared))
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="flock")
+def test_workers_coalesce_through_the_lock_dir(tmp_path):
+    ctx = multiprocessing.get_context("fork")
+    counter, out = ctx.Value("i", 0), ctx.Queue()
+    procs = [ctx.Process(target=_worker, args=(str(tmp_path), counter, out)) for _ in range(3)]
+    for p in procs:
+        p.start()
+    results = [out.get(timeout=10) for _ in procs]
+    for p in procs:
+        p.join()
+
+    assert counter.value == 1
+    assert sorted(shared for _, shared in results) == [False, True, True]
+    for result, shared in results:  # the other workers read the leader's result back from JSON
+        assert result == {"answer": "a", "sources": {"1" if shared else 1: "policy.pdf p.1"}}
+
+
+def test_unshareable_results_are_not_handed_to_other_workers(tmp_path):
+    sf = SingleFlight(str(tmp_path))
+    sf.do("k", lambda: {"answer": "Request failed (LLM)."}, share=lambda r: False)
+    assert not list(tmp_path.glob("*.result"))
+
+
+def test_result_files_are_json_only(tmp_path):
+    import pickle
+
+    sf = SingleFlight(str(tmp_path))
+    _, path = sf._paths("k")
+    sf._write_result(path, ({"answer": "a", "sources": {1: "policy.pdf p.1"}}, "answered"))
+    assert sf._read_result(path, since=0) == [{"answer": "a", "sources": {"1": "policy.pdf p.1"}}, "answered"]
+
+    with open(path, "wb") as f:
+        f.write(pickle.dumps({"answer": "planted"}))
+    assert sf._read_result(path, since=0) is None
+
+    sf._write_result(path + "2", {"answer": object()})  # not JSON: not shared, no file left behind
+    assert sorted(p.name for p in tmp_path.iterdir()) == [Path(path).name]
@@ -53,3 +53,111 @@ def test_version():
     assert r.status_code == 200
     body = r.get_json()
     assert body["service"] == "backend"
+
+
+def test_chat_rejects_a_bad_filter():
+    c = app.test_client()
+    for path in ("/chat", "/chat/stream"):
+        r = c.post(path, json={"question": "per diem?", "filter": {"title": "Travel"}})
+        assert r.status_code == 400
+        assert "filter" in r.get_json()["error"]
+
+
+def test_ready_only_after_warmup(monkeypatch):
+    import types
+
+    c = app.test_client()
+    monkeypatch.delitem(sys.modules, "backend", raising=False)
+    assert c.get("/ready").status_code == 503
+
+    fake = types.SimpleNamespace(warm=False)
+    fake.is_ready = lambda: fake.warm
+    monkeypatch.setitem(sys.modules, "backend", fake)
+    assert c.get("/ready").status_code == 503  # still importing
+
+    fake.IMPORT_DONE = True
+    assert c.get("/ready").status_code == 503
+
+    fake.warm = True
+    r = c.get("/ready")
+    assert r.status_code == 200
+    assert r.get_json()["status"] == "ready"
+
+
+def test_chat_batch_keeps_input_order_and_per_item_errors(monkeypatch):
+    import json
+    import types
+
+    def iter_answer_many(questions, with_timings=False, filters=None):
+        for i in reversed(range(len(questions))):  # finish out of order
+            if questions[i] == "boom":
+                yield i, {"error": "Internal server error"}
+            else:
+                yield i, {"answer": questions[i].upper(), "sources": []}
+
+    monkeypatch.setitem(sys.modules, "backend", types.SimpleNamespace(iter_answer_many=iter_answer_many))
+    c = app.test_client()
+    questions = ["a?", "", "boom", 7, "b?"]
+
+    results = c.post("/chat/batch", json={"questions": questions}).get_json()["results"]
+    assert [r["index"] for r in results] == [0, 1, 2, 3, 4]
+    assert results[0]["result"]["answer"] == "A?" and results[4]["result"]["answer"] == "B?"
+    assert all("error" in results[i] for i in (1, 2, 3))
+
+    r = c.post("/chat/batch?stream=1", json={"questions": questions})
+    assert r.content_type.startswith("application/x-ndjson")
+    streamed = [json.loads(line) for line in r.data.decode().splitlines()]
+    assert sorted(streamed, key=lambda item: item["index"]) == results
+
+    assert c.post("/chat/batch", json={"questions": []}).status_code == 400
+    assert c.post("/chat/batch", json={"questions": ["x"] * 10_000}).status_code == 400
+
+
+def test_metrics_endpoint():
+    c = app.test_client()
+    r = c.get("/metrics")
+    assert r.status_code == 200
+    assert r.content_type.startswith("text/plain")
+    assert b"rag_request_seconds" in r.data
+
+
+def test_admin_routes_need_the_token(monkeypatch, tmp_path):
+    import app as app_module
+    from profiling import RequestProfiler
+
+    c = app.test_client()
+    assert c.get("/admin/profiles").status_code == 404
+
+    monkeypatch.setattr(app_module.cfg, "ADMIN_TOKEN", "s3cret")
+    monkeypatch.setattr(app_module, "profiler", RequestProfiler(str(tmp_path)))
+    assert c.get("/admin/profiles", headers={"X-Admin-Token": "wrong"}).status_code == 404
+
+    admin = {"X-Admin-Token": "s3cret"}
+    r = c.post("/chat", json={"question": ""}, headers={**admin, "X-Profile": "1"})
+    assert r.status_code == 400
+    name = r.headers["X-Profile-Id"]
+
+    profiles = c.get("/admin/profiles", headers=admin).get_json()["profiles"]
+    assert [p["name"] for p in profiles] == [name]
+    assert c.get(f"/admin/profiles/{name}", headers=admin).status_code == 200
+
+    assert c.post("/admin/profiling", json={"arm": 1}, headers=admin).get_json()["armed"] == 1
+
+
+def test_admin_ingest_status_and_guard(monkeypatch, tmp_path):
+    import app as app_module
+
+    c = app.test_client()
+    assert c.get("/admin/ingest").status_code == 404
+
+    monkeypatch.setattr(app_module.cfg, "ADMIN_TOKEN", "s3cret")
+    monkeypatch.setattr(app_module.cfg, "PERSIST_DIR", str(tmp_path))
+    monkeypatch.setattr(app_module.cfg, "STORE_VERSIONS", True)
+    admin = {"X-Admin-Token": "s3cret"}
+
+    body = c.get("/admin/ingest", headers=admin).get_json()
+    assert body["running"] is False and body["current"] is None and body["versions"] == []
+
+    assert c.post("/admin/ingest", json={"mode": "bogus"}, headers=admin).status_code == 400
+    monkeypatch.setattr(app_module.cfg, "STORE_VERSIONS", False)
+    assert c.post("/admin/ingest", json={}, headers=admin).status_code == 409
@@ -0,0 +1,68 @@
+import sys
+from pathlib import Path
+
+BACKEND_ROOT = Path(__file__).resolve().parents[1]  # .../fullstack/backend
+sys.path.insert(0, str(BACKEND_ROOT))
+
+from store_versions import (  # noqa: E402
+    COMPLETE_MARKER, IngestLock, current_version, gc_versions, ingest_status, list_versions, new_version,
+    publish, store_dir, version_dir, write_status,
+)
+
+
+def build(root: str, run_id: str, complete: bool = True) -> str:
+    name = new_version(root, run_id)
+    if complete:
+        Path(version_dir(root, name), COMPLETE_MARKER).write_text("{}")
+    return name
+
+
+def test_unversioned_root_is_served_until_a_version_is_published(tmp_path):
+    root = str(tmp_path)
+    assert current_version(root) is None and store_dir(root) == root
+
+    a = build(root, "aaaa")
+    assert store_dir(root) == root  # built but not published
+
+    publish(root, a)
+    assert store_dir(root) == version_dir(root, a)
+
+    b = build(root, "bbbb")
+    publish(root, b)  # right after the first flip: the memo must not return the old name
+    assert current_version(root) == b
+    assert [v["name"] for v in list_versions(root) if v["current"]] == [b]
+
+
+def test_gc_keeps_current_and_newest_complete_versions(tmp_path):
+    root = str(tmp_path)
+    names = sorted(build(root, f"{i:04d}") for i in range(4))
+    broken = build(root, "zzzz", complete=False)
+    publish(root, names[-1])
+
+    removed = gc_versions(root, keep=1)
+
+    assert sorted(removed) == sorted(names[:2] + [broken])
+    assert sorted(v["name"] for v in list_versions(root)) == names[2:]
+
+    publish(root, build(root, "0005"))
+    assert gc_versions(root, keep=0) == [names[2]]  # keep=0 still keeps the version just replaced
+    assert names[3] in {v["name"] for v in list_versions(root)}
+
+
+def test_lock_and_status_report_running_and_interrupted_ingests(tmp_path):
+    root = str(tmp_path)
+    write_status(root, new_run=True, state="running", files_total=3)
+    assert ingest_status(root)["state"] == "interrupted"  # nobody holds the lock
+
+    lock = IngestLock(root)
+    assert lock.acquire()
+    try:
+        assert not IngestLock(root).acquire()
+        status = ingest_status(root)
+        assert status["running"] and status["state"] == "running" and status["files_total"] == 3
+    finally:
+        lock.release()
+
+    write_status(root, state="done")
+    assert ingest_status(root)["state"] == "done"
+    assert "files_total" not in write_status(root, new_run=True, state="running")
@@ -0,0 +1,37 @@
+import sys
+from pathlib import Path
+
+BACKEND_ROOT = Path(__file__).resolve().parents[1]  # .../fullstack/backend
+sys.path.insert(0, str(BACKEND_ROOT))
+
+from stream_guard import StreamGuard  # noqa: E402
+
+REFS = {1: "Employee_Handbook.pdf p.3", 2: "Information_Security_Policy.pdf p.7"}
+
+
+def test_lines_are_released_once_complete():
+    g = StreamGuard(REFS, max_chars=2000)
+    assert g.feed("Answer:\nPasswords need 14 char") == ["Answer:"]
+    assert g.feed("acters [2].\n\nSources:\n[2] Information_Security") == ["Passwords need 14 characters [2].", "", "Sources:"]
+    assert g.feed("_Policy.pdf p.7") == []
+    assert g.finish() == ["[2] Information_Security_Policy.pdf p.7"]
+    assert g.violation is None
+
+
+def test_unknown_citation_stops_the_stream():
+    g = StreamGuard(REFS, max_chars=2000)
+    assert g.feed("Answer:\nRemote days are capped [5].\nMore [1].\n") == ["Answer:"]
+    assert "[5]" in g.violation
+
+
+def test_mismatched_source_label_stops_the_stream():
+    g = StreamGuard(REFS, max_chars=2000)
+    g.feed("Answer:\nSee handbook [1].\n\nSources:\n[1] Employee_Handbook.pdf p.4\n")
+    assert g.violation is not None
+
+
+def test_explicit_refusal_is_not_flagged_and_length_cap():
+    g = StreamGuard(REFS, max_chars=20)
+    g.feed("Answer:\nI cannot answer from the provided context [9].\n")
+    assert g.violation is None
+    assert g.over_limit
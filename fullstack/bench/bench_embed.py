@@ -0,0 +1,91 @@
+import json
+import time
+import os
+import sys
+import argparse
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+BACKEND_DIR = os.path.join(PROJECT_ROOT, "backend")
+
+# run as if we are inside backend/ so relative paths (.env) match
+os.chdir(BACKEND_DIR)
+sys.path.insert(0, BACKEND_DIR)
+
+from config import Config  # noqa: E402
+from embedding_runtime import build_embeddings  # noqa: E402
+from embed_service import BatchedEmbeddings, EmbeddingServer, RemoteEmbeddings  # noqa: E402
+
+EVAL_FILE = os.path.join(PROJECT_ROOT, "eval", "eval_questions.jsonl")
+
+
+def load_questions(path: str) -> list[str]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line)["question"] for line in f if line.strip()]
+
+
+def percentile(values: list[float], p: float) -> float:
+    values = sorted(values)
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(round(p / 100.0 * (len(values) - 1))))]
+
+
+def run_load(embed_query, questions: list[str], concurrency: int, total: int) -> dict:
+    """
+    `concurrency` clients each embedding questions back to back until `total` queries are done.
+    """
+    latencies = []
+
+    def one(i):
+        t0 = time.perf_counter()
+        embed_query(questions[i % len(questions)] + f" #{i}")  # unique text, nothing cached
+        latencies.append((time.perf_counter() - t0) * 1000.0)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(total)))
+    seconds = time.perf_counter() - t0
+
+    return {
+        "queries_per_sec": total / seconds,
+        "p50_ms": percentile(latencies, 50),
+        "p99_ms": percentile(latencies, 99),
+    }
+
+
+if __name__ == "__main__":
+    cfg = Config()
+    parser = argparse.ArgumentParser(description="Query embedding throughput: one at a time vs micro-batched")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--total", type=int, default=400)
+    parser.add_argument("--max-batch", type=int, default=cfg.EMBED_BATCH_MAX)
+    parser.add_argument("--max-wait-ms", type=float, default=cfg.EMBED_BATCH_WAIT_MS)
+    args = parser.parse_args()
+
+    questions = load_questions(EVAL_FILE)
+    model = build_embeddings(cfg)
+    model.embed_query("warmup")
+    report = {"model": cfg.EMB_MODEL, "concurrency": args.concurrency, "total": args.total}
+
+    # current path: every request runs its own batch-size-1 forward pass
+    report["direct"] = run_load(model.embed_query, questions, args.concurrency, args.total)
+
+    batched = BatchedEmbeddings(model, args.max_batch, args.max_wait_ms)
+    report["microbatch_in_process"] = run_load(batched.embed_query, questions, args.concurrency, args.total)
+    report["microbatch_in_process"]["avg_batch"] = batched.stats()["avg_batch"]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "embed.sock")
+        service = BatchedEmbeddings(model, args.max_batch, args.max_wait_ms)
+        server = EmbeddingServer(path, service)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        client = RemoteEmbeddings(path)
+        report["service_socket"] = run_load(client.embed_query, questions, args.concurrency, args.total)
+        report["service_socket"]["avg_batch"] = service.stats()["avg_batch"]
+        server.shutdown()
+        server.server_close()
+
+    print(json.dumps(report, indent=2))
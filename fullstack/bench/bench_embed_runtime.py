@@ -0,0 +1,77 @@
+import copy
+import json
+import time
+import os
+import sys
+import argparse
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+BACKEND_DIR = os.path.join(PROJECT_ROOT, "backend")
+
+# run as if we are inside backend/ so relative paths (.env, chromadb path) match
+os.chdir(BACKEND_DIR)
+sys.path.insert(0, BACKEND_DIR)
+
+from config import Config  # noqa: E402
+from embedding_runtime import build_embeddings, cosine_drift  # noqa: E402
+from numpy_index import NumpyIndex  # noqa: E402
+from store_versions import store_dir  # noqa: E402
+
+EVAL_FILE = os.path.join(PROJECT_ROOT, "eval", "eval_questions.jsonl")
+
+
+def load_questions(path: str) -> list[str]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line)["question"] for line in f if line.strip()]
+
+
+def percentile(values: list[float], p: float) -> float:
+    values = sorted(values)
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(round(p / 100.0 * (len(values) - 1))))]
+
+
+def profile(embeddings, questions: list[str], chunks: list[str], batch: int) -> tuple[dict, list, list]:
+    latencies, qvecs = [], []
+    for q in questions:
+        t0 = time.perf_counter()
+        qvecs.append(embeddings.embed_query(q))
+        latencies.append((time.perf_counter() - t0) * 1000.0)
+
+    cvecs = []
+    t0 = time.perf_counter()
+    for start in range(0, len(chunks), batch):
+        cvecs += embeddings.embed_documents(chunks[start:start + batch])
+    seconds = time.perf_counter() - t0
+
+    return {
+        "query_p50_ms": percentile(latencies, 50),
+        "query_p99_ms": percentile(latencies, 99),
+        "ingest_chunks_per_sec": len(chunks) / seconds if seconds > 0 else 0.0,
+    }, qvecs, cvecs
+
+
+if __name__ == "__main__":
+    cfg = Config()
+    parser = argparse.ArgumentParser(description="Float vs dynamic int8 embedding inference: drift, latency, throughput")
+    parser.add_argument("--threads", type=int, default=cfg.EMB_THREADS, help="intra-op threads (0 = torch default)")
+    parser.add_argument("--chunks", type=int, default=256, help="stored chunk texts to embed for throughput")
+    parser.add_argument("--batch", type=int, default=cfg.INGEST_EMBED_BATCH)
+    args = parser.parse_args()
+
+    questions = load_questions(EVAL_FILE)
+    chunks = NumpyIndex.load(store_dir(cfg.PERSIST_DIR)).texts[:args.chunks]
+
+    report = {"model": cfg.EMB_MODEL, "threads": args.threads, "questions": len(questions), "chunks": len(chunks)}
+    vectors = {}
+    for name, quantize in (("float32", False), ("int8", True)):
+        run_cfg = copy.copy(cfg)
+        run_cfg.EMB_QUANTIZE, run_cfg.EMB_THREADS = quantize, args.threads
+        embeddings = build_embeddings(run_cfg)
+        embeddings.embed_query("warmup")
+        report[name], qvecs, cvecs = profile(embeddings, questions, chunks, args.batch)
+        vectors[name] = qvecs + cvecs
+
+    report["drift_int8_vs_float32"] = cosine_drift(vectors["float32"], vectors["int8"])
+    print(json.dumps(report, indent=2))
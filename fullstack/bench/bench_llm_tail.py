@@ -0,0 +1,111 @@
+import os
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+BACKEND_DIR = os.path.join(PROJECT_ROOT, "backend")
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from langchain_openai import ChatOpenAI  # noqa: E402
+from langchain_core.messages import HumanMessage  # noqa: E402
+
+from llm_resilience import ResilientLLM  # noqa: E402
+from fake_llm_server import FakeLLMSettings, start_in_thread  # noqa: E402
+
+MESSAGES = [HumanMessage(content="Context:\n[1] policy.pdf p.1\nPasswords need 14 characters.\n\nQuestion: how long?")]
+
+
+def percentile(values: list[float], p: float) -> float:
+    values = sorted(values)
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(round(p / 100.0 * (len(values) - 1))))]
+
+
+def chat_model(base_url: str, timeout: float, max_retries: int | None = None):
+    kwargs = {} if max_retries is None else {"max_retries": max_retries}
+    return ChatOpenAI(model_name="fake", openai_api_key="fake", openai_api_base=base_url,
+                      timeout=timeout, max_tokens=64, **kwargs)
+
+
+def run(invoke, requests: int, concurrency: int) -> dict:
+    def one(_):
+        t0 = time.perf_counter()
+        try:
+            invoke(MESSAGES)
+            ok = True
+        except Exception:
+            ok = False
+        return ok, (time.perf_counter() - t0) * 1000.0
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(requests)))
+    wall = time.perf_counter() - t0
+
+    ms = [m for _, m in results]
+    errors = sum(1 for ok, _ in results if not ok)
+    return {
+        "requests": requests,
+        "error_rate": errors / max(1, requests),
+        "p50_ms": percentile(ms, 50),
+        "p95_ms": percentile(ms, 95),
+        "p99_ms": percentile(ms, 99),
+        "max_ms": max(ms) if ms else 0.0,
+        "wall_s": wall,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="LLM call tail latency: SDK defaults vs retry + hedge + breaker")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--tail-prob", type=float, default=0.05)
+    parser.add_argument("--tail-ms", type=float, default=4000.0)
+    parser.add_argument("--rate-limit-prob", type=float, default=0.05)
+    parser.add_argument("--fail-prob", type=float, default=0.02)
+    parser.add_argument("--timeout", type=float, default=30.0, help="per-request timeout (LLM_TIMEOUT)")
+    parser.add_argument("--hedge-min-s", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    def settings():
+        return FakeLLMSettings(args.latency_ms, args.tail_prob, args.tail_ms, args.rate_limit_prob,
+                               None, args.fail_prob, seed=args.seed)
+
+    report = {"settings": vars(args)}
+
+    server, base = start_in_thread(settings())
+    report["sdk_defaults"] = run(chat_model(base, args.timeout).invoke, args.requests, args.concurrency)
+    report["sdk_defaults"]["provider_requests"] = server.settings.requests
+
+    server.settings = settings()
+    retry_only = ResilientLLM(chat_model(base, args.timeout, 0), retries=2, backoff_base_s=0.2)
+    report["retry_backoff"] = run(retry_only.invoke, args.requests, args.concurrency)
+    report["retry_backoff"]["provider_requests"] = server.settings.requests
+    report["retry_backoff"]["stats"] = retry_only.stats()
+
+    server.settings = settings()
+    hedged = ResilientLLM(chat_model(base, args.timeout, 0), retries=2, backoff_base_s=0.2,
+                          hedge=True, hedge_min_s=args.hedge_min_s, hedge_threads=2 * args.concurrency)
+    report["retry_backoff_hedge"] = run(hedged.invoke, args.requests, args.concurrency)
+    report["retry_backoff_hedge"]["provider_requests"] = server.settings.requests
+    report["retry_backoff_hedge"]["stats"] = hedged.stats()
+
+    # Provider outage: every request is a 503
+    outage = max(20, args.requests // 5)
+    server.settings = FakeLLMSettings(down=True)
+    report["outage_sdk_defaults"] = run(chat_model(base, args.timeout).invoke, outage, args.concurrency)
+    server.settings = FakeLLMSettings(down=True)
+    breaker = ResilientLLM(chat_model(base, args.timeout, 0), retries=2, backoff_base_s=0.2, breaker_failures=5)
+    report["outage_breaker"] = run(breaker.invoke, outage, args.concurrency)
+    report["outage_breaker"]["provider_requests"] = server.settings.requests
+    report["outage_breaker"]["stats"] = breaker.stats()
+
+    server.shutdown()
+    print(json.dumps(report, indent=2))
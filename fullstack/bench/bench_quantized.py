@@ -0,0 +1,82 @@
+import json
+import time
+import os
+import sys
+import argparse
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+BACKEND_DIR = os.path.join(PROJECT_ROOT, "backend")
+
+# run as if we are inside backend/ so relative paths (.env, chromadb path) match
+os.chdir(BACKEND_DIR)
+sys.path.insert(0, BACKEND_DIR)
+
+from config import Config  # noqa: E402
+from embedding_runtime import build_embeddings  # noqa: E402
+from numpy_index import NumpyIndex  # noqa: E402
+from quantized_index import QuantizedIndex  # noqa: E402
+from store_versions import store_dir  # noqa: E402
+
+EVAL_FILE = os.path.join(PROJECT_ROOT, "eval", "eval_questions.jsonl")
+
+
+def load_questions(path: str) -> list[str]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line)["question"] for line in f if line.strip()]
+
+
+def percentile(values: list[float], p: float) -> float:
+    values = sorted(values)
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(round(p / 100.0 * (len(values) - 1))))]
+
+
+def measure(search, qvecs, exact_top: list[set], k: int, repeats: int) -> dict:
+    latencies, recalls = [], []
+    for qvec, expected in zip(qvecs, exact_top):
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            hits = search(qvec)
+            latencies.append((time.perf_counter() - t0) * 1000.0)
+        recalls.append(len({r for r, _ in hits} & expected) / max(1, len(expected)))
+    return {
+        "p50_ms": percentile(latencies, 50),
+        "p99_ms": percentile(latencies, 99),
+        f"recall_at_{k}": sum(recalls) / max(1, len(recalls)),
+    }
+
+
+def run_bench(k: int, candidates: list[int], repeats: int) -> dict:
+    """
+    Float32 exact search is the reference: recall@k is overlap with its top-k on the eval questions.
+    Memory is the size of what each engine scans per query.
+    """
+    cfg = Config()
+    exact = NumpyIndex.load(store_dir(cfg.PERSIST_DIR))
+    model = build_embeddings(cfg)
+    qvecs = [model.embed_query(q) for q in load_questions(EVAL_FILE)]
+    exact_top = [{r for r, _ in exact.search(q, k)} for q in qvecs]
+
+    report = {
+        "vectors": len(exact),
+        "queries": len(qvecs),
+        "k": k,
+        "float32": {"scan_bytes": int(exact.vectors.nbytes), **measure(lambda q: exact.search(q, k), qvecs, exact_top, k, repeats)},
+    }
+    for mode in ("int8", "binary"):
+        index = QuantizedIndex.load(store_dir(cfg.PERSIST_DIR), mode)
+        report[mode] = {"scan_bytes": index.code_bytes()}
+        for c in candidates:
+            report[mode][f"candidates_{c}"] = measure(lambda q: index.search(q, k, c), qvecs, exact_top, k, repeats)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Quantized (int8 / binary) vs float32 search: memory, latency, recall@k")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--candidates", default="20,50,100")
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    print(json.dumps(run_bench(args.k, [int(c) for c in args.candidates.split(",")], args.repeats), indent=2))
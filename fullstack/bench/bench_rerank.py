@@ -0,0 +1,102 @@
+import json
+import time
+import os
+import sys
+import argparse
+import importlib.util
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+BACKEND_DIR = os.path.join(PROJECT_ROOT, "backend")
+
+# run as if we are inside backend/ so relative paths (.env, chromadb path) match
+os.chdir(BACKEND_DIR)
+sys.path.insert(0, BACKEND_DIR)
+
+spec = importlib.util.spec_from_file_location("project_backend_backend", os.path.join(BACKEND_DIR, "backend.py"))
+mod = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(mod)
+
+from reranker import CrossEncoderReranker  # noqa: E402
+
+EVAL_FILE = os.path.join(PROJECT_ROOT, "eval", "eval_questions.jsonl")
+
+
+def load_questions(path: str) -> list[str]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line)["question"] for line in f if line.strip()]
+
+
+def percentile(values: list[float], p: float) -> float:
+    values = sorted(values)
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(round(p / 100.0 * (len(values) - 1))))]
+
+
+def token_counter():
+    """
+    cl100k_base via tiktoken when its encoding can be loaded, else ~4 characters per token.
+    """
+    try:
+        import tiktoken
+        enc = tiktoken.get_encoding("cl100k_base")
+        return "cl100k_base", lambda text: len(enc.encode(text))
+    except Exception:
+        return "chars/4", lambda text: (len(text) + 3) // 4
+
+
+def run_path(questions: list[str], count_tokens, with_llm: bool) -> dict:
+    context_ms, e2e_ms, tokens = [], [], []
+    for q in questions:
+        t0 = time.perf_counter()
+        early, ctx = mod.build_context(q, mod.embeddings.embed_query(q))
+        context_ms.append((time.perf_counter() - t0) * 1000.0)
+        if early is not None:
+            continue
+
+        _, context_str, _ = ctx
+        messages = mod.prompt.format_messages(question=q, context=context_str)
+        tokens.append(sum(count_tokens(m.content) for m in messages))
+
+        if with_llm:
+            t0 = time.perf_counter()
+            mod.answer_and_sources(q)
+            e2e_ms.append((time.perf_counter() - t0) * 1000.0)
+
+    report = {
+        "answered": len(tokens),
+        "retrieval_p50_ms": percentile(context_ms, 50),
+        "retrieval_p99_ms": percentile(context_ms, 99),
+        "prompt_tokens_mean": sum(tokens) / max(1, len(tokens)),
+        "prompt_tokens_p99": percentile(tokens, 99),
+    }
+    if with_llm:
+        report["end_to_end_p50_ms"] = percentile(e2e_ms, 50)
+        report["end_to_end_p99_ms"] = percentile(e2e_ms, 99)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="TOP_K straight to the LLM vs retrieve-many / rerank-few")
+    parser.add_argument("--candidates", type=int, default=mod.cfg.RERANK_CANDIDATES)
+    parser.add_argument("--top-n", type=int, default=mod.cfg.RERANK_TOP_N)
+    parser.add_argument("--llm", action="store_true", help="also time answer_and_sources end to end (calls the LLM)")
+    args = parser.parse_args()
+
+    questions = load_questions(EVAL_FILE)
+    tokenizer, count_tokens = token_counter()
+    mod.answer_cache = None  # every question goes through the full pipeline
+    mod.cfg.RERANK_CANDIDATES, mod.cfg.RERANK_TOP_N = args.candidates, args.top_n
+
+    report = {"questions": len(questions), "top_k": mod.cfg.TOP_K, "tokenizer": tokenizer}
+
+    mod.reranker = None
+    report["current"] = run_path(questions, count_tokens, args.llm)
+
+    mod.reranker = CrossEncoderReranker(mod.cfg.RERANK_MODEL, mod.cfg.RERANK_CACHE_SIZE)
+    mod.reranker.model  # load outside the timings
+    report[f"rerank_{args.candidates}_to_{args.top_n}"] = run_path(questions, count_tokens, args.llm)
+    report[f"rerank_{args.candidates}_to_{args.top_n}_cached_scores"] = run_path(questions, count_tokens, False)
+    report["rerank_stats"] = mod.reranker.stats()
+
+    print(json.dumps(report, indent=2))
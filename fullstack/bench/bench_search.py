@@ -0,0 +1,79 @@
+import json
+import time
+import os
+import sys
+import argparse
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+BACKEND_DIR = os.path.join(PROJECT_ROOT, "backend")
+
+# run as if we are inside backend/ so relative paths (.env, chromadb path) match
+os.chdir(BACKEND_DIR)
+sys.path.insert(0, BACKEND_DIR)
+
+import retrieval  # noqa: E402  (embeddings and the served store, no LLM client)
+from numpy_index import NumpyIndex  # noqa: E402
+
+EVAL_FILE = os.path.join(PROJECT_ROOT, "eval", "eval_questions.jsonl")
+
+
+def load_questions(path: str) -> list[str]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line)["question"] for line in f if line.strip()]
+
+
+def percentile(values: list[float], p: float) -> float:
+    values = sorted(values)
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(round(p / 100.0 * (len(values) - 1))))]
+
+
+def timed(fn, repeats: int) -> tuple[list[float], object]:
+    latencies, result = [], None
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        result = fn()
+        latencies.append((time.perf_counter() - t0) * 1000.0)
+    return latencies, result
+
+
+def run_bench(k: int, repeats: int) -> dict:
+    """
+    Same query vectors against Chroma (HNSW) and the NumPy export (exact).
+    recall@k = overlap of Chroma's top-k with the exact top-k, i.e. what HNSW misses.
+    """
+    index = NumpyIndex.load(retrieval.store_path)
+    questions = load_questions(EVAL_FILE)
+    qvecs = [retrieval.embeddings.embed_query(q) for q in questions]
+
+    chroma_ms, numpy_ms, recalls = [], [], []
+    for qvec in qvecs:
+        lat, hits = timed(lambda: retrieval.vectordb.similarity_search_by_vector_with_relevance_scores(qvec, k=k), repeats)
+        chroma_ms += lat
+        chroma_ids = {d.metadata.get("chunk_id") for d, _ in hits}
+
+        lat, rows = timed(lambda: index.search(qvec, k), repeats)
+        numpy_ms += lat
+        exact_ids = {index.metadatas[r].get("chunk_id") for r, _ in rows}
+
+        recalls.append(len(chroma_ids & exact_ids) / max(1, len(exact_ids)))
+
+    return {
+        "vectors": len(index),
+        "queries": len(qvecs),
+        "k": k,
+        "repeats": repeats,
+        "chroma": {"p50_ms": percentile(chroma_ms, 50), "p99_ms": percentile(chroma_ms, 99)},
+        "numpy": {"p50_ms": percentile(numpy_ms, 50), "p99_ms": percentile(numpy_ms, 99)},
+        "chroma_recall_at_k_vs_exact": sum(recalls) / max(1, len(recalls)),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Chroma vs NumPy exact search: latency and recall@k")
+    parser.add_argument("--k", type=int, default=retrieval.cfg.TOP_K)
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    print(json.dumps(run_bench(args.k, args.repeats), indent=2))
@@ -0,0 +1,166 @@
+"""
+OpenAI-compatible /chat/completions stand-in with a controllable latency distribution, generation
+speed and error rate, for load and tail-latency benchmarks that must not spend provider credits.
+Answers cite [1] with the first context label of the prompt, so they pass the backend's citation checks.
+"""
+import re
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+class FakeLLMSettings:
+    def __init__(self, latency_ms: float = 300.0, tail_prob: float = 0.0, tail_ms: float = 5000.0,
+                 rate_limit_prob: float = 0.0, retry_after: float | None = None, fail_prob: float = 0.0,
+                 down: bool = False, seed: int | None = None, tokens_per_s: float = 0.0,
+                 completion_tokens: int = 150):
+        self.latency_ms = latency_ms
+        self.tail_prob = tail_prob
+        self.tail_ms = tail_ms
+        self.rate_limit_prob = rate_limit_prob
+        self.retry_after = retry_after
+        self.fail_prob = fail_prob
+        self.down = down  # every request gets a 503 (provider outage)
+        self.tokens_per_s = tokens_per_s  # 0 = the whole answer arrives after the latency
+        self.completion_tokens = completion_tokens
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+
+    def draw(self):
+        """
+        Returns (status, delay_s) for one request.
+        """
+        with self.lock:
+            self.requests += 1
+            if self.down:
+                return 503, 0.01
+            r = self.rng.random()
+            if r < self.rate_limit_prob:
+                return 429, 0.01
+            if r < self.rate_limit_prob + self.fail_prob:
+                return 503, self.latency_ms / 1000.0
+            slow = self.rng.random() < self.tail_prob
+            jitter = self.rng.uniform(0.8, 1.2)
+        return 200, (self.tail_ms if slow else self.latency_ms * jitter) / 1000.0
+
+    def generation_s(self) -> float:
+        """
+        Time to "generate" completion_tokens after the first token, at tokens_per_s.
+        """
+        return self.completion_tokens / self.tokens_per_s if self.tokens_per_s > 0 else 0.0
+
+
+def answer_text(prompt: str) -> str:
+    m = re.search(r"^\[1\] (.+)$", prompt, re.M)
+    ref = m.group(1) if m else "unknown p.1"
+    return f"Answer:\nSee the policy [1].\n\nSources:\n[1] {ref}\n\nDocuments:\n{ref.split(' p.')[0]}"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status: int, body: dict, headers: dict | None = None):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        status, delay = self.server.settings.draw()
+        time.sleep(delay)
+
+        if status != 200:
+            headers = {}
+            if status == 429 and self.server.settings.retry_after is not None:
+                headers["Retry-After"] = str(self.server.settings.retry_after)
+            self._send(status, {"error": {"message": f"fake provider error {status}", "code": status}}, headers)
+            return
+
+        messages = body.get("messages") or [{}]
+        text = answer_text(str(messages[-1].get("content", "")))
+        model = body.get("model", "fake")
+
+        generation = self.server.settings.generation_s()
+        if body.get("stream"):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            pieces = range(0, len(text), 16)
+            try:
+                for i in pieces:
+                    time.sleep(generation / len(pieces))
+                    chunk = {"id": "fake", "object": "chat.completion.chunk", "created": 0, "model": model,
+                             "choices": [{"index": 0, "delta": {"content": text[i:i + 16]}, "finish_reason": None}]}
+                    self._chunk(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                self._chunk(b"data: [DONE]\n\n")
+                self._chunk(b"")
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # client stopped reading
+            return
+
+        time.sleep(generation)
+        self._send(200, {
+            "id": "fake", "object": "chat.completion", "created": 0, "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": len(str(messages)) // 4, "completion_tokens": len(text) // 4,
+                      "total_tokens": (len(str(messages)) + len(text)) // 4},
+        })
+
+
+def make_server(port: int = 0, settings: FakeLLMSettings | None = None) -> ThreadingHTTPServer:
+    """
+    Binds 127.0.0.1:port (0 = any free port). Run serve_forever() on a thread; the base URL to give
+    ChatOpenAI is f"http://127.0.0.1:{server.server_address[1]}/v1".
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+    server.daemon_threads = True
+    server.settings = settings or FakeLLMSettings()
+    return server
+
+
+def start_in_thread(settings: FakeLLMSettings | None = None):
+    server = make_server(0, settings)
+    threading.Thread(target=server.serve_forever, name="fake-llm", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake OpenAI-compatible chat completions server")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--tail-prob", type=float, default=0.0, help="share of requests that take --tail-ms")
+    parser.add_argument("--tail-ms", type=float, default=5000.0)
+    parser.add_argument("--rate-limit-prob", type=float, default=0.0, help="share of requests answered 429")
+    parser.add_argument("--retry-after", type=float, default=None, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--fail-prob", type=float, default=0.0, help="share of requests answered 503")
+    parser.add_argument("--tokens-per-s", type=float, default=0.0, help="generation speed after the first token (0 = instant)")
+    parser.add_argument("--completion-tokens", type=int, default=150, help="tokens generated per answer at --tokens-per-s")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    settings = FakeLLMSettings(args.latency_ms, args.tail_prob, args.tail_ms, args.rate_limit_prob,
+                               args.retry_after, args.fail_prob, seed=args.seed,
+                               tokens_per_s=args.tokens_per_s, completion_tokens=args.completion_tokens)
+    server = make_server(args.port, settings)
+    print(f"fake LLM on http://127.0.0.1:{args.port}/v1 (OPENAI_API_BASE)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
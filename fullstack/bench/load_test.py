@@ -0,0 +1,197 @@
+import os
+import sys
+import json
+import time
+import socket
+import signal
+import argparse
+import tempfile
+import threading
+import subprocess
+
+import requests
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+BACKEND_DIR = os.path.join(PROJECT_ROOT, "backend")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_llm_server import FakeLLMSettings, start_in_thread  # noqa: E402
+
+EVAL_FILE = os.path.join(PROJECT_ROOT, "eval", "eval_questions.jsonl")
+FAILED_ANSWERS = ("Request failed (retrieval).", "Request failed (LLM).")
+
+
+def load_questions(path: str) -> list[str]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line)["question"] for line in f if line.strip()]
+
+
+def percentile(values: list[float], p: float) -> float:
+    values = sorted(values)
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(round(p / 100.0 * (len(values) - 1))))]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def parse_setting(spec: str) -> dict:
+    """
+    "2x4" -> 2 sync workers x 4 threads; "async:2" -> 2 ASGI (uvicorn) workers.
+    """
+    spec = spec.strip()
+    if spec.startswith("async:"):
+        return {"name": spec, "workers": int(spec.split(":", 1)[1]), "threads": 1, "async": True}
+    workers, threads = spec.lower().split("x")
+    return {"name": spec, "workers": int(workers), "threads": int(threads), "async": False}
+
+
+class Server:
+    """
+    gunicorn -c gunicorn.conf.py in backend/, pointed at the fake LLM.
+    """
+
+    def __init__(self, setting: dict, llm_base: str, args):
+        self.port = free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        env = {
+            **os.environ,
+            "PORT": str(self.port),
+            "GUNICORN_WORKERS": str(setting["workers"]),
+            "GUNICORN_THREADS": str(setting["threads"]),
+            "ASYNC_SERVING": "1" if setting["async"] else "0",
+            "PRELOAD_MODEL": "1" if args.preload else "0",
+            "OPENAI_API_BASE": llm_base,
+            "ANSWER_CACHE_ENABLED": "1" if args.cache else "0",
+            "SINGLE_FLIGHT": "1" if args.cache else "0",
+        }
+        self.log = open(os.path.join(args.log_dir, f"gunicorn_{setting['name'].replace(':', '_')}.log"), "w")
+        self.proc = subprocess.Popen(
+            [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--access-logfile", "-"],
+            cwd=BACKEND_DIR, env=env, stdout=self.log, stderr=subprocess.STDOUT,
+        )
+
+    def wait_ready(self, timeout_s: float):
+        deadline = time.monotonic() + timeout_s
+        while time.monotonic() < deadline:
+            if self.proc.poll() is not None:
+                raise RuntimeError(f"gunicorn exited with {self.proc.returncode}; see {self.log.name}")
+            try:
+                if requests.get(self.url + "/ready", timeout=2).status_code == 200:
+                    return
+            except requests.RequestException:
+                pass
+            time.sleep(0.5)
+        raise RuntimeError(f"gunicorn not ready after {timeout_s}s; see {self.log.name}")
+
+    def stop(self):
+        self.proc.send_signal(signal.SIGTERM)
+        try:
+            self.proc.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+            self.proc.wait()
+        self.log.close()
+
+
+def drive(url: str, questions: list[str], concurrency: int, duration_s: float, timeout_s: float) -> dict:
+    """
+    Closed loop: concurrency clients, each sending its next /chat request as soon as the previous one returns.
+    """
+    latencies, errors, lock = [], [], threading.Lock()
+    stop_at = time.monotonic() + duration_s
+
+    def client(n: int):
+        session = requests.Session()
+        i = n
+        while time.monotonic() < stop_at:
+            question = questions[i % len(questions)]
+            i += concurrency
+            t0 = time.perf_counter()
+            try:
+                resp = session.post(url + "/chat", json={"question": question}, timeout=timeout_s)
+                ok = resp.status_code == 200 and resp.json().get("answer") not in FAILED_ANSWERS
+                error = None if ok else f"http {resp.status_code}" if resp.status_code != 200 else "failed answer"
+            except requests.RequestException as e:
+                error = type(e).__name__
+            ms = (time.perf_counter() - t0) * 1000.0
+            with lock:
+                if error:
+                    errors.append(error)
+                else:
+                    latencies.append(ms)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - start
+
+    total = len(latencies) + len(errors)
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "throughput_rps": len(latencies) / wall,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "error_rate": len(errors) / max(1, total),
+        "errors": {e: errors.count(e) for e in sorted(set(errors))},
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test POST /chat per gunicorn worker/thread setting")
+    parser.add_argument("--settings", default="1x2,2x4,4x8",
+                        help="comma-separated WORKERSxTHREADS (sync) or async:WORKERS (ASGI)")
+    parser.add_argument("--concurrency", default="1,4,16,32", help="comma-separated client counts, run in order")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds per concurrency level")
+    parser.add_argument("--latency-ms", type=float, default=800.0, help="fake LLM time to first token")
+    parser.add_argument("--tokens-per-s", type=float, default=60.0, help="fake LLM generation speed")
+    parser.add_argument("--completion-tokens", type=int, default=150)
+    parser.add_argument("--tail-prob", type=float, default=0.0)
+    parser.add_argument("--tail-ms", type=float, default=5000.0)
+    parser.add_argument("--fail-prob", type=float, default=0.0)
+    parser.add_argument("--timeout", type=float, default=120.0, help="client timeout per request")
+    parser.add_argument("--preload", action="store_true", help="PRELOAD_MODEL=1 (one model copy shared by workers)")
+    parser.add_argument("--cache", action="store_true", help="keep the answer cache and single flight on")
+    parser.add_argument("--log-dir", default=os.path.join(tempfile.gettempdir(), "load_test_logs"),
+                        help="gunicorn output, one file per setting")
+    args = parser.parse_args()
+
+    os.makedirs(args.log_dir, exist_ok=True)
+    questions = load_questions(EVAL_FILE)
+    levels = [int(c) for c in args.concurrency.split(",") if c.strip()]
+
+    fake, llm_base = start_in_thread(FakeLLMSettings(
+        args.latency_ms, args.tail_prob, args.tail_ms, fail_prob=args.fail_prob,
+        tokens_per_s=args.tokens_per_s, completion_tokens=args.completion_tokens,
+    ))
+    report = {"fake_llm": {"latency_ms": args.latency_ms, "tokens_per_s": args.tokens_per_s,
+                           "completion_tokens": args.completion_tokens, "generation_s": fake.settings.generation_s()},
+              "cache": args.cache, "preload": args.preload, "results": {}}
+
+    for spec in args.settings.split(","):
+        setting = parse_setting(spec)
+        server = Server(setting, llm_base, args)
+        try:
+            server.wait_ready(timeout_s=300)
+            drive(server.url, questions, setting["workers"] * max(1, setting["threads"]), 3.0, args.timeout)  # warm every worker
+            runs = []
+            for c in levels:
+                runs.append(drive(server.url, questions, c, args.duration, args.timeout))
+                print(f"[load] {setting['name']:>8} c={c:<3} {runs[-1]['throughput_rps']:7.2f} rps  "
+                      f"p50={runs[-1]['p50_ms']:7.0f}ms p99={runs[-1]['p99_ms']:7.0f}ms "
+                      f"errors={runs[-1]['error_rate']:.1%}", file=sys.stderr)
+            report["results"][setting["name"]] = runs
+        finally:
+            server.stop()
+
+    fake.shutdown()
+    print(json.dumps(report, indent=2))
@@ -1,10 +1,12 @@
 import json
 import time
-import statistics
 import os
 import sys
 import re
+import argparse
+import threading
 import importlib.util
+from concurrent.futures import ThreadPoolExecutor
 
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 BACKEND_DIR = os.path.join(PROJECT_ROOT, "backend")
@@ -17,19 +19,53 @@ sys.path.insert(0, BACKEND_DIR)
 
 BACKEND_FILE = os.path.join(BACKEND_DIR, "backend.py")
 
-spec = importlib.util.spec_from_file_location("project_backend_backend", BACKEND_FILE)
-mod = importlib.util.module_from_spec(spec)
-spec.loader.exec_module(mod)
+# Query embeddings, the store and retrieve() only: the retrieval mode builds no LLM client
+import retrieval  # noqa: E402
+from reranker import CrossEncoderReranker  # noqa: E402
 
-answer_and_sources = mod.answer_and_sources
+mod = None  # backend.py, loaded by load_backend() for the full mode
 
-# if backend config exists, grab refusal text from it
-CFG = getattr(mod, "cfg", None)
-REFUSAL_TEXT = getattr(CFG, "REFUSAL_TEXT", "").strip() if CFG else ""
+CFG = retrieval.cfg
+REFUSAL_TEXT = CFG.REFUSAL_TEXT.strip()
+
+
+def load_backend():
+    global mod
+    spec = importlib.util.spec_from_file_location("project_backend_backend", BACKEND_FILE)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
 
 EVAL_FILE = os.path.join(PROJECT_ROOT, "eval", "eval_questions.jsonl")
 
 
+class TokenBucket:
+    """
+    rate requests/second on average, up to burst at once. rate <= 0 means unlimited.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    return
+                wait = (1.0 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
 def load_eval_questions(path: str) -> list[dict]:
     rows = []
     with open(path, "r", encoding="utf-8") as f:
@@ -40,6 +76,28 @@ def load_eval_questions(path: str) -> list[dict]:
     return rows
 
 
+def percentile(values: list[float], p: float) -> float:
+    values = sorted(values)
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(round(p / 100.0 * (len(values) - 1))))]
+
+
+def run_concurrently(fn, rows: list[dict], concurrency: int, bucket: TokenBucket) -> tuple[list, float]:
+    """
+    fn(row) for every row on concurrency threads, each start gated by the token bucket.
+    Returns (results in row order, wall seconds).
+    """
+    def task(row):
+        bucket.acquire()
+        return fn(row)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        results = list(pool.map(task, rows))
+    return results, time.perf_counter() - start
+
+
 def extract_cited_numbers(answer_text: str) -> set[int]:
     return {int(n) for n in re.findall(r"\[(\d+)\]", answer_text or "")}
 
@@ -57,22 +115,28 @@ def is_refusal(answer_text: str) -> bool:
     return False
 
 
-def run_eval():
+def ask(row: dict) -> tuple[dict, float]:
+    question = (row.get("question") or "").strip()
+    start = time.perf_counter()
+    result = mod.answer_and_sources(question)
+    return result, time.perf_counter() - start
+
+
+def run_eval(concurrency: int = 4, rate: float = 0.0, burst: int = 1, limit: int = 0):
     questions = load_eval_questions(EVAL_FILE)
+    if limit > 0:
+        questions = questions[:limit]
+
+    answered, wall = run_concurrently(ask, questions, concurrency, TokenBucket(rate, burst))
 
     latencies = []
     grounded_pass = []
     citation_pass = []
     exact_match = []
 
-    for i, q in enumerate(questions):
+    for i, (q, (result, latency)) in enumerate(zip(questions, answered)):
         question = (q.get("question") or "").strip()
         gold = (q.get("expected_answer") or "").strip()
-
-        start = time.time()
-        result = answer_and_sources(question)
-        time.sleep(5.0)
-        latency = time.time() - start
         latencies.append(latency)
 
         answer_text = result.get("answer", "")
@@ -120,18 +184,92 @@ def run_eval():
                     break
             grounded_pass.append(ok)
 
-    p50 = statistics.median(latencies)
-    p95 = statistics.quantiles(latencies, n=20)[18] if len(latencies) >= 20 else max(latencies)
-
     return {
+        "mode": "full",
         "num_questions": len(questions),
+        "concurrency": concurrency,
+        "rate_limit_qps": rate or None,
         "groundedness_pct": sum(grounded_pass) / len(grounded_pass) if grounded_pass else 0.0,
         "citation_accuracy_pct": sum(citation_pass) / len(citation_pass) if citation_pass else 0.0,
         "exact_match_pct": sum(exact_match) / len(exact_match) if exact_match else 0.0,
-        "latency_p50_s": p50,
-        "latency_p95_s": p95,
+        "latency_p50_s": percentile(latencies, 50),
+        "latency_p95_s": percentile(latencies, 95),
+        "wall_s": wall,
+        "throughput_qps": len(questions) / wall if wall > 0 else 0.0,
+    }
+
+
+def retrieved_files(question: str, k: int, reranker=None) -> list[str]:
+    """
+    File names of the top-k chunks the LLM would be given (first stage, then rerank when enabled).
+    """
+    results, _ = retrieval.retrieve(question, k=max(k, CFG.RERANK_CANDIDATES) if reranker is not None else k)
+    if reranker is not None:
+        results = reranker.rerank(question, [doc for doc, _ in results], k)
+    return [os.path.basename(str(doc.metadata.get("source", ""))) for doc, _ in results[:k]]
+
+
+def run_retrieval_eval(k: int, concurrency: int = 4, limit: int = 0):
+    """
+    Offline: no LLM call. recall@k = share of a question's expected documents (sources[].doc)
+    found among the files of its top-k retrieved chunks; hit@k = at least one of them found.
+    """
+    questions = [q for q in load_eval_questions(EVAL_FILE) if q.get("sources")]
+    if limit > 0:
+        questions = questions[:limit]
+    reranker = CrossEncoderReranker(CFG.RERANK_MODEL, CFG.RERANK_CACHE_SIZE) if CFG.RERANK_ENABLED else None
+
+    def score(row):
+        start = time.perf_counter()
+        files = set(retrieved_files((row.get("question") or "").strip(), k, reranker))
+        latency = time.perf_counter() - start
+        expected = {os.path.basename(s["doc"]) for s in row["sources"] if s.get("doc")}
+        found = expected & files
+        return {"id": row.get("id"), "recall": len(found) / len(expected), "missed": sorted(expected - found)}, latency
+
+    scored, wall = run_concurrently(score, questions, concurrency, TokenBucket(0))
+    latencies = [latency for _, latency in scored]
+    rows = [r for r, _ in scored]
+
+    return {
+        "mode": "retrieval",
+        "num_questions": len(rows),
+        "k": k,
+        "retrieval_mode": CFG.RETRIEVAL_MODE,
+        "search_engine": CFG.SEARCH_ENGINE,
+        "rerank": reranker is not None,
+        f"recall@{k}": sum(r["recall"] for r in rows) / len(rows) if rows else 0.0,
+        f"hit@{k}": sum(r["recall"] > 0 for r in rows) / len(rows) if rows else 0.0,
+        "latency_p50_s": percentile(latencies, 50),
+        "latency_p95_s": percentile(latencies, 95),
+        "wall_s": wall,
+        "misses": {r["id"]: r["missed"] for r in rows if r["missed"]},
     }
 
 
 if __name__ == "__main__":
-    print(json.dumps(run_eval(), indent=2))
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Evaluate the RAG pipeline on eval/eval_questions.jsonl")
+    parser.add_argument("--mode", choices=("full", "retrieval"), default="full",
+                        help="full: answer_and_sources (calls the LLM); retrieval: recall@k only, offline")
+    parser.add_argument("--concurrency", type=int, default=4, help="questions in flight at once")
+    parser.add_argument("--rate", type=float, default=0.0, help="max questions started per second (0 = no limit)")
+    parser.add_argument("--burst", type=int, default=1, help="token bucket size for --rate")
+    parser.add_argument("--k", type=int, default=CFG.TOP_K, help="retrieval mode: chunks considered per question")
+    parser.add_argument("--limit", type=int, default=0, help="only the first N questions")
+    parser.add_argument("--no-cache", action="store_true", help="disable the answer cache for the run")
+    parser.add_argument("--min-recall", type=float, default=None,
+                        help="retrieval mode: exit 1 when recall@k is below this (CI gate)")
+    args = parser.parse_args()
+
+    if args.mode == "full":
+        load_backend()
+        if args.no_cache:
+            mod.answer_cache = None
+
+    if args.mode == "retrieval":
+        report = run_retrieval_eval(args.k, args.concurrency, args.limit)
+        print(json.dumps(report, indent=2))
+        if args.min_recall is not None and report[f"recall@{args.k}"] < args.min_recall:
+            sys.exit(1)
+    else:
+        print(json.dumps(run_eval(args.concurrency, args.rate, args.burst, args.limit), indent=2))